@@ -17,14 +17,19 @@ Developer Assistant -- this application provides a GUI to interact with
                        supports multiple appearance modes and scaling options.
 '''
 
-import threading
+from concurrent.futures import Future
 import customtkinter as ctk
 from CTkMessagebox import CTkMessagebox
 from ui.main_frame import MainFrame
 from ui.sidebar_frame import SideBarFrame
 from ui.model_info_frame import ModelInfoFrame
 from ui.create_model_frame import CreateModelFrame
-from utils_dev_assist import llm_models as lm
+from utils_dev_assist.async_engine import AsyncEngine
+from utils_dev_assist.model_registry import ModelRegistry
+from utils_dev_assist.download_manager import Download, DownloadManager
+from utils_dev_assist.model_scheduler import ModelScheduler
+from utils_dev_assist.model_scheduler import SCHEDULE_INTERVAL
+from utils_dev_assist.ollama_backend import backend
 from utils_dev_assist.dev_assist_logging import app_log
 
 logger = app_log(__name__)
@@ -36,7 +41,7 @@ class DevAssistant(ctk.CTk):
     receive responses, view modelinfo and create models via a GUI.
     '''
 
-    llm = {"model": "", "models": "", "new_model": ""}
+    llm = {"model": "", "models": [], "new_model": ""}
 
     def __init__(self):
         super().__init__()
@@ -50,29 +55,103 @@ class DevAssistant(ctk.CTk):
         self.grid_columnconfigure(1, weight=1)
         self.grid_columnconfigure((2, 3), weight=0)
 
+        # Engine running the requests to the Ollama server.
+        self.engine = AsyncEngine()
+        self.process_engine_results()
+
+        # List of the installed models, the model menu is updated when it
+        # changes.
+        self.models = ModelRegistry(self.engine)
+        self.models.subscribe(self.models_changed, self.models_failed)
+
+        # Queue of the model downloads, the progress is displayed in the
+        # sidebar.
+        self.downloads = DownloadManager(self.engine)
+        self.downloads.subscribe(self.download_progress,
+                                 self.download_finished)
+
+        # Models loaded on the server within the memory budget, the
+        # resident models are displayed in the sidebar.
+        self.scheduler = ModelScheduler(self.engine)
+        self.scheduler.subscribe(self.resident_changed)
+
         # Create sidebar frame.
-        self.sidebar_frame = ctk.CTkFrame(self)
+        self.sidebar_frame = None
+
+        self.load_sidebar_frame()
+        self.refresh_models()
+        self.schedule_models()
 
         # Create main frame.
-        self.main_frame = ctk.CTkFrame(self)
+        self.main_frame = MainFrame(self)
 
-        self.load_sidebar_frame()
-        MainFrame(self)
+    def process_engine_results(self) -> None:
+        '''
+        Runs the callbacks of the finished engine requests on the Tk main
+        loop.
+        '''
+
+        self.engine.process_results()
+        self.after(50, self.process_engine_results)
+
+    def refresh_models(self) -> None:
+        '''
+        Fetches the list of models in the background once it is older than
+        the ttl of the registry.
+        '''
+
+        self.models.refresh()
+        self.after(5000, self.refresh_models)
+
+    def schedule_models(self) -> None:
+        '''
+        Polls the resident models and unloads the models over the memory
+        budget in the background.
+        '''
+
+        self.scheduler.refresh()
+        self.after(int(SCHEDULE_INTERVAL * 1000), self.schedule_models)
+
+    def resident_changed(self, scheduler: ModelScheduler) -> None:
+        '''
+        Displays the resident models and the decisions of the scheduler.
+        '''
+
+        self.sidebar_frame.widget["resident_frame"].show(scheduler)
 
     def load_sidebar_frame(self) -> None:
         '''
-        Loads the sidebar frame into to app.
+        Loads the sidebar frame into to app, the model menu is filled when
+        the list of models has been fetched.
         '''
 
-        try:
-            self.llm["models"] = lm.installed_models()
+        self.sidebar_frame = SideBarFrame(self)
 
-        except ConnectionError as error:
-            self.popup_message(caller="server_connection",
-                               msg=error,
-                               icon="warning")
+    def models_changed(self, models: list) -> None:
+        '''
+        Updates the model menu with the changed list of models.
+        '''
+
+        self.llm["models"] = models
+
+        if self.llm["model"] not in models:
+            self.llm["model"] = ""
+            self.sidebar_frame.show_model_status("", "")
+
+        self.sidebar_frame.update_model_menu()
 
-        SideBarFrame(self)
+        # Model info and create model are displayed without waiting for
+        # the server.
+        self.engine.prefetch_future(models)
+
+    def models_failed(self, error: Exception) -> None:
+        '''
+        Displays a message if the list of models could not be fetched.
+        '''
+
+        self.popup_message(caller="server_connection",
+                           msg=str(error),
+                           icon="warning")
 
     def load_create_model_frame(self) -> None:
         '''
@@ -92,13 +171,54 @@ class DevAssistant(ctk.CTk):
 
     def load_llm(self, model: str) -> None:
         """
-        Sets the language model for the instance.
+        Sets the language model for the instance and loads it into memory
+        on the server in the background, the scheduler makes room for it
+        within the memory budget. The sidebar shows when it is ready.
         """
 
         self.llm["model"] = model
 
         logger.debug(" [LLM] %s has been selected.", self.llm["model"])
 
+        self.main_frame.update_context_usage()
+
+        self.sidebar_frame.show_model_status(model, "loading")
+        self.scheduler.load_future(
+                    model,
+                    callback=lambda future: self.model_warmed_up(model,
+                                                                 future))
+
+    def model_warmed_up(self, model: str, future: Future) -> None:
+        '''
+        Shows if the warm-up of a model has finished, the status of a model
+        which is no longer selected is not shown.
+        '''
+
+        if future.cancelled() or model != self.llm["model"]:
+            return
+
+        error = future.exception()
+
+        if error is not None:
+            logger.error(" [LLM] warm-up of %s failed --> %s", model, error)
+
+        self.sidebar_frame.show_model_status(
+                                model, "ready" if error is None else "failed")
+
+    def open_session(self, session_id: int) -> None:
+        '''
+        Opens a stored session in the main frame.
+        '''
+
+        self.main_frame.open_session(session_id)
+
+    def new_session(self) -> None:
+        '''
+        Starts a new session in the main frame.
+        '''
+
+        self.main_frame.new_session()
+
     def check_model_loaded(self) -> bool:
         '''
         Checks if a model is loaded.
@@ -132,8 +252,8 @@ class DevAssistant(ctk.CTk):
             msg = f"Starting download of {self.llm['new_model']}..."
             self.popup_message("download_start", msg)
 
-            # Call the start_thread method.
-            self.start_thread()
+            # Call the start_download method.
+            self.start_download()
 
         if caller == "create_model":
             # Dialog popup to request the name for the model to create.
@@ -207,12 +327,14 @@ class DevAssistant(ctk.CTk):
         elif caller == "create_model":
             created = CTkMessagebox(title="Created Model",
                                     message=msg,
-                                    icon="info",
+                                    icon=icon,
                                     option_1="ok",
                                     justify="center",
                                     fade_in_duration=2)
 
-            created.after(2000, created.destroy)
+            # A failed creation stays open until it is confirmed.
+            if icon == "info":
+                created.after(2000, created.destroy)
 
         elif caller == "download":
             CTkMessagebox(title="Download Model",
@@ -242,18 +364,56 @@ class DevAssistant(ctk.CTk):
 
             error_msg.after(5000, error_msg.destroy)
 
-    def download_model(self) -> None:
+    def download_progress(self, download: Download) -> None:
         """
-        Downloads and installs a new LLM model.
+        Displays the progress of a download in the sidebar.
         """
 
-        # Display download message in the tex box.
-        model = self.llm['new_model']
+        self.sidebar_frame.widget["downloads_frame"].show(download)
 
-        download_msg = lm.download_install_model(model)
-        self.popup_message(caller="download", msg=download_msg)
+    def download_finished(self, download: Download) -> None:
+        """
+        Displays the result of a download and updates the model menu.
+        """
 
-        self.load_sidebar_frame()
+        self.download_progress(download)
+
+        if download.status == "cancelled":
+            return
+
+        self.popup_message(caller="download", msg=download.message)
+
+        if download.status == "done":
+            self.models.invalidate()
+
+    def create_model(self, new_model: str, modelfile: str) -> None:
+        '''
+        Creates a new model from a modelfile with the engine.
+        '''
+
+        self.engine.create_future(
+                        new_model, modelfile,
+                        callback=lambda future: self.model_created(new_model,
+                                                                   future))
+
+    def model_created(self, new_model: str, future: Future) -> None:
+        '''
+        Displays the result of the creation of a model and updates the
+        model menu.
+        '''
+
+        if future.exception() is not None:
+            logger.error(" [LLM] creation of %s failed --> %s",
+                         new_model, future.exception())
+            self.popup_message("create_model",
+                               msg=f"Creation of {new_model} failed!\n"
+                                   f"{future.exception()}",
+                               icon="warning")
+            return
+
+        self.popup_message("create_model", future.result())
+
+        self.models.invalidate()
 
     def delete_model(self) -> None:
         '''
@@ -272,23 +432,42 @@ class DevAssistant(ctk.CTk):
             remove = confirmation.get()
 
             if remove == "yes":
-                deleted = lm.delete_model(self.llm["model"])
-                if deleted:
-                    msg = f"{self.llm['model']} deleted!"
-                    self.popup_message("delete_model", msg)
+                model = self.llm["model"]
+                self.engine.delete_future(
+                            model,
+                            callback=lambda done: self.model_deleted(model,
+                                                                     done))
+
+    def model_deleted(self, model: str, future: Future) -> None:
+        '''
+        Displays the result of the deletion of a model and updates the
+        model menu.
+        '''
+
+        if future.exception() is not None:
+            logger.error(" [LLM] deletion of %s failed --> %s",
+                         model, future.exception())
+            self.popup_message("server_connection",
+                               msg=str(future.exception()),
+                               icon="warning")
+            return
+
+        self.popup_message("delete_model", f"{model} deleted!")
+
+        if self.llm["model"] == model:
+            self.llm["model"] = ""
 
-                # Retrieve the updated list of models.
-                self.llm["models"] = lm.installed_models()
+        # Retrieve the updated list of models.
+        self.models.invalidate()
 
-    def start_thread(self) -> None:
+    def start_download(self) -> None:
         """
-        Starts new threads to handle downloads.
+        Queues the download of a new model, several models are downloaded
+        at the same time.
         """
 
-        # Create and start a new deamon thread for downloading a LLM.
-        download_thread = threading.Thread(target=self.download_model)
-        download_thread.start()
-        logger.info(" [THREAD] download thread --> started.")
+        self.downloads.enqueue(self.llm["new_model"])
+        logger.info(" [ENGINE] download --> queued.")
 
 
 # Entry point of the application.
@@ -297,5 +476,7 @@ if __name__ == "__main__":
 
     app = DevAssistant()
     app.mainloop()
+    app.engine.close()
+    backend.close()
 
     logger.info("[STOPT] application closed by the user.")
@@ -0,0 +1,340 @@
+'''
+test_async_engine.py -- testing the async_engine module.
+'''
+
+import sys
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import dev_assist as da
+    from utils_dev_assist import llm_models as lm
+    from utils_dev_assist import async_engine as ae
+    from utils_dev_assist import keep_alive
+    from utils_dev_assist.context_window import ContextWindow
+    from utils_dev_assist.async_engine import AsyncEngine
+
+except ImportError:
+    pass
+
+
+class FakeClient:
+    ''' Replaces the ollama.AsyncClient of the engine. '''
+
+    def __init__(self, contents: list, delay: float = 0):
+        self.contents = contents
+        self.delay = delay
+
+    async def chat(self, **kwargs):
+        ''' Returns a stream of response parts. '''
+
+        async def stream():
+            for content in self.contents:
+                await asyncio.sleep(self.delay)
+                yield {"message": {"content": content}}
+
+        return stream()
+
+
+class AsyncEngineTest(TestCase):
+    ''' Class to test the async_engine module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and engine setup. '''
+
+        self.logger = app_log(__name__)
+        self.engine = AsyncEngine()
+
+    def tearDown(self) -> None:
+        ''' Stops the engine. '''
+
+        self.engine.close()
+
+    def test_ask(self) -> None:
+        ''' Tests that ask() streams the chunks and updates the chat log. '''
+
+        self.engine.client = FakeClient(["Hello", " world"])
+        conversation = da.Conversation("test_model")
+        chunks = []
+        finished = []
+
+        with mock.patch.object(da, "store"):
+            future = self.engine.ask_future(conversation, "Hi",
+                                            on_chunk=chunks.append,
+                                            callback=finished.append)
+
+            self.assertEqual(future.result(timeout=5), "Hello world")
+
+        self.assertEqual(chunks, [da.RESPONSE_HEADER, "Hello", " world",
+                                  da.RESPONSE_END])
+        self.assertEqual(len(conversation.messages), 2)
+
+        # The callback is run by process_results() on the Tk main loop.
+        self.assertEqual(finished, [])
+        self.engine.process_results()
+        self.assertEqual(finished, [future])
+
+    def test_offer(self) -> None:
+        ''' Tests that a similar answer is only added once accepted. '''
+
+        self.engine.client = FakeClient(["generated"])
+        conversation = da.Conversation("test_model")
+        similar = {"query": "explain", "answer": "stored",
+                   "similarity": 0.95}
+        chunks = []
+
+        with mock.patch.object(da, "store"), \
+                mock.patch.object(conversation, "semantic_lookup",
+                                  return_value=(None, similar)):
+            future = self.engine.ask_future(conversation, "what is it",
+                                            on_chunk=chunks.append)
+
+            self.assertEqual(future.result(timeout=5), "stored")
+            self.assertEqual(conversation.messages, [])
+            self.assertEqual(chunks[0], da.similar_header(similar))
+
+            self.assertTrue(self.engine.accept_future(
+                                        conversation).result(timeout=5))
+
+        self.assertEqual([message["content"] for message
+                          in conversation.messages], ["what is it", "stored"])
+        self.assertIsNone(conversation.offered)
+
+    def test_cancel(self) -> None:
+        ''' Tests that a cancelled request rolls the chat log back. '''
+
+        self.engine.client = FakeClient(["Hello"] * 100, delay=0.05)
+        conversation = da.Conversation("test_model")
+        chunks = []
+        finished = []
+
+        def request_finished(future) -> None:
+            finished.append((list(conversation.messages), chunks[-1]))
+
+        with mock.patch.object(da, "store"):
+            future = self.engine.ask_future(conversation, "Hi",
+                                            on_chunk=chunks.append,
+                                            callback=request_finished)
+
+            while len(chunks) < 3:
+                time.sleep(0.01)
+
+            conversation.cancel()
+
+            with self.assertRaises(Exception):
+                future.result(timeout=5)
+
+        # The future is done after the chat log was rolled back, its
+        # callback is queued right after the result.
+        deadline = time.monotonic() + 5
+
+        while not finished and time.monotonic() < deadline:
+            self.engine.process_results()
+            time.sleep(0.01)
+
+        self.assertEqual(finished, [([], da.STOPPED)])
+        self.assertIsNone(conversation.task)
+        self.assertFalse(conversation.turn_lock.locked())
+
+    def test_cancel_waiting(self) -> None:
+        ''' Tests that a request waiting for its turn is cancelled. '''
+
+        self.engine.client = FakeClient(["Hello"])
+        conversation = da.Conversation("test_model")
+        chunks = []
+
+        conversation.turn_lock.acquire()
+        future = self.engine.ask_future(conversation, "Hi",
+                                        on_chunk=chunks.append)
+
+        # The event loop is not blocked by the waiting request.
+        self.assertTrue(self.engine.submit(asyncio.sleep(0, True))
+                        .result(timeout=5))
+
+        conversation.cancel()
+        conversation.turn_lock.release()
+
+        with self.assertRaises(Exception):
+            future.result(timeout=5)
+
+        self.assertEqual(chunks, [da.STOPPED])
+        self.assertEqual(conversation.messages, [])
+        self.assertFalse(conversation.turn_lock.locked())
+
+    def test_cancel_during_query(self) -> None:
+        ''' Tests that a query added after a cancel is rolled back. '''
+
+        self.engine.client = FakeClient(["Hello"])
+        conversation = da.Conversation("test_model")
+        started = threading.Event()
+        add_query = conversation.add_query
+
+        def slow_add_query(*args) -> None:
+            started.set()
+            time.sleep(0.2)
+            add_query(*args)
+
+        with mock.patch.object(da, "store"), \
+                mock.patch.object(conversation, "add_query",
+                                  side_effect=slow_add_query):
+
+            future = self.engine.ask_future(conversation, "hello")
+            started.wait(timeout=5)
+            conversation.cancel()
+
+            with self.assertRaises(Exception):
+                future.result(timeout=5)
+
+            # Wait for the task to finish its clean up.
+            self.engine.submit(asyncio.sleep(0.4)).result(timeout=5)
+
+        self.assertEqual(conversation.messages, [])
+
+    def test_create_failure(self) -> None:
+        ''' Tests that a failed creation raises and keeps the digest. '''
+
+        process = mock.Mock(returncode=1, wait=mock.AsyncMock(return_value=1))
+
+        with mock.patch.object(lm, "write_modelfile",
+                               return_value="modelfile"), \
+                mock.patch.object(lm, "forget_digest") as forget, \
+                mock.patch.object(ae.asyncio, "create_subprocess_exec",
+                                  mock.AsyncMock(return_value=process)):
+
+            future = self.engine.create_future("new_model", "FROM base")
+
+            with self.assertRaises(ae.subprocess.CalledProcessError):
+                future.result(timeout=5)
+
+        forget.assert_not_called()
+
+    def test_info_future(self) -> None:
+        ''' Tests that the tabs of a model share one fetch. '''
+
+        response = mock.Mock(text='{"license": "MIT", "system": "Be brief"}')
+
+        with mock.patch.object(lm.backend.http, "post",
+                               return_value=response) as post, \
+                mock.patch.dict(lm.model_digests,
+                                {"info_model:latest": "sha"}), \
+                mock.patch.dict(lm.model_metadata):
+
+            results = [self.engine.info_future("info_model",
+                                               info).result(timeout=5)
+                       for info in ("license", "system")]
+
+        self.assertIn("MIT", results[0])
+        self.assertIn("Be brief", results[1])
+        self.assertEqual(post.call_count, 1)
+
+    def test_warm_up(self) -> None:
+        ''' Tests that a model is loaded with its keep alive time. '''
+
+        self.engine.client = mock.Mock(generate=mock.AsyncMock())
+        done = []
+
+        with mock.patch.dict(keep_alive.settings["models"],
+                             {"hot_model": -1}):
+
+            future = self.engine.warm_up_future("hot_model", done.append)
+            self.assertEqual(future.result(timeout=5), "hot_model")
+            self.engine.warm_up_future("other_model").result(timeout=5)
+
+        self.engine.process_results()
+
+        self.assertEqual(done, [future])
+        self.engine.client.generate.assert_any_await(
+                            model="hot_model",
+                            prompt="",
+                            options=ContextWindow().options("hot_model"),
+                            keep_alive=-1)
+        self.engine.client.generate.assert_awaited_with(
+                            model="other_model",
+                            prompt="",
+                            options=ContextWindow().options("other_model"),
+                            keep_alive=keep_alive.settings["default"])
+
+    def test_prefetch(self) -> None:
+        ''' Tests that the prefetch is bounded and waits for requests. '''
+
+        lock = threading.Lock()
+        fetched = []
+        running = [0, 0]
+
+        def model_info(model: str) -> dict:
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+
+            time.sleep(0.02)
+
+            with lock:
+                running[0] -= 1
+                fetched.append(model)
+
+            return {}
+
+        models = [f"model_{idx}" for idx in range(6)]
+
+        with mock.patch.object(lm, "model_info", side_effect=model_info):
+            # A running chat request pauses the prefetch.
+            self.engine.loop.call_soon_threadsafe(
+                                            self.engine.request_started)
+
+            future = self.engine.prefetch_future(models)
+            time.sleep(0.1)
+            self.assertEqual(fetched, [])
+
+            self.engine.loop.call_soon_threadsafe(
+                                            self.engine.request_finished)
+
+            self.assertEqual(future.result(timeout=5), 6)
+
+            # A new prefetch cancels the running one.
+            self.engine.loop.call_soon_threadsafe(
+                                            self.engine.request_started)
+            first = self.engine.prefetch_future(models)
+            self.engine.prefetch_future(models[:1])
+            self.engine.loop.call_soon_threadsafe(
+                                            self.engine.request_finished)
+
+            self.assertEqual(self.engine.prefetching.result(timeout=5), 1)
+
+        self.assertTrue(first.cancelled())
+        self.assertEqual(sorted(fetched), sorted(models + models[:1]))
+        self.assertEqual(running[1], ae.PREFETCH_PARALLEL)
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/async_engine_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
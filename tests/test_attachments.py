@@ -0,0 +1,248 @@
+'''
+test_attachments.py -- testing the attachments module.
+'''
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import attachments as at
+    from utils_dev_assist import dev_assist as da
+    from utils_dev_assist.context_window import message_tokens
+
+except ImportError:
+    pass
+
+
+class AttachmentsTest(TestCase):
+    ''' Class to test the attachments module. '''
+
+    def setUp(self) -> None:
+        ''' Logger, store and temporary directory setup. '''
+
+        self.logger = app_log(__name__)
+        self.store = at.AttachmentStore()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        ''' Removes the temporary directory. '''
+
+        self.temp_dir.cleanup()
+
+    def write(self, name: str, content: bytes) -> str:
+        ''' Writes a file into the temporary directory. '''
+
+        path = os.path.join(self.temp_dir.name, name)
+
+        with open(path, "wb") as file:
+            file.write(content)
+
+        return path
+
+    def test_load(self) -> None:
+        ''' Tests that a file is read once and copies share the content. '''
+
+        path = self.write("code.py", "print('ä')\nprint(2)\n".encode())
+        copy = os.path.join(self.temp_dir.name, "copy.py")
+        shutil.copy(path, copy)
+
+        with mock.patch.object(self.store, "read",
+                               wraps=self.store.read) as read:
+            attachment = self.store.load(path)
+
+            self.assertIs(self.store.load(path), attachment)
+            self.assertIs(self.store.load(copy), attachment)
+            self.assertEqual(read.call_count, 2)
+
+        self.assertEqual(attachment.text, "print('ä')\nprint(2)\n")
+        self.assertEqual(attachment.line_count(), 2)
+        self.assertEqual(attachment.lines(1), "print(2)\n")
+
+        # A modified file is read again.
+        os.utime(path, ns=(0, 0))
+        self.write("code.py", b"changed\n")
+        os.utime(path, ns=(0, 0))
+
+        self.assertEqual(self.store.load(path).text, "changed\n")
+
+    def test_binary(self) -> None:
+        ''' Tests that binary and non UTF-8 files are rejected. '''
+
+        binary = self.write("image.png", b"\x89PNG\r\n\x1a\n\x00\x00")
+        latin = self.write("latin.txt", "caf\xe9\n".encode("latin-1"))
+        late = self.write("late.txt", b"a" * 10000 + b"\xff")
+
+        for path in (binary, latin, late):
+            with self.assertRaises(at.AttachmentError):
+                self.store.load(path)
+
+        self.assertEqual(self.store.load(self.write("empty.txt", b"")).text,
+                         "")
+
+    def test_evict(self) -> None:
+        ''' Tests that evicted contents are dropped with their files. '''
+
+        store = at.AttachmentStore(max_chars=10)
+        first = self.write("first.txt", b"12345678\n")
+        second = self.write("second.txt", b"abcdefgh\n")
+
+        attachment = store.load(first)
+        self.assertNotIn("line_index", vars(attachment))
+
+        store.load(second)
+
+        self.assertEqual(len(store.attachments), 1)
+        self.assertEqual(len(store.digests), 1)
+        self.assertEqual(store.load(first).text, "12345678\n")
+
+    def test_ask(self) -> None:
+        ''' Tests that a binary attachment is reported as an error. '''
+
+        binary = self.write("data.bin", b"\x00\x01\x02")
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(da.backend.client, "chat") as chat:
+            response = conversation.ask("What is this?", binary)
+
+        self.assertTrue(response.startswith("error"))
+        self.assertEqual(chat.call_count, 0)
+        self.assertEqual(conversation.messages, [])
+
+    def test_references(self) -> None:
+        ''' Tests that a file attached again is sent as a reference. '''
+
+        text = "def main():\n    pass\n" * 50
+        path = self.write("main.py", text.encode())
+        reply = {"message": {"role": "assistant", "content": "ok"}}
+
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(da, "attachment_store", self.store), \
+                mock.patch.object(da, "store"), \
+                mock.patch.object(da.backend.client, "chat",
+                                  return_value=reply) as chat:
+
+            for query in ("explain in detail" + "." * 400, "improve",
+                          "test"):
+                conversation.ask(query, path)
+
+        messages = chat.call_args.kwargs["messages"]
+        contents = "".join(message["content"] for message in messages)
+
+        self.assertEqual(len(conversation.blobs), 1)
+        self.assertEqual(contents.count(text), 1)
+        self.assertEqual(contents.count("[same file as above: main.py]"), 2)
+
+        # The message with the content is dropped, the oldest kept
+        # reference carries the content.
+        with mock.patch.object(conversation.context_window, "budget",
+                               return_value=350):
+            messages = conversation.request_messages()
+
+        self.assertEqual(messages[1]["content"], f"improve \n {text}")
+        self.assertLessEqual(sum(message_tokens(message)
+                                 for message in messages), 350)
+
+        # A reference which carries the content is dropped as well if it
+        # does not fit into the budget.
+        with mock.patch.object(conversation.context_window, "budget",
+                               return_value=100):
+            messages = conversation.request_messages()
+
+        contents = "".join(message["content"] for message in messages)
+
+        self.assertLessEqual(sum(message_tokens(message)
+                                 for message in messages), 100)
+        self.assertNotIn(text, contents)
+        self.assertNotIn("[same file as above: main.py]", contents)
+
+    def test_diff(self) -> None:
+        ''' Tests that a changed file is sent as a diff. '''
+
+        lines = [f"line {idx}\n" for idx in range(100)]
+        path = self.write("foo.py", "".join(lines).encode())
+
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(da, "attachment_store", self.store):
+            conversation.add_query("review", path)
+
+            lines[50] = "changed line\n"
+            self.write("foo.py", "".join(lines).encode())
+            os.utime(path, ns=(1, 1))
+            conversation.add_query("again", path)
+
+            self.write("foo.py", b"new\n")
+            os.utime(path, ns=(2, 2))
+            conversation.add_query("rewritten", path)
+
+        messages = conversation.request_messages()
+
+        self.assertIn("[changes of foo.py since the version above:]",
+                      messages[1]["content"])
+        self.assertIn("-line 50\n+changed line", messages[1]["content"])
+        self.assertNotIn("line 10\n", messages[1]["content"])
+
+        # The diff is larger than the file.
+        self.assertEqual(messages[2]["content"], "rewritten \n new\n")
+
+    def test_derived_cache(self) -> None:
+        ''' Tests that derived texts are bounded and keyed by content. '''
+
+        cache = at.DerivedCache(max_chars=10)
+        cache.put("a", "x" * 6)
+        cache.put("b", at.Attachment("b", "y" * 4))
+        cache.get("a")
+        cache.put("c", "z" * 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "x" * 6)
+        self.assertEqual(cache.chars, 9)
+
+        cache.put("d", "w" * 11)
+        self.assertIsNone(cache.get("d"))
+
+        # A copy of an attachment shares the cached diff.
+        old = at.Attachment("old", "a\n")
+        new = at.Attachment("new", "b\n")
+
+        with mock.patch.object(da, "derived_cache", at.DerivedCache()):
+            diff = da.file_diff(old, new, "foo.py")
+            self.assertIs(da.file_diff(at.Attachment("old", "a\n"),
+                                       at.Attachment("new", "b\n"),
+                                       "foo.py"), diff)
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/attachments_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -0,0 +1,164 @@
+'''
+test_code_pruning.py -- testing the code_pruning module.
+'''
+
+import sys
+import os
+import ast
+import tempfile
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import code_pruning as cp
+    from utils_dev_assist import dev_assist as da
+
+except ImportError:
+    pass
+
+
+SOURCE = '''import os
+
+LIMIT = 10
+
+
+def read_config(path):
+    """Reads the config file."""
+    with open(path) as file:
+        return file.read()
+
+
+def parse_config(path):
+    text = read_config(path)
+    return text.split()
+
+
+def load_settings():
+    return parse_config("settings.cfg")
+
+
+@staticmethod
+def unrelated(value):
+    """Not used by the config functions."""
+    total = 0
+    for idx in range(value):
+        total += idx
+    return total
+
+
+class Server:
+    """A server."""
+
+    port = 8080
+
+    def start(self):
+        return self.listen()
+
+    def listen(self):
+        return os.getpid()
+'''
+
+
+class CodePruningTest(TestCase):
+    ''' Class to test the code_pruning module. '''
+
+    def setUp(self) -> None:
+        ''' Logger setup. '''
+
+        self.logger = app_log(__name__)
+
+    def test_relevant_names(self) -> None:
+        ''' Tests that the callees and callers of a function are found. '''
+
+        tree = ast.parse(SOURCE)
+
+        self.assertEqual(cp.relevant_names(tree, "Why does parse_config"
+                                                 " fail?"),
+                         {"parse_config", "read_config", "load_settings"})
+        self.assertEqual(cp.relevant_names(tree, "explain this"), set())
+
+    def test_prune_python(self) -> None:
+        ''' Tests that other functions keep their signature only. '''
+
+        pruned = cp.prune_python(SOURCE, "What does parse_config return?")
+
+        ast.parse(pruned)
+
+        self.assertIn("    with open(path) as file:", pruned)
+        self.assertIn("    return parse_config(", pruned)
+        self.assertIn("@staticmethod\ndef unrelated(value):\n"
+                      '    """Not used by the config functions."""\n'
+                      "    ...\n", pruned)
+        self.assertNotIn("total += idx", pruned)
+        self.assertIn("    port = 8080", pruned)
+        self.assertIn("    def start(self):\n        ...\n", pruned)
+        self.assertTrue(pruned.startswith("import os\n\nLIMIT = 10\n"))
+
+        # A method keeps its class and the methods it calls.
+        pruned = cp.prune_python(SOURCE, "Server.start")
+
+        self.assertIn("        return self.listen()", pruned)
+        self.assertIn("        return os.getpid()", pruned)
+        self.assertNotIn("text.split()", pruned)
+
+        self.assertIsNone(cp.prune_python(SOURCE, "summarize"))
+        self.assertIsNone(cp.prune_python("def broken(:\n", "broken"))
+
+    def test_ask(self) -> None:
+        ''' Tests that an attached Python file is sent pruned. '''
+
+        reply = {"message": {"role": "assistant", "content": "ok"}}
+
+        with tempfile.NamedTemporaryFile("w", suffix=".py",
+                                         delete=False) as file:
+            file.write(SOURCE)
+
+        conversation = da.Conversation("test_model")
+        conversation.prune_code = True
+
+        try:
+            with mock.patch.object(da, "store"), \
+                    mock.patch.object(da.backend.client, "chat",
+                                      return_value=reply) as chat:
+
+                conversation.ask("explain load_settings", file.name)
+
+        finally:
+            os.remove(file.name)
+
+        content = chat.call_args.kwargs["messages"][-1]["content"]
+
+        self.assertIn("estimated tokens left out:]", content)
+        self.assertIn('    return parse_config("settings.cfg")', content)
+        self.assertNotIn("total += idx", content)
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/code_pruning_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
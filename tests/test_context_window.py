@@ -0,0 +1,123 @@
+'''
+test_context_window.py -- testing the context_window module.
+'''
+
+import sys
+import os
+import unittest
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import context_window as cw
+
+except ImportError:
+    pass
+
+
+def message(role: str, tokens: int) -> dict:
+    ''' Returns a message of the given size in tokens. '''
+
+    content = "x" * ((tokens - cw.MESSAGE_OVERHEAD) * cw.CHARS_PER_TOKEN)
+
+    return {"role": role, "content": content}
+
+
+class ContextWindowTest(TestCase):
+    ''' Class to test the context_window module. '''
+
+    def setUp(self) -> None:
+        ''' Logger setup. '''
+
+        self.logger = app_log(__name__)
+        self.messages = [message("system", 10),
+                         message("user", 50),
+                         message("assistant", 50),
+                         message("user", 50),
+                         message("assistant", 50),
+                         message("user", 20)]
+
+    def test_estimate_tokens(self) -> None:
+        ''' Tests the estimate_tokens function. '''
+
+        self.assertEqual(cw.estimate_tokens(""), 0)
+        self.assertEqual(cw.estimate_tokens("abcde"), 2)
+        self.assertEqual(cw.message_tokens(message("user", 20)), 20)
+
+    def test_drop_oldest(self) -> None:
+        ''' Tests the drop_oldest policy with and without pins. '''
+
+        self.assertEqual(cw.drop_oldest(self.messages, 120, set()),
+                         [3, 4, 5])
+
+        self.assertEqual(cw.drop_oldest(self.messages, 120, {0}),
+                         [0, 4, 5])
+
+        # The latest message is always kept.
+        self.assertEqual(cw.drop_oldest(self.messages, 5, set()), [5])
+
+    def test_keep_system_last_n(self) -> None:
+        ''' Tests the keep_system_last_n policy. '''
+
+        policy = cw.keep_system_last_n(2)
+
+        self.assertEqual(policy(self.messages, 1000, set()), [0, 4, 5])
+        self.assertEqual(policy(self.messages, 40, set()), [0, 5])
+
+        # A pinned message within the last messages is counted once, the
+        # budget fits all of them exactly.
+        policy = cw.keep_system_last_n(3)
+
+        self.assertEqual(policy(self.messages, 130, {4}), [0, 3, 4, 5])
+        self.assertEqual(policy(self.messages, 129, {4}), [0, 4, 5])
+
+    def test_fit(self) -> None:
+        ''' Tests the fit and usage methods of the ContextWindow class. '''
+
+        window = cw.ContextWindow(policy="drop_oldest")
+        window.settings = {"default_ctx": 220,
+                           "reserve": 100,
+                           "policy": "drop_oldest",
+                           "models": {"big": 10000}}
+
+        self.assertEqual(window.fit(self.messages, "small"),
+                         self.messages[3:])
+        self.assertEqual(window.usage(self.messages, "small"), (120, 120))
+        self.assertEqual(window.fit(self.messages, "big"), self.messages)
+
+        # Only a configured context size is sent to the server.
+        self.assertEqual(window.options("big"), {"num_ctx": 10000})
+        self.assertEqual(window.options("small"), {})
+
+        window.pin(1)
+        self.assertEqual(window.fit(self.messages, "small"),
+                         [self.messages[1]] + self.messages[4:])
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/context_window_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -0,0 +1,105 @@
+'''
+test_conversation_store.py -- testing the conversation_store module.
+'''
+
+import sys
+import os
+import unittest
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import conversation_store as cs
+
+except ImportError:
+    pass
+
+
+class ConversationStoreTest(TestCase):
+    ''' Class to test the conversation_store module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and in-memory store setup. '''
+
+        self.logger = app_log(__name__)
+        self.store = cs.ConversationStore(":memory:")
+
+    def tearDown(self) -> None:
+        ''' Closes the store. '''
+
+        self.store.close()
+
+    def test_list_sessions(self) -> None:
+        ''' Tests that the latest updated session is listed first. '''
+
+        first = self.store.create_session("first", "model")
+        second = self.store.create_session("second", "model")
+
+        self.store.add_messages(first, [{"role": "user", "content": "hi"}])
+
+        sessions = self.store.list_sessions()
+
+        self.assertEqual([stored["id"] for stored in sessions],
+                         [first, second])
+        self.assertEqual(sessions[0]["message_count"], 1)
+
+    def test_load_page(self) -> None:
+        ''' Tests loading the messages of a session page by page. '''
+
+        session_id = self.store.create_session("paging", "model")
+        messages = [{"role": "user", "content": f"message {idx}" * 100}
+                    for idx in range(5)]
+
+        self.store.add_messages(session_id, messages)
+
+        page = self.store.load_page(session_id, limit=2)
+
+        self.assertEqual([message["content"] for message in page],
+                         [messages[3]["content"], messages[4]["content"]])
+        self.assertTrue(self.store.has_older(session_id, page[0]["id"]))
+
+        page = self.store.load_page(session_id, page[0]["id"], limit=5)
+
+        self.assertEqual(len(page), 3)
+        self.assertFalse(self.store.has_older(session_id, page[0]["id"]))
+
+    def test_delete_session(self) -> None:
+        ''' Tests that deleting a session removes its messages. '''
+
+        session_id = self.store.create_session("delete", "model")
+        self.store.add_messages(session_id, [{"role": "user",
+                                              "content": "hi"}])
+
+        self.store.delete_session(session_id)
+
+        self.assertEqual(self.store.list_sessions(), [])
+        self.assertEqual(self.store.load_page(session_id), [])
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/conversation_store_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -5,6 +5,10 @@ test_dev_assist.py--tests the dev_assist.py module.
 import sys
 import os
 import unittest
+import json
+import threading
+from unittest import mock
+import httpx
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
@@ -16,6 +20,20 @@ except ImportError:
     pass
 
 
+def mock_http_client(parts: list) -> httpx.Client:
+    '''
+    Returns a HTTP client which answers every request with a stream of
+    the given response parts.
+    '''
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        lines = "".join(f"{json.dumps(part)}\n" for part in parts)
+        return httpx.Response(200, content=lines.encode("utf-8"))
+
+    return httpx.Client(base_url="http://test",
+                        transport=httpx.MockTransport(handler))
+
+
 class TestDevAssist(unittest.TestCase):
     '''
     Class for testing the functions of the dev_assist.py module.
@@ -74,6 +92,102 @@ class TestDevAssist(unittest.TestCase):
         self.assertIsNot(da.chat(llm1),
                          "\n\n[Error]  -->  Model name is required!")
 
+    def test_chat_stream(self) -> None:
+        '''
+        Tests the chat_stream() function with a mocked stream.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        parts = [{"message": {"content": "Hello"}},
+                 {"message": {"content": " world"}}]
+
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(da, "http_client", mock_http_client(parts)), \
+             mock.patch.object(da, "store") as mock_store:
+
+            chunks = list(conversation.ask("Hi", stream=True))
+
+        mock_store.add_messages.assert_called_once()
+
+        self.assertEqual(chunks, ["\n\u27BE Response: \nHello",
+                                  " world",
+                                  "\n\n"])
+        self.assertEqual(conversation.messages,
+                         [{"role": "user", "content": "Hi"},
+                          {"role": "assistant", "content": "Hello world"}])
+
+    def test_cancel(self) -> None:
+        '''
+        Tests that a cancelled request rolls the chat log back.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        parts = [{"message": {"content": "Hello"}},
+                 {"message": {"content": " world"}}]
+
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(da, "http_client", mock_http_client(parts)), \
+             mock.patch.object(da, "store") as mock_store:
+
+            stream = conversation.ask("Hi", stream=True)
+            next(stream)
+
+            conversation.cancel()
+            chunks = list(stream)
+
+        mock_store.add_messages.assert_not_called()
+
+        self.assertEqual(chunks, [da.STOPPED])
+        self.assertEqual(conversation.messages, [])
+
+    def test_conversations(self) -> None:
+        '''
+        Tests that conversations running at the same time keep their own
+        chat logs.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        def reply(model, messages, options, keep_alive):
+            return {"message": {"content": messages[-1]["content"].upper()}}
+
+        conversations = [da.Conversation(f"model{idx}") for idx in range(4)]
+
+        with mock.patch.object(da.backend.client, "chat",
+                               side_effect=reply), \
+             mock.patch.object(da, "store"):
+
+            threads = [threading.Thread(target=conversation.ask,
+                                        args=(f"query {idx}",))
+                       for idx, conversation in enumerate(conversations)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        for idx, conversation in enumerate(conversations):
+            self.assertEqual([message["content"]
+                              for message in conversation.messages],
+                             [f"query {idx}", f"QUERY {idx}"])
+
     def test_ask(self) -> None:
         '''
         Tests the ask() function with valid and invalid inputs.
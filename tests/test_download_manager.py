@@ -0,0 +1,205 @@
+'''
+test_download_manager.py -- testing the download_manager module.
+'''
+
+import sys
+import os
+import time
+import asyncio
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    import ollama
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import download_manager as dm
+    from utils_dev_assist.async_engine import AsyncEngine
+
+except ImportError:
+    pass
+
+
+class FakeClient:
+    ''' Streams the progress of a pull with two layers. '''
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def pull(self, model: str, stream: bool = False):
+        ''' Returns a stream of progress responses. '''
+
+        async def progress():
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+            try:
+                yield ollama.ProgressResponse(status="pulling manifest")
+
+                for completed in (0, 50, 100):
+                    await asyncio.sleep(self.delay)
+
+                    for digest in ("sha256:a", "sha256:b"):
+                        yield ollama.ProgressResponse(
+                                        status=f"pulling {digest}",
+                                        digest=digest,
+                                        total=100,
+                                        completed=completed)
+
+                yield ollama.ProgressResponse(status="success")
+
+            finally:
+                self.running -= 1
+
+        return progress()
+
+
+class DownloadManagerTest(TestCase):
+    ''' Class to test the download_manager module. '''
+
+    def setUp(self) -> None:
+        ''' Logger, engine and manager setup. '''
+
+        self.logger = app_log(__name__)
+        self.engine = AsyncEngine()
+        self.progress = []
+        self.done = []
+
+    def tearDown(self) -> None:
+        ''' Stops the engine. '''
+
+        self.engine.close()
+
+    def manager(self, delay: float = 0,
+                parallel: int = 2) -> "dm.DownloadManager":
+        ''' Returns a manager with a fake client and test subscribers. '''
+
+        self.engine.client = FakeClient(delay)
+
+        manager = dm.DownloadManager(self.engine, parallel)
+        manager.subscribe(
+                lambda download: self.progress.append(download.status),
+                lambda download: self.done.append((download.model,
+                                                   download.status)))
+
+        return manager
+
+    def test_download(self) -> None:
+        ''' Tests that the layers are summed up and the end notified. '''
+
+        manager = self.manager()
+
+        with mock.patch.object(dm.lm, "forget_digest") as forget:
+            download = manager.enqueue("test_model")
+            message = download.future.result(timeout=5)
+
+        self.engine.process_results()
+
+        self.assertIn("has been downloaded", message)
+        forget.assert_called_once_with("test_model")
+        self.assertEqual((download.completed, download.total), (200, 200))
+        self.assertEqual(download.progress(), 1)
+        self.assertGreaterEqual(len(self.progress), 3)
+        self.assertEqual(self.done, [("test_model", "done")])
+        self.assertEqual(download.describe(), "test_model: done")
+
+    def test_queue(self) -> None:
+        ''' Tests that only 'parallel' models are pulled at once. '''
+
+        manager = self.manager(delay=0.05, parallel=1)
+
+        with mock.patch.object(dm.lm, "forget_digest"):
+            first = manager.enqueue("first")
+            second = manager.enqueue("second")
+
+            self.assertIs(manager.enqueue("second"), second)
+
+            time.sleep(0.05)
+            self.assertEqual(second.status, "queued")
+
+            first.future.result(timeout=5)
+            second.future.result(timeout=5)
+
+        self.assertEqual(self.engine.client.max_running, 1)
+
+    def test_cancel_resume(self) -> None:
+        ''' Tests that a cancelled download can be resumed. '''
+
+        manager = self.manager(delay=0.1)
+
+        with mock.patch.object(dm.lm, "forget_digest"):
+            download = manager.enqueue("test_model")
+
+            while download.total == 0:
+                time.sleep(0.01)
+
+            manager.cancel("test_model")
+
+            with self.assertRaises(Exception):
+                download.future.result(timeout=5)
+
+            self.assertFalse(download.is_active())
+
+            # The subscribers get the download in its current state.
+            self.engine.process_results()
+
+            resumed = manager.resume("test_model")
+            resumed.future.result(timeout=5)
+
+        self.engine.process_results()
+
+        self.assertIs(resumed, download)
+        self.assertEqual(self.done, [("test_model", "cancelled"),
+                                     ("test_model", "done")])
+
+        manager.remove("test_model")
+        self.assertEqual(manager.downloads, {})
+
+    def test_describe(self) -> None:
+        ''' Tests the throughput and the remaining time. '''
+
+        download = dm.Download("big_model")
+        download.future = mock.Mock(done=lambda: False)
+        download.sample = (time.monotonic() - 1, 0)
+
+        download.update(ollama.ProgressResponse(status="pulling sha256:a",
+                                                digest="sha256:a",
+                                                total=4_000_000_000,
+                                                completed=1_000_000_000))
+
+        self.assertAlmostEqual(download.rate, 1e9, delta=1e8)
+        self.assertAlmostEqual(download.eta(), 3, delta=0.5)
+        self.assertTrue(download.describe().startswith(
+                                    "big_model: 25% of 4.0 GB, "))
+        self.assertEqual(dm.format_bytes(512), "512 B")
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/download_manager_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
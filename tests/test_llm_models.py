@@ -50,7 +50,7 @@ class LLMTest(TestCase):
         info_type = "test_info_type"
         
         # Mock the requests.post call to return a specific response
-        with mock.patch('requests.post') as mock_request:
+        with mock.patch.object(lm.backend.http, "post") as mock_request:
             mock_response = mock.Mock()
             mock_response.text = '{"test_info_type": "test_info"}'
             mock_request.return_value = mock_response
@@ -58,6 +58,58 @@ class LLMTest(TestCase):
             result = lm.show_model_info(model, info_type)
             self.assertEqual(result, "TEST_INFO_TYPE:\ntest_info\n\n")
 
+    def test_model_info(self) -> None:
+        ''' Tests that the metadata is fetched once for each digest. '''
+
+        response = mock.Mock(text='{"modelfile": "FROM base",'
+                                  ' "license": "MIT"}')
+
+        with mock.patch.object(lm.backend.http, "post",
+                               return_value=response) as post, \
+                mock.patch.dict(lm.model_digests,
+                                {"cached_model:latest": "sha256:1"}), \
+                mock.patch.dict(lm.model_metadata):
+
+            for info_type in ("modelfile", "license", "modelfile"):
+                lm.show_model_info("cached_model", info_type)
+
+            self.assertEqual(post.call_count, 1)
+            self.assertIn("MIT", lm.show_model_info("cached_model",
+                                                    "license"))
+
+            # A pulled, created or deleted model is fetched again.
+            lm.forget_digest("cached_model")
+            lm.model_digests["cached_model:latest"] = "sha256:2"
+            lm.show_model_info("cached_model", "modelfile")
+
+            self.assertEqual(post.call_count, 2)
+            self.assertNotIn("sha256:1", lm.model_metadata)
+
+    def test_model_name(self) -> None:
+        ''' Tests that a model without a tag is found by its full name. '''
+
+        self.assertEqual(lm.model_name("llama3"), "llama3:latest")
+        self.assertEqual(lm.model_name("llama3:8b"), "llama3:8b")
+        self.assertEqual(lm.model_name("host:5000/team/llama3"),
+                         "host:5000/team/llama3:latest")
+
+        with mock.patch.dict(lm.model_digests,
+                             {"llama3:latest": "sha256:1"}):
+
+            self.assertEqual(lm.model_digest("llama3"), "sha256:1")
+
+            lm.forget_digest("llama3")
+            self.assertNotIn("llama3:latest", lm.model_digests)
+
+        # The metadata of a pulled model is dropped by its short name.
+        with mock.patch.dict(lm.model_metadata,
+                             {"sha256:1": {}, "llama3:latest": {}}), \
+                mock.patch.dict(lm.model_digests,
+                                {"llama3:latest": "sha256:1"}):
+
+            lm.forget_digest("llama3")
+            self.assertEqual(lm.model_metadata, {})
+
     def test_delete_model(self) -> None:
         ''' Test the delete_model function. '''
 
@@ -0,0 +1,186 @@
+'''
+test_map_reduce.py -- testing the map_reduce module.
+'''
+
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist.context_window import estimate_tokens
+    from utils_dev_assist import map_reduce as mr
+    from utils_dev_assist import dev_assist as da
+
+except ImportError:
+    pass
+
+
+class FakeChat:
+    ''' Answers the part requests and counts the parallel requests. '''
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.prompts = []
+
+    async def __call__(self, messages: list) -> str:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.prompts.append(messages[-1]["content"])
+
+        await asyncio.sleep(0.01)
+
+        self.running -= 1
+        return f"answer {len(self.prompts)}"
+
+
+class MapReduceTest(TestCase):
+    ''' Class to test the map_reduce module. '''
+
+    def setUp(self) -> None:
+        ''' Logger setup. '''
+
+        self.logger = app_log(__name__)
+
+    def test_split_text(self) -> None:
+        ''' Tests that the chunks fit and keep the whole text. '''
+
+        text = "".join(f"line {idx}\n" for idx in range(500))
+        text += "x" * 1000 + "\n"
+
+        chunks = mr.split_text(text, 100)
+
+        self.assertEqual("".join(chunks), text)
+        self.assertTrue(all(estimate_tokens(chunk) <= 100
+                            for chunk in chunks))
+        self.assertTrue(all(chunk.endswith("\n") for chunk in chunks[:5]))
+
+    def test_reduce_prompt(self) -> None:
+        ''' Tests the parallel map requests and the final prompt. '''
+
+        chat = FakeChat()
+        progress = []
+        text = "".join(f"line {idx}\n" for idx in range(1000))
+
+        prompt = asyncio.run(mr.reduce_prompt(
+                                    chat, "summarize", "/tmp/big.log", text,
+                                    budget=500,
+                                    on_progress=lambda done, parts:
+                                        progress.append((done, parts)),
+                                    parallel=3))
+
+        parts = progress[-1][1]
+
+        self.assertGreater(parts, 1)
+        self.assertEqual([done for done, _ in progress],
+                         list(range(1, parts + 1)))
+        self.assertEqual(chat.max_running, 3)
+        self.assertTrue(prompt.startswith("summarize"))
+        self.assertIn(f"processed in {parts} parts", prompt)
+        self.assertIn("Part 1:\nanswer", prompt)
+
+    def test_reduce_answers(self) -> None:
+        ''' Tests that answers are combined until they fit the limit. '''
+
+        chat = FakeChat()
+        answers = [f"{idx} " * 50 for idx in range(8)]
+
+        reduced = asyncio.run(mr.reduce_answers(chat, "query", "file",
+                                                answers, limit=100))
+
+        self.assertLess(len(reduced), len(answers))
+        self.assertLessEqual(estimate_tokens(mr.join_answers(reduced)), 100)
+
+    def test_ask(self) -> None:
+        ''' Tests that the chat log keeps a reference to a large file. '''
+
+        with tempfile.NamedTemporaryFile("w", suffix=".log",
+                                         delete=False) as file:
+            file.write("error line\n" * 10000)
+
+        conversation = da.Conversation("test_model")
+        prompts = []
+        lock = threading.Lock()
+
+        def chat(**kwargs) -> dict:
+            content = kwargs["messages"][-1]["content"]
+
+            with lock:
+                prompts.append(content)
+                count = len(prompts)
+
+            if not content.startswith("The following"):
+                return {"message": {"role": "assistant",
+                                    "content": "combined"}}
+
+            # The second request is cancelled while its parts are sent.
+            if "count again" in content:
+                conversation.cancel()
+
+            return {"message": {"content": f"answer {count}"}}
+
+        progress = []
+
+        try:
+            with mock.patch.object(da, "store"), \
+                    mock.patch.object(da.backend.client, "chat",
+                                      side_effect=chat) as final:
+
+                response = conversation.ask(
+                            "count the errors", file.name,
+                            on_progress=lambda *done: progress.append(done))
+                request = final.call_args.kwargs["messages"][-1]["content"]
+                parts = progress[-1][1]
+
+                prompts.clear()
+                stopped = conversation.ask("count again", file.name)
+
+        finally:
+            os.remove(file.name)
+
+        self.assertIn("combined", response)
+        self.assertGreater(parts, mr.NUM_PARALLEL)
+        self.assertEqual(progress[-1][0], parts)
+        self.assertIn("Part 1:\nanswer", request)
+
+        # No part is sent after the cancel.
+        self.assertEqual(stopped, da.STOPPED)
+        self.assertLessEqual(len(prompts), mr.NUM_PARALLEL)
+        self.assertEqual(len(conversation.messages), 2)
+        self.assertEqual(conversation.messages[0]["content"],
+                         mr.reference("count the errors", file.name))
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/map_reduce_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -0,0 +1,142 @@
+'''
+test_model_registry.py -- testing the model_registry module.
+'''
+
+import sys
+import os
+import unittest
+from unittest import TestCase
+from concurrent.futures import Future
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import model_registry as mr
+
+except ImportError:
+    pass
+
+
+class FakeEngine:
+    ''' Returns the given lists and keeps the callbacks like the engine. '''
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.pending = []
+        self.calls = 0
+
+    def list_future(self, callback) -> Future:
+        self.calls += 1
+        future = Future()
+        result = self.results.pop(0)
+
+        if isinstance(result, Exception):
+            future.set_exception(result)
+
+        else:
+            future.set_result(result)
+
+        self.pending.append((callback, future))
+        return future
+
+    def process_results(self) -> None:
+        while self.pending:
+            callback, future = self.pending.pop(0)
+            callback(future)
+
+
+class ModelRegistryTest(TestCase):
+    ''' Class to test the model_registry module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and subscriber setup. '''
+
+        self.logger = app_log(__name__)
+        self.changes = []
+        self.errors = []
+
+    def registry(self, engine: FakeEngine,
+                 ttl: float = 60) -> "mr.ModelRegistry":
+        ''' Returns a registry with the test subscribers. '''
+
+        registry = mr.ModelRegistry(engine, ttl=ttl)
+        registry.subscribe(self.changes.append, self.errors.append)
+
+        return registry
+
+    def test_ttl(self) -> None:
+        ''' Tests that a fresh list is not fetched again. '''
+
+        engine = FakeEngine(["a:latest"], ["a:latest", "b:latest"])
+        registry = self.registry(engine)
+
+        future = registry.refresh()
+        self.assertIs(registry.refresh(), future)
+        engine.process_results()
+
+        self.assertIsNone(registry.refresh())
+        self.assertEqual(engine.calls, 1)
+        self.assertEqual(self.changes, [["a:latest"]])
+
+        registry.invalidate()
+        engine.process_results()
+
+        self.assertEqual(engine.calls, 2)
+        self.assertEqual(registry.models, ["a:latest", "b:latest"])
+
+    def test_events(self) -> None:
+        ''' Tests that subscribers are only called for changes. '''
+
+        error = ConnectionError("server not running")
+        engine = FakeEngine(["a:latest"], ["a:latest"], error, error,
+                            "\n --> No models are installed! <-- \n\n")
+        registry = self.registry(engine, ttl=0)
+
+        for _ in range(5):
+            registry.refresh(force=True)
+            engine.process_results()
+
+        self.assertEqual(self.changes, [["a:latest"], []])
+        self.assertEqual(self.errors, [error])
+
+    def test_invalidate_during_fetch(self) -> None:
+        ''' Tests that a list invalidated during a fetch is fetched again. '''
+
+        engine = FakeEngine(["a:latest"], ["b:latest"])
+        registry = self.registry(engine)
+
+        registry.refresh()
+        registry.invalidate()
+        engine.process_results()
+        engine.process_results()
+
+        self.assertEqual(engine.calls, 2)
+        self.assertEqual(self.changes, [["a:latest"], ["b:latest"]])
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/model_registry_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
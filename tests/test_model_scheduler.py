@@ -0,0 +1,175 @@
+'''
+test_model_scheduler.py -- testing the model_scheduler module.
+'''
+
+import sys
+import os
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    import ollama
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import model_scheduler as ms
+    from utils_dev_assist.async_engine import AsyncEngine
+
+except ImportError:
+    pass
+
+
+class FakeClient:
+    ''' Keeps the resident models like the Ollama server. '''
+
+    def __init__(self, sizes: dict, resident: list):
+        self.sizes = sizes
+        self.resident = list(resident)
+        self.requests = []
+
+    async def ps(self) -> "ollama.ProcessResponse":
+        ''' Returns the resident models and their memory. '''
+
+        return ollama.ProcessResponse(
+                    models=[{"model": model, "size": self.sizes[model]}
+                            for model in self.resident])
+
+    async def generate(self, model: str, prompt: str, keep_alive,
+                       options: dict | None = None) -> dict:
+        ''' Loads or unloads a model. '''
+
+        self.requests.append((model, keep_alive))
+
+        if keep_alive == 0:
+            self.resident.remove(model)
+
+        elif model not in self.resident:
+            self.resident.append(model)
+
+        return {}
+
+
+class ModelSchedulerTest(TestCase):
+    ''' Class to test the model_scheduler module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and engine setup. '''
+
+        self.logger = app_log(__name__)
+        self.engine = AsyncEngine()
+        self.updates = []
+
+    def tearDown(self) -> None:
+        ''' Stops the engine. '''
+
+        self.engine.close()
+
+    def scheduler(self, resident: list,
+                  budget_gb: float = 10) -> "ms.ModelScheduler":
+        ''' Returns a scheduler with a fake client and a subscriber. '''
+
+        self.engine.client = FakeClient({"a": 4 * ms.GB, "b": 4 * ms.GB,
+                                         "c": 4 * ms.GB}, resident)
+
+        scheduler = ms.ModelScheduler(self.engine, budget_gb)
+        scheduler.pinned = set()
+        scheduler.subscribe(self.updates.append)
+
+        return scheduler
+
+    def test_plan(self) -> None:
+        ''' Tests that the least recently used models are unloaded. '''
+
+        resident = {"a": 4, "b": 4, "c": 4}
+        last_used = {"a": 3.0, "b": 1.0, "c": 2.0}
+
+        self.assertEqual(ms.plan(resident, last_used, set(), 12), [])
+        self.assertEqual(ms.plan(resident, last_used, set(), 8), ["b"])
+        self.assertEqual(ms.plan(resident, last_used, set(), 8, 4),
+                         ["b", "c"])
+        self.assertEqual(ms.plan(resident, last_used, {"b", "c"}, 4),
+                         ["a"])
+
+    def test_load(self) -> None:
+        ''' Tests that room is made for a model before it is loaded. '''
+
+        scheduler = self.scheduler(["a", "b"])
+        scheduler.sizes["c"] = 4 * ms.GB
+        scheduler.touch("b")
+        scheduler.touch("a")
+
+        with mock.patch.object(ms, "write_config_file"):
+            scheduler.pin("b")
+
+        future = scheduler.load_future("c")
+        self.assertEqual(future.result(timeout=5), "c")
+
+        self.engine.process_results()
+
+        # 'b' is pinned although it was used before 'a'.
+        self.assertEqual([request[0] for request
+                          in self.engine.client.requests], ["a", "c"])
+        self.assertEqual(self.engine.client.requests[0][1], 0)
+        self.assertEqual(sorted(scheduler.resident), ["b", "c"])
+        self.assertIn("c", scheduler.latencies)
+        self.assertEqual(list(scheduler.decisions)[0], "unloaded a")
+        self.assertTrue(scheduler.describe("c").startswith(
+                                            "c: 4.0 GB, loaded in "))
+        self.assertIs(self.updates[-1], scheduler)
+
+    def test_refresh(self) -> None:
+        ''' Tests that a poll unloads the models over the budget. '''
+
+        scheduler = self.scheduler(["a", "b", "c"], budget_gb=8)
+        scheduler.touch("c")
+
+        self.assertEqual(scheduler.refresh().result(timeout=5), ["a"])
+        self.assertEqual(scheduler.usage(), 8 * ms.GB)
+
+    def test_protected(self) -> None:
+        ''' Tests that models in use are kept over the budget. '''
+
+        scheduler = self.scheduler(["a", "b", "c"], budget_gb=2)
+        scheduler.select("a")
+        scheduler.touch("b")
+
+        # A request of 'c' is running.
+        self.engine.loop.call_soon_threadsafe(self.engine.request_started,
+                                              "c")
+
+        self.assertEqual(scheduler.refresh().result(timeout=5), [])
+        self.assertEqual(scheduler.protected(), {"a", "b", "c"})
+
+        self.engine.loop.call_soon_threadsafe(self.engine.request_finished,
+                                              "c")
+        scheduler.future = None
+
+        self.assertEqual(scheduler.refresh().result(timeout=5), ["c"])
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/model_scheduler_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -0,0 +1,99 @@
+'''
+test_ollama_backend.py -- testing the ollama_backend module.
+'''
+
+import sys
+import os
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import ollama_backend as ob
+    from utils_dev_assist import dev_assist as da
+    from utils_dev_assist import llm_models as lm
+
+except ImportError:
+    pass
+
+
+class OllamaBackendTest(TestCase):
+    ''' Class to test the ollama_backend module. '''
+
+    def setUp(self) -> None:
+        ''' Logger setup. '''
+
+        self.logger = app_log(__name__)
+
+    def test_host(self) -> None:
+        ''' Tests that the configured host is used before the variable. '''
+
+        with mock.patch.dict(os.environ, {"OLLAMA_HOST": "gpu-box:11434"}):
+            from_env = ob.Backend()
+            configured = ob.Backend("http://10.0.0.2:8080",
+                                    connect_timeout=3.0)
+
+        self.assertEqual(from_env.host, "http://gpu-box:11434")
+        self.assertEqual(configured.host, "http://10.0.0.2:8080")
+        self.assertEqual(str(configured.http.base_url),
+                         "http://10.0.0.2:8080")
+        self.assertEqual(configured.http.timeout.connect, 3.0)
+        self.assertIsNone(configured.http.timeout.read)
+        self.assertEqual(configured.environ()["OLLAMA_HOST"],
+                         "http://10.0.0.2:8080")
+
+        from_env.close()
+        configured.close()
+
+    def test_shared_pool(self) -> None:
+        ''' Tests that all requests share one connection pool. '''
+
+        self.assertIs(ob.backend.http._transport, ob.backend.transport)
+        self.assertIs(da.http_client, ob.backend.http)
+        self.assertIs(lm.backend, ob.backend)
+        self.assertEqual(da.OLLAMA_HOST, ob.backend.host)
+
+        _, http = ob.backend.async_clients()
+        self.assertEqual(str(http.base_url), ob.backend.host)
+
+    def test_parse_host(self) -> None:
+        ''' Tests the URLs of the server addresses. '''
+
+        self.assertEqual(ob.parse_host(None), "http://127.0.0.1:11434")
+        self.assertEqual(ob.parse_host(":56789"), "http://127.0.0.1:56789")
+        self.assertEqual(ob.parse_host("https://example.com"),
+                         "https://example.com:443")
+        self.assertEqual(ob.parse_host("example.com:56789/path/"),
+                         "http://example.com:56789/path")
+        self.assertEqual(ob.parse_host("[::1]:56789"),
+                         "http://[::1]:56789")
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/ollama_backend_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -0,0 +1,143 @@
+'''
+test_prompt_compression.py -- testing the prompt_compression module.
+'''
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import prompt_compression as pc
+    from utils_dev_assist import dev_assist as da
+
+except ImportError:
+    pass
+
+
+CODE = ("#!/usr/bin/env python3\n"
+        "# Copyright (c) 2024 Example\n"
+        "# Licensed under the MIT License.\n"
+        "\n"
+        "import os   \n"
+        "\n\n\n\n"
+        f"ICON = '{'QUJD' * 100}=='\n"
+        "def main():\t\n"
+        "    return os.getcwd()\n")
+
+LOG = ("2025-01-02 10:00:01 INFO started\n"
+       "2025-01-02 10:00:02 WARN retrying\n"
+       "2025-01-02 10:00:03 WARN retrying\n"
+       "2025-01-02 10:00:04 WARN retrying\n"
+       "2025-01-02 10:00:05 INFO done\n")
+
+
+class PromptCompressionTest(TestCase):
+    ''' Class to test the prompt_compression module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and settings setup. '''
+
+        self.logger = app_log(__name__)
+        self.settings = {"enabled": True,
+                         "code_rules": pc.CODE_RULES,
+                         "log_rules": pc.LOG_RULES,
+                         "log_extensions": [".log"]}
+
+    def test_code_rules(self) -> None:
+        ''' Tests the rules for source code. '''
+
+        compressed = pc.compress(CODE, "code", self.settings)
+
+        self.assertEqual(compressed,
+                         "#!/usr/bin/env python3\n"
+                         "[license header left out]\n\n"
+                         "import os\n\n"
+                         "ICON = '[base64 data, 402 chars]'\n"
+                         "def main():\n"
+                         "    return os.getcwd()\n")
+
+        # A header without a license is kept.
+        header = "# Script by the author.\n\nimport os\n"
+        self.assertEqual(pc.license_header(header), header)
+
+    def test_log_rules(self) -> None:
+        ''' Tests that repeated log lines are counted. '''
+
+        self.assertEqual(pc.compress(LOG, "log", self.settings),
+                         "2025-01-02 10:00:01 INFO started\n"
+                         "2025-01-02 10:00:02 WARN retrying\n"
+                         "[previous line repeated 2 times]\n"
+                         "2025-01-02 10:00:05 INFO done\n")
+
+        self.assertEqual(pc.text_kind("/var/log/app.log", self.settings),
+                         "log")
+        self.assertEqual(pc.text_kind("main.py", self.settings), "code")
+
+    def test_unknown_rule(self) -> None:
+        ''' Tests that an unknown rule is skipped. '''
+
+        self.settings["log_rules"] = ["missing", "blank_lines"]
+
+        self.assertEqual(pc.compress("a\n\n\n\nb\n", "log", self.settings),
+                         "a\n\nb\n")
+
+    def test_ask(self) -> None:
+        ''' Tests that an attached log file is sent compressed. '''
+
+        reply = {"message": {"role": "assistant", "content": "ok"}}
+
+        with tempfile.NamedTemporaryFile("w", suffix=".log",
+                                         delete=False) as file:
+            file.write(LOG)
+
+        conversation = da.Conversation("test_model")
+        conversation.compress = True
+
+        try:
+            with mock.patch.object(da, "store"), \
+                    mock.patch.dict(pc.settings, self.settings), \
+                    mock.patch.object(da.backend.client, "chat",
+                                      return_value=reply) as chat:
+
+                conversation.ask("why the retries?", file.name)
+
+        finally:
+            os.remove(file.name)
+
+        content = chat.call_args.kwargs["messages"][-1]["content"]
+
+        self.assertIn("[previous line repeated 2 times]", content)
+        self.assertEqual(content.count("retrying"), 1)
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/prompt_compression_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
@@ -0,0 +1,273 @@
+'''
+test_repo_index.py -- testing the repo_index module.
+'''
+
+import sys
+import os
+import zlib
+import tempfile
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    import numpy as np
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import repo_index as ri
+    from utils_dev_assist import dev_assist as da
+
+except ImportError:
+    pass
+
+
+def fake_embed(model: str, input: list) -> dict:
+    ''' Embeds texts as normalized bags of words. '''
+
+    embeddings = []
+
+    for text in input:
+        vector = np.zeros(64)
+
+        for word in text.replace("(", " ").replace(":", " ").split():
+            vector[zlib.crc32(word.encode()) % 64] += 1
+
+        embeddings.append(list(vector))
+
+    return {"embeddings": embeddings}
+
+
+FILES = {"app/parser.py": "def parse_tokens(text):\n    return text.split()"
+                          "\n\n\nclass Lexer:\n    pass\n",
+         "app/network.py": "def open_socket(host):\n    return host\n",
+         "README.md": "# Project\n\nA parser.\n",
+         "data.bin": "not indexed\n",
+         ".hidden/secret.py": "password = 1\n",
+         "__pycache__/cached.py": "x = 1\n"}
+
+
+class RepoIndexTest(TestCase):
+    ''' Class to test the repo_index module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and temporary folder setup. '''
+
+        self.logger = app_log(__name__)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "project")
+
+        for name, content in FILES.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(content)
+
+        self.index = ri.RepoIndex(self.root,
+                                  os.path.join(self.temp_dir.name, "index"),
+                                  embed_model="test_embed")
+
+    def tearDown(self) -> None:
+        ''' Closes the index and removes the temporary folder. '''
+
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def test_source_files(self) -> None:
+        ''' Tests that hidden, skipped and unknown files are left out. '''
+
+        self.assertEqual(sorted(ri.source_files(self.root)),
+                         ["README.md", os.path.join("app", "network.py"),
+                          os.path.join("app", "parser.py")])
+
+    def test_chunk_text(self) -> None:
+        ''' Tests that chunks start at definitions and keep the text. '''
+
+        text = "".join(f"def function_{idx}():\n" + "    x = 1\n" * 30
+                       for idx in range(10))
+
+        chunks = ri.chunk_text(text, ".py", max_tokens=100)
+
+        self.assertEqual("".join(chunk[2] for chunk in chunks), text)
+        self.assertTrue(all(chunk[2].startswith("def ") for chunk in chunks))
+        self.assertEqual(chunks[1][0], 31)
+
+    def test_search(self) -> None:
+        ''' Tests that the most similar chunk is found after a restart. '''
+
+        progress = []
+
+        with mock.patch.object(ri.backend.client, "embed",
+                               side_effect=fake_embed):
+            self.index.update(lambda done, total: progress.append(done))
+
+            index = ri.RepoIndex(self.root, self.index.path,
+                                 embed_model="test_embed")
+
+            self.assertTrue(index.is_built())
+            self.assertIsInstance(index.vectors, np.memmap)
+
+            chunks = index.search("open_socket host", top_k=1)
+            index.close()
+
+        self.assertEqual(progress[-1], 3)
+        self.assertEqual(chunks[0]["path"], os.path.join("app",
+                                                         "network.py"))
+
+    def test_update(self) -> None:
+        ''' Tests that only new and modified files are embedded again. '''
+
+        embedded = []
+
+        def counting_embed(model: str, input: list) -> dict:
+            embedded.extend(input)
+            return fake_embed(model, input)
+
+        parser = os.path.join(self.root, "app", "parser.py")
+        network = os.path.join(self.root, "app", "network.py")
+
+        with mock.patch.object(ri.backend.client, "embed",
+                               side_effect=counting_embed):
+            self.index.update()
+            embedded.clear()
+
+            # Touched without a change, modified, deleted and added files.
+            os.utime(os.path.join(self.root, "README.md"), ns=(1, 1))
+
+            with open(parser, "a", encoding="utf-8") as file:
+                file.write("\n\ndef close_lexer():\n    pass\n")
+
+            os.remove(network)
+
+            with open(os.path.join(self.root, "app", "cache.py"), "w",
+                      encoding="utf-8") as file:
+                file.write("def lru_cache_get(key):\n    return key\n")
+
+            result = self.index.update()
+
+            self.assertEqual(result, {"changed": 2, "touched": 1,
+                                      "deleted": 1})
+            self.assertTrue(all(text.startswith(os.path.join("app", ""))
+                                for text in embedded))
+            self.assertEqual(self.index.search("close_lexer",
+                                               top_k=1)[0]["path"],
+                             os.path.join("app", "parser.py"))
+            self.assertNotIn(os.path.join("app", "network.py"),
+                             self.index.manifest())
+
+            # The vectors of dropped chunks are removed by a compaction.
+            self.assertEqual(len(self.index.vectors), 5)
+            self.index.compact()
+
+            self.assertEqual(len(self.index.vectors), len(self.index.ids))
+            self.assertEqual(self.index.search("lru_cache_get key",
+                                               top_k=1)[0]["path"],
+                             os.path.join("app", "cache.py"))
+
+            self.assertEqual(self.index.update(), {"changed": 0,
+                                                   "touched": 0,
+                                                   "deleted": 0})
+
+    def test_empty_folder(self) -> None:
+        ''' Tests that the index of an empty folder is only built once. '''
+
+        root = os.path.join(self.temp_dir.name, "empty")
+        os.makedirs(root)
+
+        index = ri.RepoIndex(root,
+                             os.path.join(self.temp_dir.name, "empty_index"),
+                             embed_model="test_embed")
+
+        self.assertFalse(index.is_built())
+
+        with mock.patch.object(ri.backend.client, "embed",
+                               side_effect=fake_embed) as embed:
+            index.update()
+
+            self.assertTrue(index.is_built())
+            self.assertEqual(index.search("parser"), [])
+            embed.assert_not_called()
+
+        index.close()
+
+    def test_refresh(self) -> None:
+        ''' Tests the background update and its callbacks. '''
+
+        progress = []
+        results = []
+
+        with mock.patch.object(ri.backend.client, "embed",
+                               side_effect=fake_embed):
+            worker = self.index.refresh(
+                            lambda done, chunks: progress.append(done),
+                            results.append)
+
+            self.index.refresh(on_done=results.append).join(timeout=5)
+            worker.join(timeout=5)
+
+        self.assertEqual(results, [{"changed": 3, "touched": 0,
+                                    "deleted": 0}] * 2)
+        self.assertEqual(progress, [3])
+        self.assertTrue(self.index.is_built())
+
+    def test_add_query(self) -> None:
+        ''' Tests that an attached folder adds the relevant chunks. '''
+
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(ri.backend.client, "embed",
+                               side_effect=fake_embed), \
+                mock.patch.dict(ri.indexes, {self.root: self.index}):
+
+            conversation.add_query("parse_tokens text", self.root)
+
+        content = conversation.messages[0]["content"]
+
+        self.assertTrue(content.startswith("parse_tokens text"))
+        self.assertIn("[relevant parts of the folder project:]", content)
+        self.assertIn("def parse_tokens(text):", content)
+
+    def test_failed_build(self) -> None:
+        ''' Tests that a failed first build is reported to the user. '''
+
+        conversation = da.Conversation("test_model")
+
+        with mock.patch.object(ri.backend.client, "embed",
+                               side_effect=ConnectionError("no server")), \
+                mock.patch.dict(ri.indexes, {self.root: self.index}):
+
+            with self.assertRaises(ri.AttachmentError):
+                conversation.add_query("parse_tokens text", self.root)
+
+            response = conversation.ask("parse_tokens text", self.root)
+
+        self.assertIn("could not be built: no server", response)
+        self.assertEqual(conversation.messages, [])
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/repo_index_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
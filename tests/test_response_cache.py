@@ -0,0 +1,140 @@
+'''
+test_response_cache.py -- testing the response_cache module.
+'''
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import response_cache as rc
+    from utils_dev_assist import dev_assist as da
+
+except ImportError:
+    pass
+
+
+class ResponseCacheTest(TestCase):
+    ''' Class to test the response_cache module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and temporary cache directory setup. '''
+
+        self.logger = app_log(__name__)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = rc.ResponseCache(self.temp_dir.name, max_entries=2)
+
+    def tearDown(self) -> None:
+        ''' Removes the temporary cache directory. '''
+
+        self.temp_dir.cleanup()
+
+    def test_cache_key(self) -> None:
+        ''' Tests that the key depends on digest, messages and options. '''
+
+        messages = [{"role": "user", "content": "hi"}]
+        key = rc.cache_key("sha256:1", messages, {"temperature": 0})
+
+        self.assertEqual(key, rc.cache_key("sha256:1", list(messages),
+                                           {"temperature": 0}))
+        self.assertNotEqual(key, rc.cache_key("sha256:2", messages,
+                                              {"temperature": 0}))
+        self.assertNotEqual(key, rc.cache_key("sha256:1", messages,
+                                              {"temperature": 0,
+                                               "num_ctx": 2048}))
+
+    def test_tiers(self) -> None:
+        ''' Tests the memory LRU tier and the disk tier. '''
+
+        self.assertIsNone(self.cache.get("a"))
+
+        for key in ("a", "b", "c"):
+            self.cache.put(key, f"response {key}")
+
+        # 'a' was dropped from memory but is still stored on disk.
+        self.assertNotIn("a", self.cache.memory)
+        self.assertEqual(self.cache.get("a"), "response a")
+
+        self.assertEqual(self.cache.stats, {"memory_hits": 0,
+                                            "disk_hits": 1,
+                                            "misses": 1})
+
+        # A new cache reads the responses from disk.
+        cache = rc.ResponseCache(self.temp_dir.name)
+        self.assertEqual(cache.get("c"), "response c")
+
+    def test_evict(self) -> None:
+        ''' Tests that the disk tier is kept within its size limit. '''
+
+        self.cache.max_disk_bytes = 1000
+
+        for key in range(20):
+            self.cache.put(str(key), os.urandom(200).hex())
+
+        size = sum(os.path.getsize(os.path.join(self.temp_dir.name, name))
+                   for name in os.listdir(self.temp_dir.name))
+
+        self.assertLessEqual(size, 1000)
+        self.assertTrue(os.path.isfile(self.cache.file("19")))
+
+    def test_conversation(self) -> None:
+        ''' Tests that only deterministic requests are answered cached. '''
+
+        reply = {"message": {"role": "assistant", "content": "cached?"}}
+
+        conversation = da.Conversation("test_model", {"temperature": 0})
+        conversation.use_cache = True
+
+        with mock.patch.object(da, "response_cache", self.cache), \
+                mock.patch.object(da, "store"), \
+                mock.patch.object(da.lm, "model_digest",
+                                  return_value="sha256:1"), \
+                mock.patch.object(da.backend.client, "chat",
+                                  return_value=reply) as chat:
+
+            conversation.ask("Hi")
+            conversation.rollback(0)
+            response = conversation.ask("Hi")
+
+            self.assertEqual(chat.call_count, 1)
+            self.assertTrue(response.startswith(da.CACHED_HEADER))
+            self.assertEqual(conversation.messages[-1]["content"], "cached?")
+
+            conversation.options["temperature"] = 0.8
+            conversation.rollback(0)
+            conversation.ask("Hi")
+
+            self.assertEqual(chat.call_count, 2)
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/response_cache_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
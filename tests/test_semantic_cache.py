@@ -0,0 +1,176 @@
+'''
+test_semantic_cache.py -- testing the semantic_cache module.
+'''
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+from unittest import TestCase
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+try:
+    import numpy as np
+    from utils_dev_assist.dev_assist_logging import app_log
+    from utils_dev_assist import semantic_cache as sc
+    from utils_dev_assist import dev_assist as da
+
+except ImportError:
+    pass
+
+SETTINGS = {"enabled": True, "embed_model": "test_embed", "threshold": 0.9}
+
+
+def unit(*values: float) -> np.ndarray:
+    ''' Returns a normalized vector. '''
+
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class SemanticCacheTest(TestCase):
+    ''' Class to test the semantic_cache module. '''
+
+    def setUp(self) -> None:
+        ''' Logger and temporary index directory setup. '''
+
+        self.logger = app_log(__name__)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = sc.SemanticCache(self.temp_dir.name, dict(SETTINGS))
+
+    def tearDown(self) -> None:
+        ''' Removes the temporary index directory. '''
+
+        self.temp_dir.cleanup()
+
+    def test_lookup(self) -> None:
+        ''' Tests the threshold and that only answers of a model match. '''
+
+        self.assertIsNone(self.cache.lookup("model", unit(1, 0, 0)))
+
+        self.cache.add("model", "explain this regex", "answer",
+                       unit(1, 0, 0))
+        self.cache.add("other", "what does this regex do", "other answer",
+                       unit(1, 0.1, 0))
+
+        similar = self.cache.lookup("model", unit(1, 0.2, 0))
+
+        self.assertEqual(similar["answer"], "answer")
+        self.assertGreater(similar["similarity"], 0.9)
+
+        self.assertIsNone(self.cache.lookup("model", unit(1, 1, 0)))
+        self.assertIsNone(self.cache.lookup("unknown", unit(1, 0, 0)))
+
+    def test_persistence(self) -> None:
+        ''' Tests that the index is memory-mapped from disk by new caches. '''
+
+        self.cache.add("model", "query", "answer", unit(0, 1, 0))
+
+        cache = sc.SemanticCache(self.temp_dir.name, dict(SETTINGS))
+
+        self.assertIsInstance(cache.vectors, np.memmap)
+        self.assertEqual(cache.lookup("model", unit(0, 1, 0))["query"],
+                         "query")
+
+        # The index of another embedding model is cleared.
+        cache = sc.SemanticCache(self.temp_dir.name,
+                                 {**SETTINGS, "embed_model": "other"})
+
+        self.assertEqual(cache.entries, [])
+        self.assertIsNone(cache.lookup("model", unit(0, 1, 0)))
+
+    def test_interrupted_write(self) -> None:
+        ''' Tests that a vector without an entry is not paired later. '''
+
+        self.cache.add("model", "first", "first answer", unit(1, 0, 0))
+
+        # A write cut off after the vector was appended.
+        with open(self.cache.file("vectors.f32"), "ab") as vectors:
+            vectors.write(unit(0, 1, 0).tobytes())
+
+        cache = sc.SemanticCache(self.temp_dir.name, dict(SETTINGS))
+        cache.add("model", "second", "second answer", unit(0, 0, 1))
+
+        self.assertEqual(cache.lookup("model", unit(0, 0, 1))["answer"],
+                         "second answer")
+        self.assertIsNone(cache.lookup("model", unit(0, 1, 0)))
+
+        cache = sc.SemanticCache(self.temp_dir.name, dict(SETTINGS))
+        self.assertEqual(cache.lookup("model", unit(0, 0, 1))["query"],
+                         "second")
+
+    def test_ask(self) -> None:
+        ''' Tests that a similar query is offered without a request. '''
+
+        reply = {"message": {"role": "assistant", "content": "generated"}}
+
+        conversations = [da.Conversation("model") for _ in range(3)]
+
+        for conversation in conversations:
+            conversation.use_semantic_cache = True
+
+        first, accepted, declined = conversations
+
+        with mock.patch.object(da, "semantic_cache", self.cache), \
+                mock.patch.object(da, "store"), \
+                mock.patch.object(self.cache, "embed",
+                                  side_effect=[unit(1, 0, 0),
+                                               unit(1, 0.1, 0),
+                                               unit(1, 0.1, 0),
+                                               unit(1, 0.1, 0)]) as embed, \
+                mock.patch.object(da.backend.client, "chat",
+                                  return_value=reply) as chat:
+
+            first.ask("explain this regex")
+            response = accepted.ask("what does this regex do")
+
+            # The offer is not added to the chat log until it is accepted.
+            self.assertEqual(accepted.messages, [])
+            self.assertTrue(accepted.accept_offer())
+            self.assertFalse(accepted.accept_offer())
+
+            # Queries after the first turn are not looked up.
+            accepted.ask("explain this regex")
+
+            declined.ask("what does this regex do")
+            self.assertEqual(declined.decline_offer(),
+                             "what does this regex do")
+            declined.ask("what does this regex do")
+
+        self.assertEqual(chat.call_count, 3)
+        self.assertEqual(embed.call_count, 4)
+        self.assertIn("similar request: 'explain this regex'", response)
+        self.assertEqual([message["content"] for message
+                          in accepted.messages[:2]],
+                         ["what does this regex do", "generated"])
+        self.assertIsNone(accepted.offered)
+        self.assertEqual(len(declined.messages), 2)
+
+
+def main(out=sys.stderr, verbosity=2) -> None:
+    """
+    This function is used to run all the test cases in this module.
+
+    Args:
+        out (file object): A file object where the output will be written.
+                           Defaults to sys.stderr.
+        verbosity (int): Verbosity level of the test runner. Defaults to 2.
+
+    Returns:
+        None
+    """
+
+    loader = unittest.TestLoader()
+
+    suite = loader.loadTestsFromModule(sys.modules[__name__])
+    unittest.TextTestRunner(out, verbosity=verbosity).run(suite)
+
+
+if __name__ == '__main__':
+    with open("test_results/semantic_cache_test.txt",
+              "w",
+              encoding="utf-8") as file:
+
+        main(file)
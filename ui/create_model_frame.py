@@ -166,7 +166,7 @@ class CreateModelFrame(ctk.CTkFrame):
         '''
         Creates a new model by using a popup dialog from the parent class
         to request the user for a name of the model and passes the name and
-        modelfile to the 'lm_create_model()'.
+        modelfile to the 'create_model()' of the parent class.
         '''
 
         # Request the user to provide a name for the new model.
@@ -179,16 +179,11 @@ class CreateModelFrame(ctk.CTkFrame):
         # Retrieve the edited modelfile from the modelfile text widget.
         modelfile = self.widget["modfile_text"].get("0.0", "end")
 
-        # Pass the name and modelfile of the new model to the
-        # 'lm.create_model()'.
-        lm.create_model(new_model_name, modelfile)
+        # Pass the name and modelfile of the new model to the engine, the
+        # result is displayed once the model has been created.
+        self.parent.create_model(new_model_name, modelfile)
 
-        # Display that the model was created in the modelfile text widget.
-        msg = f"Model {new_model_name} created!"
-        self.parent.popup_message("create_model", msg)
-
-        logger.info("Model %s created!", new_model_name)
-        self.parent.load_sidebar_frame()
+        logger.info("Model %s creation started!", new_model_name)
 
         self.destroy()
 
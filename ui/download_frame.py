@@ -0,0 +1,132 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+download_frame.py--Creates a frame listing the model downloads with their
+                   progress for the sidebar of the Developer Assistant app.
+                   A running download can be cancelled, a cancelled or
+                   failed download resumed and a finished one cleared.
+'''
+
+import customtkinter as ctk
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.download_manager import Download, DownloadManager
+
+logger = app_log(__name__)
+
+
+class DownloadFrame(ctk.CTkFrame):
+    '''
+    Class to create a frame with a label, progress bar and button for each
+    model download.
+    '''
+
+    def __init__(self, SideBarFrame, manager: DownloadManager):
+        super().__init__(SideBarFrame, fg_color="transparent")
+        self.manager = manager
+
+        # Widgets of the listed downloads by their model and the next free
+        # grid row.
+        self.rows = {}
+        self.next_row = 0
+
+        self.grid_columnconfigure(0, weight=1)
+
+    def show(self, download: Download) -> None:
+        '''
+        Displays the progress of a download, the frame is placed into the
+        sidebar with its first download.
+        '''
+
+        if download.model not in self.rows:
+            self.add_row(download.model)
+
+        row = self.rows[download.model]
+
+        row["label"].configure(text=download.describe())
+        row["bar"].set(download.progress())
+
+        if download.is_active():
+            row["button"].configure(text="cancel")
+
+        elif download.status in ("cancelled", "failed"):
+            row["button"].configure(text="resume")
+
+        else:
+            row["bar"].set(1)
+            row["button"].configure(text="clear")
+
+    def add_row(self, model: str) -> None:
+        '''
+        Creates the widgets of a download.
+        '''
+
+        green = ("#236538", "#067f2c")
+        idx = self.next_row
+        self.next_row += 2
+
+        row = {"label": ctk.CTkLabel(self,
+                                     text=model,
+                                     font=("", 11),
+                                     anchor="w",
+                                     wraplength=160,
+                                     justify="left"),
+               "bar": ctk.CTkProgressBar(self,
+                                         mode="determinate",
+                                         height=6,
+                                         width=120,
+                                         progress_color=green),
+               "button": ctk.CTkButton(self,
+                                       text="cancel",
+                                       width=50,
+                                       height=20,
+                                       font=("", 11),
+                                       command=lambda: self.pressed(model))}
+
+        row["label"].grid(row=idx, column=0, columnspan=2, sticky="ew")
+        row["bar"].grid(row=idx + 1, column=0, padx=(0, 5), sticky="ew")
+        row["button"].grid(row=idx + 1, column=1, pady=(0, 5))
+        row["bar"].set(0)
+
+        self.rows[model] = row
+
+        if len(self.rows) == 1:
+            self.grid()
+
+        logger.debug(" [GUI] download of %s -> listed.", model)
+
+    def pressed(self, model: str) -> None:
+        '''
+        Cancels, resumes or clears a download.
+        '''
+
+        download = self.manager.downloads.get(model)
+
+        if download is not None and download.is_active():
+            self.manager.cancel(model)
+
+        elif download is not None and download.status in ("cancelled",
+                                                          "failed"):
+            self.show(self.manager.resume(model))
+
+        else:
+            self.clear(model)
+
+    def clear(self, model: str) -> None:
+        '''
+        Removes a finished download from the list, the frame is removed
+        from the sidebar with its last download.
+        '''
+
+        for widget in self.rows.pop(model).values():
+            widget.destroy()
+
+        self.manager.remove(model)
+
+        if not self.rows:
+            self.grid_remove()
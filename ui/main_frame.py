@@ -11,14 +11,15 @@ main_frame.py--Creates the main frame for interacting with a LLM for the
                Developer Assistant app.
 '''
 
-import platform
-from time import sleep
-import threading
+import os
+from concurrent.futures import Future
 from PIL import Image
 from customtkinter import filedialog
 import customtkinter as ctk
 from utils_dev_assist.dev_assist_logging import app_log
 from utils_dev_assist import dev_assist
+from utils_dev_assist import repo_index
+from ui.response_renderer import ResponseRenderer
 
 logger = app_log(__name__)
 
@@ -28,8 +29,16 @@ class MainFrame(ctk.CTkFrame):
     Class to create the main frame for the DeveloperAssistant GUI with
     widgets to interact with a model.
     '''
-    OS = platform.system().upper()
-    logger.debug("[SYSTEM] OS -> %s", OS)
+
+    # Settings of the response renderer, the typing effect displays a
+    # response within TYPING_TIME seconds after it has arrived.
+    RENDER_FPS = 30
+    TYPING_EFFECT = True
+    TYPING_TIME = 1.5
+
+    # Number of characters of a stored request displayed when a session
+    # is reopened.
+    MAX_REQUEST_DISPLAY = 500
 
     def __init__(self, DevAssistant):
         super().__init__(DevAssistant)
@@ -38,6 +47,14 @@ class MainFrame(ctk.CTkFrame):
         self.attach_file: str = ""
         self.ai_response: str = ""
 
+        # Conversation of the main frame.
+        self.conversation = dev_assist.Conversation()
+
+        # Session listed in the sidebar and the id of its oldest displayed
+        # message.
+        self.session_id: int | None = None
+        self.oldest_id: int | None = None
+
         self.widget = {"welcome_label": None,
                        "download_button": None,
                        "model_menu": None,
@@ -52,9 +69,20 @@ class MainFrame(ctk.CTkFrame):
                        "request_text": None,
                        "submit_button": None,
                        "addfile_button": None,
+                       "addfolder_button": None,
                        "stop_request_button": None,
                        "ai_response_textbox": None,
-                       "progressbar": None}
+                       "progressbar": None,
+                       "context_label": None,
+                       "context_bar": None,
+                       "cache_switch": None,
+                       "similar_switch": None,
+                       "prune_switch": None,
+                       "compress_switch": None,
+                       "index_label": None,
+                       "older_button": None,
+                       "accept_button": None,
+                       "generate_button": None}
 
         self.grid_rowconfigure((0, 1, 2, 3), weight=1)
         self.grid_columnconfigure(1, weight=1)
@@ -100,12 +128,29 @@ class MainFrame(ctk.CTkFrame):
                                                                   "#dce4ee"),
                                                       command=self.select_file)
 
+        # button to add the relevant parts of a folder to the request.
+        self.widget["addfolder_button"] = ctk.CTkButton(
+                                                    self,
+                                                    fg_color="transparent",
+                                                    border_width=2,
+                                                    border_color=green,
+                                                    text="attach folder",
+                                                    text_color=("gray10",
+                                                                "#dce4ee"),
+                                                    command=self.select_folder)
+
         # textbox to display ai_request, responses, info and error messages.
         self.widget["ai_response_textbox"] = ctk.CTkTextbox(self,
                                                             width=250,
                                                             font=("", 20),
                                                             corner_radius=40)
 
+        # renderer which displays the responses on the Tk main loop.
+        self.renderer = ResponseRenderer(self.widget["ai_response_textbox"],
+                                         fps=self.RENDER_FPS,
+                                         typing=self.TYPING_EFFECT,
+                                         typing_time=self.TYPING_TIME)
+
         img_path = "assets/welcome_screen.jpg"
         start_screen_image = ctk.CTkImage(light_image=Image.open(img_path),
                                           size=(1600, 840))
@@ -121,6 +166,57 @@ class MainFrame(ctk.CTkFrame):
                                                     font=("", 50),
                                                     corner_radius=40)
 
+        # label and progress bar showing how full the context of the
+        # loaded model is.
+        self.widget["context_label"] = ctk.CTkLabel(self,
+                                                    text="context: -",
+                                                    font=("", 12),
+                                                    anchor="w")
+
+        self.widget["context_bar"] = ctk.CTkProgressBar(self,
+                                                        mode="determinate",
+                                                        height=8)
+        self.widget["context_bar"].set(0)
+
+        # switch to reuse the responses of identical requests, the
+        # requests are sent with a temperature of 0.
+        self.widget["cache_switch"] = ctk.CTkSwitch(self,
+                                                    text="cache responses",
+                                                    font=("", 12),
+                                                    progress_color=green)
+
+        # label showing the progress of the index of an attached folder.
+        self.widget["index_label"] = ctk.CTkLabel(self,
+                                                  text="",
+                                                  font=("", 12),
+                                                  anchor="w")
+
+        # switch to offer the answers of similar earlier requests.
+        self.widget["similar_switch"] = ctk.CTkSwitch(self,
+                                                      text="similar requests",
+                                                      font=("", 12),
+                                                      progress_color=green)
+
+        if dev_assist.semantic_cache.settings["enabled"]:
+            self.widget["similar_switch"].select()
+
+        # switch to prune attached Python files to the functions and
+        # classes named in the request.
+        self.widget["prune_switch"] = ctk.CTkSwitch(self,
+                                                    text="prune .py files",
+                                                    font=("", 12),
+                                                    progress_color=green)
+
+        # switch to remove redundant content of attached files.
+        self.widget["compress_switch"] = ctk.CTkSwitch(
+                                                    self,
+                                                    text="compress files",
+                                                    font=("", 12),
+                                                    progress_color=green)
+
+        if dev_assist.prompt_compression.settings["enabled"]:
+            self.widget["compress_switch"].select()
+
         logger.debug(" [gui] main widgets -> created.")
 
         self.main_frame_widgets_layout()
@@ -149,6 +245,54 @@ class MainFrame(ctk.CTkFrame):
                                            pady=(20, 30),
                                            sticky="e")
 
+        self.widget["context_label"].grid(row=5,
+                                          column=1,
+                                          padx=(25, 0),
+                                          pady=(0, 10),
+                                          sticky="w")
+
+        self.widget["context_bar"].grid(row=5,
+                                        column=2,
+                                        padx=(20, 20),
+                                        pady=(0, 10),
+                                        sticky="ew")
+
+        self.widget["addfolder_button"].grid(row=5,
+                                             column=3,
+                                             padx=(20, 20),
+                                             pady=(0, 10),
+                                             sticky="e")
+
+        self.widget["cache_switch"].grid(row=5,
+                                         column=1,
+                                         padx=(0, 0),
+                                         pady=(0, 10),
+                                         sticky="e")
+
+        self.widget["index_label"].grid(row=6,
+                                        column=1,
+                                        padx=(25, 0),
+                                        pady=(0, 10),
+                                        sticky="w")
+
+        self.widget["similar_switch"].grid(row=6,
+                                           column=1,
+                                           padx=(0, 0),
+                                           pady=(0, 10),
+                                           sticky="e")
+
+        self.widget["prune_switch"].grid(row=6,
+                                         column=2,
+                                         padx=(20, 0),
+                                         pady=(0, 10),
+                                         sticky="w")
+
+        self.widget["compress_switch"].grid(row=6,
+                                            column=3,
+                                            padx=(20, 20),
+                                            pady=(0, 10),
+                                            sticky="e")
+
         # Label will be removed from the layout when the first request
         # is submitted.
         self.widget["welcome_label"].grid(row=0,
@@ -194,6 +338,8 @@ class MainFrame(ctk.CTkFrame):
                                                 pady=(20, 20),
                                                 sticky="nsew")
 
+        self.widget["ai_response_textbox"].configure(wrap="word")
+
         logger.debug(" [GUI] textbox widget added to the layout.")
 
     def stop_request_button(self, add: bool = True) -> bool:
@@ -220,8 +366,9 @@ class MainFrame(ctk.CTkFrame):
                                                     pady=(20, 30),
                                                     sticky="w")
 
-        else:
+        elif self.widget["stop_request_button"] is not None:
             self.widget["stop_request_button"].destroy()
+            self.widget["stop_request_button"] = None
 
     def select_file(self) -> None:
         """
@@ -241,6 +388,52 @@ class MainFrame(ctk.CTkFrame):
             logger.debug(" [ATTACH FILE] file %s attached to the request.",
                          self.attach_file)
 
+    def select_folder(self) -> None:
+        """
+        Opens a directory dialog to attach a folder to the request, only the
+        parts of its files which are relevant for the request are added.
+        """
+
+        folder = filedialog.askdirectory()
+
+        if not folder:
+            logger.debug(" [ATTACH FOLDER] folder attachment canceled!")
+            return
+
+        self.attach_file = folder
+
+        logger.debug(" [ATTACH FOLDER] folder %s attached to the request.",
+                     self.attach_file)
+
+        self.update_index(folder)
+
+    def update_index(self, folder: str) -> None:
+        """
+        Updates the index of a folder in the background, only new and
+        modified files are embedded again.
+        """
+
+        name = os.path.basename(folder)
+        index = repo_index.get_index(folder, dev_assist.attachment_store)
+
+        def progress(done: int, chunks: int) -> None:
+            text = f"indexing {name}: {done}/{chunks} chunks"
+            self.renderer.call(
+                    lambda: self.widget["index_label"].configure(text=text))
+
+        def done(result: dict) -> None:
+            text = f"index {name}: up to date"
+
+            if "error" in result:
+                text = f"index {name}: update failed!"
+
+            self.renderer.call(
+                    lambda: self.widget["index_label"].configure(text=text))
+
+        self.widget["index_label"].configure(text=f"indexing {name} ...")
+
+        index.refresh(progress, done)
+
     def submit(self) -> None:
         """
         Submits the current request and verifies that a model has been loaded.
@@ -256,7 +449,7 @@ class MainFrame(ctk.CTkFrame):
     def add_progressbar_widget(self) -> None:
         '''
         Adds an indeterminate progress bar in the GUI and calls
-        the start_thread method.
+        the start_request method.
         '''
 
         self.widget["progressbar"] = ctk.CTkProgressBar(self,
@@ -271,7 +464,7 @@ class MainFrame(ctk.CTkFrame):
 
         logger.debug(" [GUI] progress bar added to the layout.")
 
-        self.start_thread()
+        self.start_request()
 
     def progressbar(self, start: bool = True) -> None:
         '''
@@ -282,102 +475,432 @@ class MainFrame(ctk.CTkFrame):
             self.widget["progressbar"].start()
             logger.info(" progress bar --> started.")
 
-        else:
+        elif self.widget["progressbar"] is not None:
             self.widget["progressbar"].stop()
             self.widget["progressbar"].destroy()
+            self.widget["progressbar"] = None
 
             logger.info(" [GUI] progress bar --> stopped.")
 
             logger.debug(" [GUI] progress bar removed from layout.")
 
-    def start_thread(self) -> None:
+    def start_request(self) -> None:
         """
-        Starts new threads to handle ai_requests.
+        Submits the request to the async engine of the app, the response
+        chunks are passed to 'receive_chunk()'.
         """
 
-        request_thread = threading.Thread(target=self.ai_request,
-                                          daemon=True)
+        self.prepare_request()
 
-        request_thread.start()
-        logger.info(" [THREAD] request thread --> started.")
+        self.ai_response = ""
+        self.conversation.llm = self.parent.llm["model"]
+        self.parent.scheduler.touch(self.conversation.llm)
+        self.cache_setting()
+
+        self.parent.engine.ask_future(self.conversation,
+                                      self.request,
+                                      self.attach_file,
+                                      on_chunk=self.receive_chunk,
+                                      callback=self.request_finished,
+                                      on_progress=self.receive_progress)
+
+        logger.info(" [ENGINE] request --> submitted.")
 
         self.progressbar(start=True)
 
-    def ai_request(self) -> None:
+    def cache_setting(self) -> None:
+        '''
+        Applies the settings of the cache, prune and compress switches to
+        the conversation.
+        '''
+
+        self.conversation.use_semantic_cache = bool(
+                                    self.widget["similar_switch"].get())
+        self.conversation.prune_code = bool(
+                                    self.widget["prune_switch"].get())
+        self.conversation.compress = bool(
+                                    self.widget["compress_switch"].get())
+
+        if self.widget["cache_switch"].get():
+            self.conversation.use_cache = True
+            self.conversation.options["temperature"] = 0
+
+        else:
+            self.conversation.use_cache = False
+            self.conversation.options.pop("temperature", None)
+
+    def prepare_request(self) -> None:
         """
-        Handles the request process.
+        Prepares the GUI for a new request and displays the request.
         """
 
         self.widget["submit_button"].configure(state="disabled")
         self.widget["addfile_button"].configure(state="disabled")
+        self.widget["addfolder_button"].configure(state="disabled")
 
-        if self.OS in ("LINUX", "DARWIN"):
-            self.stop_request_button()
+        self.offer_buttons(add=False)
+        self.stop_request_button()
 
         self.request = self.widget["request_text"].get()
 
-        msg = f"\u27BE Your request: {self.request}\n"
-        self.widget["ai_response_textbox"].insert("end", msg)
+        self.renderer.write(f"\u27BE Your request: {self.request}\n")
 
-        if self.attach_file != "":
-            msg = f"attached file: {self.attach_file}\n"
-            self.widget["ai_response_textbox"].insert("end", msg)
+        if os.path.isdir(self.attach_file):
+            self.renderer.write(f"attached folder: {self.attach_file}\n")
 
-        self.widget["ai_response_textbox"].yview_moveto(1.0)
-        self.widget["ai_response_textbox"].configure(require_redraw=True)
+        elif self.attach_file != "":
+            self.renderer.write(f"attached file: {self.attach_file}\n")
 
         self.widget["request_text"].delete(0, "end")
 
-        self.ai_response = dev_assist.ask(self.request,
-                                          self.parent.llm["model"],
-                                          self.attach_file)
+    def receive_chunk(self, chunk: str) -> None:
+        """
+        Passes a chunk of the streamed response to the renderer which
+        displays it on the Tk main loop. This method is called from the
+        event loop thread of the async engine.
+        """
+
+        if self.ai_response == "":
+            # The first chunk has arrived, remove the progress bar.
+            self.renderer.call(lambda: self.progressbar(start=False))
 
-        self.progressbar(start=False)
-        self.stop_request_button(add=False)
-        self.display_response()
+            # Errors are displayed in a popup message.
+            if self.response_error(chunk):
+                self.ai_response = chunk
+                return
 
-        self.widget["submit_button"].configure(state="normal")
-        self.widget["addfile_button"].configure(state="normal")
+        elif self.response_error(self.ai_response):
+            return
+
+        self.ai_response += chunk
+        self.renderer.write(chunk)
+
+    def receive_progress(self, done: int, parts: int) -> None:
+        """
+        Shows the progress of the answered parts of a large file or of the
+        embedded chunks of a folder, this method is called from the event
+        loop thread of the async engine.
+        """
+
+        self.renderer.call(lambda: self.parts_progress(done, parts))
+
+    def parts_progress(self, done: int, parts: int) -> None:
+        """
+        Switches the progress bar to the done steps of the request.
+        """
+
+        if self.widget["progressbar"] is None:
+            return
+
+        if self.widget["progressbar"].cget("mode") == "indeterminate":
+            self.widget["progressbar"].stop()
+            self.widget["progressbar"].configure(mode="determinate")
+
+        self.widget["progressbar"].set(done / parts)
+
+        logger.debug(" [GUI] part %s/%s --> answered.", done, parts)
+
+    def request_finished(self, future: Future) -> None:
+        """
+        Finishes the request once the renderer has displayed the response.
+        """
+
+        self.renderer.call(self.display_response)
 
     def stop_request(self) -> None:
         '''
-        Stops the request made to the Ollama server.
+        Stops the request made to the Ollama server by closing its
+        connection, the loaded model stays in memory.
         '''
 
-        dev_assist.restart_ollama_server(MainFrame.OS)
+        self.conversation.cancel()
         self.stop_request_button(add=False)
 
+    def response_error(self, response: str) -> bool:
+        '''
+        Checks if a response is an error message.
+        '''
+
+        return response.startswith("error") or response.startswith("Server")
+
     def display_response(self) -> None:
         """
-        Displays the response in the reply textbox widget, character by
-        character, with a slight delay between each character to
-        simulate typing.
+        Finishes the displayed response, errors are shown in a popup message
+        otherwise the response is copied to the clipboard.
         """
 
-        if self.ai_response.startswith("error") or \
-           self.ai_response.startswith("Server"):
-            self.parent.popup_message("response_error", self.ai_response)
+        self.progressbar(start=False)
+        self.stop_request_button(add=False)
 
-            self.progressbar(start=False)
-            self.attach_file = ""
+        if self.response_error(self.ai_response):
+            self.parent.popup_message("response_error", self.ai_response)
 
-        else:
-            self.widget["ai_response_textbox"].configure(wrap="word")
+        elif not self.conversation.cancelled.is_set():
             self.copy_to_clipboard()
 
-            for char in self.ai_response:
-                self.widget["ai_response_textbox"].insert("end", char)
-                self.widget["ai_response_textbox"].yview_moveto(1.0)
-                self.widget["ai_response_textbox"].configure(
-                                                           require_redraw=True
-                                                           )
-
-                sleep(0.04)
-
         logger.info(" [GUI] response --> displayed.")
 
         self.attach_file = ""
 
+        self.update_context_usage()
+
+        self.widget["submit_button"].configure(state="normal")
+        self.widget["addfile_button"].configure(state="normal")
+        self.widget["addfolder_button"].configure(state="normal")
+
+        # The answer of a similar request is offered to the user.
+        if self.conversation.offered is not None:
+            self.offer_buttons()
+
+        self.session_stored()
+
+    def session_stored(self) -> None:
+        '''
+        Lists a new session in the sidebar, it is stored with its first
+        response.
+        '''
+
+        if self.session_id != self.conversation.session_id:
+            self.session_id = self.conversation.session_id
+            self.parent.sidebar_frame.load_sessions()
+
+    def offer_buttons(self, add: bool = True) -> None:
+        '''
+        Adds the buttons to accept the offered answer of a similar request
+        or to generate a new response to the GUI layout or removes them.
+        '''
+
+        if add and self.widget["accept_button"] is None:
+            green = ("#236538", "#067f2c")
+
+            self.widget["accept_button"] = ctk.CTkButton(
+                                                self,
+                                                border_width=2,
+                                                border_color=green,
+                                                text="use answer",
+                                                command=self.accept_offer)
+
+            self.widget["generate_button"] = ctk.CTkButton(
+                                                self,
+                                                fg_color="transparent",
+                                                border_width=2,
+                                                border_color=green,
+                                                text="generate",
+                                                text_color=("gray10",
+                                                            "#dce4ee"),
+                                                command=self.generate)
+
+            self.widget["accept_button"].grid(row=3,
+                                              column=2,
+                                              padx=(20, 20),
+                                              pady=(0, 10),
+                                              sticky="se")
+
+            self.widget["generate_button"].grid(row=3,
+                                                column=3,
+                                                padx=(20, 20),
+                                                pady=(0, 10),
+                                                sticky="se")
+
+        elif not add and self.widget["accept_button"] is not None:
+            self.widget["accept_button"].destroy()
+            self.widget["generate_button"].destroy()
+            self.widget["accept_button"] = None
+            self.widget["generate_button"] = None
+
+    def accept_offer(self) -> None:
+        '''
+        Adds the offered answer and its request to the conversation.
+        '''
+
+        self.offer_buttons(add=False)
+
+        self.parent.engine.accept_future(self.conversation,
+                                         self.offer_accepted)
+
+    def offer_accepted(self, future: Future) -> None:
+        '''
+        Updates the context usage and the sessions once the offered answer
+        has been added to the conversation.
+        '''
+
+        if future.exception() is not None:
+            logger.error(" [GUI] offered answer --> %s", future.exception())
+            return
+
+        logger.info(" [GUI] offered answer --> accepted.")
+
+        self.update_context_usage()
+        self.session_stored()
+
+    def generate(self) -> None:
+        '''
+        Declines the offered answer and submits its request again to
+        generate a new response.
+        '''
+
+        if self.request_running():
+            return
+
+        self.offer_buttons(add=False)
+
+        query = self.conversation.decline_offer()
+
+        if query is None:
+            return
+
+        self.widget["request_text"].delete(0, "end")
+        self.widget["request_text"].insert(0, query)
+
+        self.submit()
+
+    def request_running(self) -> bool:
+        '''
+        Checks if a request is being processed.
+        '''
+
+        return self.widget["submit_button"].cget("state") == "disabled"
+
+    def new_session(self) -> None:
+        '''
+        Starts a new session and clears the reply textbox.
+        '''
+
+        if self.request_running():
+            return
+
+        self.conversation = dev_assist.Conversation(self.parent.llm["model"])
+
+        self.session_id = None
+        self.older_button(add=False)
+        self.offer_buttons(add=False)
+        self.widget["ai_response_textbox"].delete("1.0", "end")
+
+        self.update_context_usage()
+
+    def open_session(self, session_id: int) -> None:
+        '''
+        Opens a stored session and displays its latest messages.
+        '''
+
+        if self.request_running():
+            return
+
+        self.check_welcome_label_widget()
+
+        self.conversation = dev_assist.Conversation.from_session(
+                                                    session_id,
+                                                    self.parent.llm["model"])
+        messages = self.conversation.loaded
+
+        self.session_id = session_id
+        self.oldest_id = messages[0]["id"] if messages else None
+
+        textbox = self.widget["ai_response_textbox"]
+        textbox.delete("1.0", "end")
+        textbox.insert("end", self.format_messages(messages))
+        textbox.yview_moveto(1.0)
+
+        self.older_button(add=self.has_older_messages())
+        self.offer_buttons(add=False)
+        self.update_context_usage()
+
+        logger.info(" [GUI] session %s --> displayed.", session_id)
+
+    def load_older_messages(self) -> None:
+        '''
+        Displays the previous page of messages of the open session above
+        the displayed messages.
+        '''
+
+        messages = dev_assist.store.load_page(self.session_id,
+                                              self.oldest_id,
+                                              dev_assist.PAGE_SIZE)
+
+        if messages:
+            self.oldest_id = messages[0]["id"]
+            self.widget["ai_response_textbox"].insert(
+                                            "1.0",
+                                            self.format_messages(messages))
+
+        self.older_button(add=self.has_older_messages())
+
+    def has_older_messages(self) -> bool:
+        '''
+        Checks if the open session has messages which are not displayed.
+        '''
+
+        if self.oldest_id is None:
+            return False
+
+        return dev_assist.store.has_older(self.session_id, self.oldest_id)
+
+    def format_messages(self, messages: list) -> str:
+        '''
+        Returns stored messages formatted as they are displayed during
+        a session.
+        '''
+
+        text = ""
+
+        for message in messages:
+            if message["role"] == "user":
+                request = message["content"]
+
+                if len(request) > self.MAX_REQUEST_DISPLAY:
+                    request = f"{request[:self.MAX_REQUEST_DISPLAY]} ..."
+
+                text += f"\u27BE Your request: {request}\n"
+
+            else:
+                text += f"\n\u27BE Response: \n{message['content']}\n\n"
+
+        return text
+
+    def older_button(self, add: bool = True) -> None:
+        '''
+        Adds the button to load older messages to the GUI layout or
+        removes it.
+        '''
+
+        if add and self.widget["older_button"] is None:
+            green = ("#236538", "#067f2c")
+            cmd = self.load_older_messages
+            self.widget["older_button"] = ctk.CTkButton(self,
+                                                        border_width=2,
+                                                        border_color=green,
+                                                        text="older messages",
+                                                        command=cmd)
+
+            self.widget["older_button"].grid(row=0,
+                                             column=3,
+                                             padx=(0, 50),
+                                             pady=(30, 0),
+                                             sticky="ne")
+
+        elif not add and self.widget["older_button"] is not None:
+            self.widget["older_button"].destroy()
+            self.widget["older_button"] = None
+
+    def update_context_usage(self) -> None:
+        '''
+        Displays how full the context of the loaded model is.
+        '''
+
+        model = self.parent.llm["model"]
+
+        if model == "":
+            return
+
+        self.conversation.llm = model
+        tokens, budget = self.conversation.context_usage()
+
+        self.widget["context_label"].configure(
+                    text=f"context: {tokens:,} / {budget:,} tokens "
+                         f"({min(100, round(tokens / budget * 100))}%)")
+
+        self.widget["context_bar"].set(min(1.0, tokens / budget))
+
     def copy_to_clipboard(self) -> None:
         '''
         Copies the last response automatically to the clipboard.
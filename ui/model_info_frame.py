@@ -9,14 +9,20 @@
 '''
 modelinfo_frame.py--Creates a frame to display information of the loaded model
                     for the Developer Assistant app.
+                    A tab is loaded in the background with the engine when
+                    it is selected for the first time, the text is inserted
+                    into the textbox in chunks.
 '''
 
+from concurrent.futures import Future
 import customtkinter as ctk
 from utils_dev_assist.dev_assist_logging import app_log
-from utils_dev_assist import llm_models as lm
 
 logger = app_log(__name__)
 
+# Characters inserted into a textbox at once.
+INSERT_CHUNK = 4000
+
 
 class ModelInfoFrame(ctk.CTkFrame):
     '''
@@ -62,7 +68,8 @@ class ModelInfoFrame(ctk.CTkFrame):
 
         self.widget["tabs"] = ctk.CTkTabview(self,
                                              bg_color="transparent",
-                                             corner_radius=30)
+                                             corner_radius=30,
+                                             command=self.load_tab)
 
         for info in self.modelinfo:
             self.widget["tabs"].add(info)
@@ -70,6 +77,9 @@ class ModelInfoFrame(ctk.CTkFrame):
             self.widget[f"{info}_text"] = ctk.CTkTextbox(args)
 
         green = ("#236538", "#067f2c")
+        # Tabs which have been requested from the engine.
+        self.loaded = set()
+
         self.widget["back_button"] = ctk.CTkButton(
                                                 self,
                                                 text="go back",
@@ -112,10 +122,6 @@ class ModelInfoFrame(ctk.CTkFrame):
 
             self.widget[f"{info}_text"].configure(wrap="word")
 
-            get_info = lm.show_model_info(self.loaded_model, info)
-
-            self.widget[f"{info}_text"].insert("end", get_info)
-
         self.widget["back_button"].grid(row=5,
                                         column=2,
                                         pady=(10, 20),
@@ -128,3 +134,58 @@ class ModelInfoFrame(ctk.CTkFrame):
                   padx=15,
                   pady=15,
                   sticky="nsew")
+
+        self.load_tab()
+
+    def load_tab(self) -> None:
+        """
+        Requests the information of the selected tab from the engine the
+        first time the tab is selected and displays a placeholder.
+        """
+
+        info = self.widget["tabs"].get()
+
+        if info in self.loaded:
+            return
+
+        self.loaded.add(info)
+        self.widget[f"{info}_text"].insert("end", f"loading {info} ...")
+
+        self.parent.engine.info_future(
+                    self.loaded_model, info,
+                    callback=lambda done: self.show_info(info, done))
+
+        logger.debug(" [GUI] %s tab -> requested.", info)
+
+    def show_info(self, info: str, future: Future) -> None:
+        """
+        Replaces the placeholder of a tab with the fetched information.
+        """
+
+        # The frame was closed before the information arrived.
+        if not self.winfo_exists():
+            return
+
+        if future.exception() is not None:
+            text = f"[ERROR] --> {future.exception()}\n\n"
+
+        else:
+            text = future.result()
+
+        self.widget[f"{info}_text"].delete("1.0", "end")
+        self.insert_chunks(self.widget[f"{info}_text"], text)
+
+    def insert_chunks(self, textbox: ctk.CTkTextbox, text: str,
+                      start: int = 0) -> None:
+        """
+        Inserts a text into a textbox in chunks of INSERT_CHUNK characters
+        from 'start', one chunk for each run of the Tk main loop.
+        """
+
+        if start >= len(text) or not textbox.winfo_exists():
+            return
+
+        textbox.insert("end", text[start:start + INSERT_CHUNK])
+
+        textbox.after(1, lambda: self.insert_chunks(textbox, text,
+                                                    start + INSERT_CHUNK))
@@ -0,0 +1,120 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+resident_frame.py--Creates a frame listing the models which are loaded on
+                   the Ollama server for the sidebar of the Developer
+                   Assistant app.
+                   The memory used of the budget, the memory and load
+                   latency of each model and the latest decisions of the
+                   scheduler are displayed, a model is pinned with its
+                   checkbox.
+'''
+
+import customtkinter as ctk
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.download_manager import format_bytes
+from utils_dev_assist.model_scheduler import ModelScheduler
+
+logger = app_log(__name__)
+
+# Number of decisions which are displayed.
+SHOWN_DECISIONS = 3
+
+
+class ResidentFrame(ctk.CTkFrame):
+    '''
+    Class to create a frame with a checkbox for each resident model and the
+    latest decisions of the scheduler.
+    '''
+
+    def __init__(self, SideBarFrame, scheduler: ModelScheduler):
+        super().__init__(SideBarFrame, fg_color="transparent")
+        self.scheduler = scheduler
+
+        # Checkboxes of the listed models by their model and the next free
+        # grid row.
+        self.rows = {}
+        self.next_row = 0
+
+        self.grid_columnconfigure(0, weight=1)
+
+        self.usage_label = ctk.CTkLabel(self,
+                                        text="",
+                                        font=("", 11),
+                                        anchor="w")
+        self.usage_label.grid(row=0, column=0, sticky="ew")
+
+        self.models_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.models_frame.grid(row=1, column=0, sticky="ew")
+
+        self.decisions_label = ctk.CTkLabel(self,
+                                            text="",
+                                            font=("", 10),
+                                            text_color="gray50",
+                                            anchor="w",
+                                            wraplength=160,
+                                            justify="left")
+        self.decisions_label.grid(row=2, column=0, sticky="ew")
+
+    def show(self, scheduler: ModelScheduler) -> None:
+        '''
+        Displays the resident models and the latest decisions, the rows of
+        models which are no longer loaded are removed.
+        '''
+
+        resident = dict(scheduler.resident)
+
+        self.usage_label.configure(
+                    text=f"loaded: {format_bytes(scheduler.usage())} of "
+                         f"{format_bytes(scheduler.budget)}")
+
+        for model in [model for model in self.rows if model not in resident]:
+            self.rows.pop(model).destroy()
+
+        for model in resident:
+            if model not in self.rows:
+                self.add_row(model)
+
+            self.rows[model].configure(text=scheduler.describe(model))
+
+            if model in scheduler.pinned:
+                self.rows[model].select()
+
+            else:
+                self.rows[model].deselect()
+
+        self.decisions_label.configure(
+                    text="\n".join(list(scheduler.decisions)
+                                   [-SHOWN_DECISIONS:]))
+
+    def add_row(self, model: str) -> None:
+        '''
+        Creates the checkbox of a model, it pins and unpins the model.
+        '''
+
+        green = ("#236538", "#067f2c")
+
+        checkbox = ctk.CTkCheckBox(self.models_frame,
+                                   text=model,
+                                   font=("", 11),
+                                   checkbox_width=14,
+                                   checkbox_height=14,
+                                   fg_color=green,
+                                   command=lambda: self.pressed(model))
+        checkbox.grid(row=self.next_row, column=0, pady=(2, 0), sticky="w")
+        self.next_row += 1
+
+        self.rows[model] = checkbox
+
+        logger.debug(" [GUI] resident model %s -> listed.", model)
+
+    def pressed(self, model: str) -> None:
+        ''' Pins or unpins a model. '''
+
+        self.scheduler.pin(model, bool(self.rows[model].get()))
@@ -0,0 +1,172 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+response_renderer.py--Renders text into a textbox widget on the Tk main loop
+                      for the Developer Assistant app.
+                      Worker threads only put text into a queue, the
+                      renderer flushes the buffered text with 'after()' in
+                      chunks at a fixed frame rate and redraws the textbox
+                      once per frame.
+'''
+
+import queue
+import time
+from math import ceil
+from collections import deque
+from typing import Callable
+import customtkinter as ctk
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+
+class ResponseRenderer:
+    '''
+    Class to render buffered text into a textbox at a fixed frame rate.
+    With the typing effect enabled the text is revealed gradually, but the
+    whole backlog is always displayed within 'typing_time' seconds.
+    '''
+
+    def __init__(self, textbox: ctk.CTkTextbox,
+                 fps: int = 30,
+                 typing: bool = True,
+                 typing_time: float = 1.5,
+                 min_chars: int = 2):
+        self.textbox = textbox
+        self.frame_ms = max(1, int(1000 / fps))
+        self.typing = typing
+        self.typing_time = typing_time
+        self.min_chars = min_chars
+
+        # Thread-safe inbox for text and callbacks from worker threads.
+        self.inbox = queue.SimpleQueue()
+
+        # Items taken from the inbox that are waiting to be displayed.
+        self.pending = deque()
+        self.pending_chars = 0
+
+        # Time when the current backlog started, None without a backlog.
+        self.backlog_start = None
+
+        self.textbox.after(self.frame_ms, self.render_frame)
+
+        logger.debug(" [GUI] response renderer -> started.")
+
+    def write(self, text: str) -> None:
+        '''
+        Buffers text to be displayed, can be called from any thread.
+        '''
+
+        if text:
+            self.inbox.put(text)
+
+    def call(self, func: Callable[[], None]) -> None:
+        '''
+        Schedules 'func' to run on the Tk main loop once all text written
+        before it has been displayed, can be called from any thread.
+        '''
+
+        self.inbox.put(func)
+
+    def frame_budget(self) -> int:
+        '''
+        Returns the number of characters to display in the current frame.
+        '''
+
+        if not self.typing:
+            return self.pending_chars
+
+        if self.pending_chars == 0:
+            return 0
+
+        now = time.monotonic()
+
+        if self.backlog_start is None:
+            self.backlog_start = now
+
+        # Flush the rest once the deadline has passed, a busy Tk loop can
+        # run fewer frames than planned.
+        remaining = self.typing_time - (now - self.backlog_start)
+
+        if remaining <= 0:
+            return self.pending_chars
+
+        # Spread the backlog over the frames left until the deadline.
+        frames_left = max(1, int(remaining * 1000 / self.frame_ms))
+
+        return max(self.min_chars, ceil(self.pending_chars / frames_left))
+
+    def render_frame(self) -> None:
+        '''
+        Displays the buffered text of one frame with a single insert and
+        redraw and reschedules itself.
+        '''
+
+        # Schedule the next frame first so a failing callback can not
+        # stop the renderer.
+        self.textbox.after(self.frame_ms, self.render_frame)
+
+        # Move everything from the inbox into the pending buffer.
+        while True:
+            try:
+                item = self.inbox.get_nowait()
+
+            except queue.Empty:
+                break
+
+            self.pending.append(item)
+
+            if isinstance(item, str):
+                self.pending_chars += len(item)
+
+        budget = self.frame_budget()
+        text = ""
+
+        while self.pending:
+            item = self.pending[0]
+
+            if callable(item):
+                # Display the text before the callback runs.
+                self.insert(text)
+                text = ""
+
+                self.pending.popleft()
+                item()
+                continue
+
+            if budget <= 0:
+                break
+
+            if len(item) <= budget:
+                text += self.pending.popleft()
+
+            else:
+                text += item[:budget]
+                self.pending[0] = item[budget:]
+
+            taken = min(len(item), budget)
+            budget -= taken
+            self.pending_chars -= taken
+
+        if self.pending_chars == 0:
+            self.backlog_start = None
+
+        self.insert(text)
+
+    def insert(self, text: str) -> None:
+        '''
+        Inserts text at the end of the textbox and scrolls to it.
+        '''
+
+        if not text:
+            return
+
+        self.textbox.insert("end", text)
+        self.textbox.yview_moveto(1.0)
+        self.textbox.configure(require_redraw=True)
@@ -13,6 +13,9 @@ sidebar_frame.py--Creates a sidebar frame for the Developer Assistant app.
 import customtkinter as ctk
 from utils_dev_assist.dev_assist_logging import app_log
 from utils_dev_assist import gui_settings
+from utils_dev_assist import dev_assist
+from ui.download_frame import DownloadFrame
+from ui.resident_frame import ResidentFrame
 logger = app_log(__name__)
 
 # Get initial appearance.
@@ -28,27 +31,37 @@ class SideBarFrame(ctk.CTkFrame):
     DeveloperAssistant GUI.
     '''
 
+    # Number of sessions listed in the sessions frame.
+    SESSION_LIMIT = 50
+
     def __init__(self, DevAssistant):
         super().__init__(DevAssistant)
         self.parent = DevAssistant
         self.widget = {"model_menu": None,
+                       "model_status": None,
                        "info_button": None,
                        "download_button": None,
+                       "downloads_frame": None,
                        "create_button": None,
                        "delete_button": None,
+                       "resident_frame": None,
+                       "sessions_frame": None,
+                       "new_chat_button": None,
                        "appearance_label": None,
                        "appearance_menu": None,
                        "scaling_label": None,
                        "scaling_menu": None,
                        "copyright_label": None}
 
+        self.session_buttons = []
+
         # Place the sidebar frame in the GUI layout.
         self.grid(row=0,
                   column=0,
                   rowspan=11,
                   sticky="nsew")
 
-        self.grid_rowconfigure(5, weight=1)
+        self.grid_rowconfigure(8, weight=1)
 
         self.sidebar_frame_widgets()
 
@@ -69,6 +82,12 @@ class SideBarFrame(ctk.CTkFrame):
                                               dynamic_resizing=False,
                                               values=self.parent.llm["models"],
                                               command=self.parent.load_llm)
+
+        # label showing if the selected model is loaded on the server.
+        self.widget["model_status"] = ctk.CTkLabel(self,
+                                                   text="",
+                                                   font=("", 11),
+                                                   height=16)
         cmd = self.parent.load_modelinfo_frame
         self.widget["info_button"] = ctk.CTkButton(self,
                                                    text="model info",
@@ -81,6 +100,10 @@ class SideBarFrame(ctk.CTkFrame):
                                                   text="download model",
                                                   command=cmd)
 
+        # progress of the model downloads.
+        self.widget["downloads_frame"] = DownloadFrame(self,
+                                                       self.parent.downloads)
+
         # button for creating a model.
         self.widget["create_button"] = ctk.CTkButton(
                                                     self,
@@ -93,6 +116,21 @@ class SideBarFrame(ctk.CTkFrame):
                                                     text="delete model",
                                                     command=self.delete_llm)
 
+        # models loaded on the server and the decisions of the scheduler.
+        self.widget["resident_frame"] = ResidentFrame(self,
+                                                      self.parent.scheduler)
+
+        # frame listing the stored sessions and button to start a new one.
+        self.widget["sessions_frame"] = ctk.CTkScrollableFrame(
+                                                    self,
+                                                    width=140,
+                                                    label_text="sessions")
+
+        cmd = self.parent.new_session
+        self.widget["new_chat_button"] = ctk.CTkButton(self,
+                                                       text="new chat",
+                                                       command=cmd)
+
         # appearance mode and scaling options widgets.
         self.widget["appearance_label"] = ctk.CTkLabel(
                                                     self,
@@ -151,32 +189,66 @@ class SideBarFrame(ctk.CTkFrame):
         # Set the initial value of the menu.
         self.widget["model_menu"].set("Load model")
 
-        self.widget["info_button"].grid(row=1,
+        # The status of the selected model is shown below the menu.
+        self.widget["model_status"].grid(row=1,
+                                         column=0,
+                                         padx=10,
+                                         pady=(10, 0),
+                                         sticky="n")
+
+        self.widget["info_button"].grid(row=2,
                                         column=0,
                                         padx=10,
-                                        pady=(40, 10))
+                                        pady=(14, 10))
 
-        self.widget["download_button"].grid(row=2,
+        self.widget["download_button"].grid(row=3,
                                             column=0,
                                             padx=10,
                                             pady=(10, 10))
 
-        self.widget["create_button"].grid(row=3,
+        # The downloads frame is placed when a download starts.
+        self.widget["downloads_frame"].grid(row=4,
+                                            column=0,
+                                            padx=10,
+                                            pady=(0, 10),
+                                            sticky="ew")
+        self.widget["downloads_frame"].grid_remove()
+
+        self.widget["create_button"].grid(row=5,
                                           column=0,
                                           padx=10,
                                           pady=(10, 10))
 
-        self.widget["delete_button"].grid(row=4,
+        self.widget["delete_button"].grid(row=6,
                                           column=0,
                                           padx=10,
-                                          pady=(10, 65))
+                                          pady=(10, 20))
+
+        self.widget["resident_frame"].grid(row=7,
+                                           column=0,
+                                           padx=10,
+                                           pady=(0, 10),
+                                           sticky="ew")
 
-        self.widget["appearance_label"].grid(row=7,
+        self.widget["sessions_frame"].grid(row=8,
+                                           column=0,
+                                           padx=10,
+                                           pady=(10, 10),
+                                           sticky="ns")
+
+        self.widget["new_chat_button"].grid(row=9,
+                                            column=0,
+                                            padx=10,
+                                            pady=(0, 20))
+
+        self.load_sessions()
+
+        self.widget["appearance_label"].grid(row=10,
                                              column=0,
                                              padx=10,
                                              pady=(10, 0))
 
-        self.widget["appearance_menu"].grid(row=8,
+        self.widget["appearance_menu"].grid(row=11,
                                             column=0,
                                             padx=10,
                                             pady=(5, 10))
@@ -185,12 +257,12 @@ class SideBarFrame(ctk.CTkFrame):
 
         self.widget["appearance_menu"].set(mode)
 
-        self.widget["scaling_label"].grid(row=9,
+        self.widget["scaling_label"].grid(row=12,
                                           column=0,
                                           padx=10,
                                           pady=(10, 0))
 
-        self.widget["scaling_menu"].grid(row=10,
+        self.widget["scaling_menu"].grid(row=13,
                                          column=0,
                                          padx=10,
                                          pady=(5, 20))
@@ -199,7 +271,7 @@ class SideBarFrame(ctk.CTkFrame):
         scale = gui_settings.get_scale(change_setting=False)
         self.widget["scaling_menu"].set(scale)
 
-        self.widget["copyright_label"].grid(row=11,
+        self.widget["copyright_label"].grid(row=14,
                                             column=0,
                                             padx=(5, 5),
                                             pady=(5, 5))
@@ -214,6 +286,41 @@ class SideBarFrame(ctk.CTkFrame):
 
         logger.debug(" [GUI] main widgets layout -> completed.")
 
+    def load_sessions(self) -> None:
+        '''
+        Lists the latest stored sessions in the sessions frame, only the
+        session titles are loaded.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        for button in self.session_buttons:
+            button.destroy()
+
+        self.session_buttons = []
+
+        for idx, stored in enumerate(
+                dev_assist.store.list_sessions(limit=self.SESSION_LIMIT)):
+
+            button = ctk.CTkButton(
+                        self.widget["sessions_frame"],
+                        text=stored["title"] or "untitled",
+                        anchor="w",
+                        fg_color="transparent",
+                        text_color=("gray10", "#dce4ee"),
+                        command=lambda sid=stored["id"]:
+                            self.parent.open_session(sid))
+
+            button.grid(row=idx, column=0, pady=(0, 2), sticky="ew")
+            self.session_buttons.append(button)
+
+        logger.debug(" [GUI] %s sessions -> listed.",
+                     len(self.session_buttons))
+
     def create_llm(self) -> None:
         '''
         Starts the proccess for the user to create a model.
@@ -239,7 +346,46 @@ class SideBarFrame(ctk.CTkFrame):
         '''
 
         self.parent.delete_model()
+
+    def update_model_menu(self) -> None:
+        '''
+        Updates the models of the model menu in place, the loaded model
+        stays selected.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
         self.widget["model_menu"].configure(values=self.parent.llm["models"])
 
-        # Reset the initial value of the menu.
-        self.widget["model_menu"].set("Load model")
+        # Reset the initial value of the menu if no model is loaded.
+        self.widget["model_menu"].set(self.parent.llm["model"] or
+                                      "Load model")
+
+    def show_model_status(self, model: str, status: str) -> None:
+        '''
+        Shows if the selected model is loading, ready or failed to load,
+        the status is cleared without a model.
+
+        Args:
+            model (str): The selected model.
+            status (str): "loading", "ready" or "failed".
+
+        Returns:
+            None
+        '''
+
+        colors = {"ready": ("#236538", "#067f2c"),
+                  "failed": ("#b22222", "#e04040")}
+        text = {"loading": "\u25CC loading model ...",
+                "ready": "\u25CF model ready",
+                "failed": "\u2716 model failed to load"}.get(status, "")
+
+        self.widget["model_status"].configure(
+                        text=text if model else "",
+                        text_color=colors.get(status, ("gray10", "gray90")))
+
+        logger.debug(" [GUI] %s status -> %s.", model, status)
@@ -0,0 +1,602 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+async_engine.py--Runs the requests to the Ollama server on one asyncio event
+                 loop in a background thread.
+                 The coroutines use one 'ollama.AsyncClient' and one
+                 'httpx.AsyncClient' of the 'ollama_backend' which share
+                 a pool, 'submit()' schedules a coroutine from
+                 any thread and returns a future. Callbacks of finished
+                 futures are put into a thread-safe queue which the GUI
+                 processes on the Tk main loop with 'process_results()'.
+                 The metadata of the installed models is prefetched with
+                 a few parallel requests while no chat request is running.
+                 A selected model is warmed up with an empty request so
+                 the first query does not wait for it to be loaded.
+'''
+
+import queue
+import asyncio
+from collections import Counter
+import threading
+import subprocess
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Coroutine
+import ollama
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.ollama_backend import backend
+from utils_dev_assist import dev_assist
+from utils_dev_assist import llm_models as lm
+from utils_dev_assist import keep_alive
+from utils_dev_assist.context_window import ContextWindow
+from utils_dev_assist import map_reduce
+
+logger = app_log(__name__)
+
+# Number of models whose metadata is prefetched at the same time.
+PREFETCH_PARALLEL = 2
+
+
+async def history_thread(func: Callable, *args):
+    '''
+    Runs a function which changes the chat log in a thread. A cancelled
+    request waits for the thread to finish, so the chat log is only rolled
+    back after the thread has added its message.
+    '''
+
+    task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+
+    try:
+        return await asyncio.shield(task)
+
+    except asyncio.CancelledError:
+        await asyncio.wait({task})
+        raise
+
+
+async def acquire_thread_lock(lock: threading.Lock) -> None:
+    '''
+    Acquires a thread lock in a thread without blocking the event loop. If
+    the waiting request is cancelled the lock is released again as soon as
+    the thread has acquired it.
+    '''
+
+    task = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+
+    try:
+        await asyncio.shield(task)
+
+    except asyncio.CancelledError:
+        task.add_done_callback(lambda acquired: lock.release())
+        raise
+
+
+class AsyncEngine:
+    '''
+    Class to run the requests to the Ollama server on a background event
+    loop. Many concurrent requests share one thread and one connection pool.
+    '''
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        # The ollama client and the client of the other requests share
+        # one pool.
+        self.client, self.http = backend.async_clients()
+
+        # Callbacks of finished futures waiting for the Tk main loop.
+        self.results = queue.SimpleQueue()
+
+        # Number of running chat requests, 'idle' is set while there are
+        # none. Both are only used on the event loop.
+        self.requests = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+        # Number of running chat requests by their model.
+        self.active = Counter()
+
+        # Future of the running prefetch of the model metadata.
+        self.prefetching: Future | None = None
+
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       name="async-engine",
+                                       daemon=True)
+        self.thread.start()
+
+        logger.info(" [ENGINE] event loop thread --> started.")
+
+    def submit(self, coro: Coroutine,
+               callback: Callable[[Future], None] | None = None) -> Future:
+        '''
+        Schedules a coroutine on the event loop and returns its future.
+        'callback' is called with the finished future on the Tk main loop.
+        '''
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        if callback is not None:
+            future.add_done_callback(
+                            lambda done: self.results.put((callback, done)))
+
+        return future
+
+    def notify(self, callback: Callable, value) -> None:
+        '''
+        Calls 'callback' with 'value' on the Tk main loop, can be called
+        from any thread.
+        '''
+
+        self.results.put((callback, value))
+
+    def process_results(self) -> None:
+        '''
+        Runs the callbacks of finished futures and notifications, this
+        method is called on the Tk main loop.
+        '''
+
+        while True:
+            try:
+                callback, future = self.results.get_nowait()
+
+            except queue.Empty:
+                return
+
+            try:
+                callback(future)
+
+            except Exception as error:
+                logger.error(" [ENGINE] callback failed --> %s", error)
+
+    def close(self) -> None:
+        '''
+        Closes the clients and stops the event loop.
+        '''
+
+        self.cancel_prefetch()
+        self.submit(self.http.aclose()).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+        logger.info(" [ENGINE] event loop thread --> stopped.")
+
+    async def chat_stream(self, model: str, messages: list,
+                          options: dict | None = None) -> AsyncIterator[str]:
+        '''
+        Streams the content of the response to a chat request.
+        '''
+
+        stream = await self.client.chat(model=model,
+                                        messages=messages,
+                                        options=options,
+                                        keep_alive=keep_alive.duration(model),
+                                        stream=True)
+
+        async for part in stream:
+            yield part["message"]["content"]
+
+    async def chat(self, model: str, messages: list,
+                   options: dict | None = None) -> str:
+        '''
+        Returns the content of the response to a chat request.
+        '''
+
+        response = await self.client.chat(
+                                        model=model,
+                                        messages=messages,
+                                        options=options,
+                                        keep_alive=keep_alive.duration(model))
+
+        return response["message"]["content"]
+
+    async def reduce_attachment(self, conversation: dev_assist.Conversation,
+                                query: str, add_file: str, text: str,
+                                on_progress: map_reduce.Progress | None = None
+                                ) -> str:
+        '''
+        Answers the query for the parts of a large file concurrently and
+        returns the prompt of the final request.
+        '''
+
+        options = conversation.request_options()
+
+        async def part_chat(messages: list) -> str:
+            return await self.chat(conversation.llm, messages, options)
+
+        return await map_reduce.reduce_prompt(
+                            part_chat, query, add_file, text,
+                            conversation.context_window.budget(
+                                                    conversation.llm),
+                            on_progress)
+
+    async def ask(self, conversation: dev_assist.Conversation,
+                  query: str,
+                  add_file: str = "",
+                  on_chunk: Callable[[str], None] | None = None,
+                  on_progress: map_reduce.Progress | None = None) -> str:
+        '''
+        Sends a query of a conversation and passes the response chunks to
+        'on_chunk' in the same format as 'Conversation.ask_stream()'.
+        A failed or cancelled request rolls the chat log back.
+        Cached responses are passed with the 'CACHED_HEADER', the answers
+        of similar queries are offered with the 'similar_header()' and are
+        not added to the chat log.
+        A file which does not fit into the context is processed in parts,
+        'on_progress' is called with the number of answered parts or the
+        embedded chunks of a folder which is indexed.
+        Returns the response or the error message.
+        '''
+
+        on_chunk = on_chunk or (lambda chunk: None)
+
+        # Wait for the previous turn of the conversation.
+        await acquire_thread_lock(conversation.turn_lock)
+
+        # 'cancel()' sees the task or the request sees the cancel.
+        with conversation.lock:
+            conversation.task = asyncio.current_task()
+
+        self.request_started(conversation.llm)
+        length = len(conversation.messages)
+
+        try:
+            if conversation.cancelled.is_set():
+                raise asyncio.CancelledError()
+
+            text = await asyncio.to_thread(conversation.large_attachment,
+                                           query, add_file)
+            last = None
+            header = dev_assist.RESPONSE_HEADER
+
+            if text is None:
+                await history_thread(conversation.add_query,
+                                     query, add_file, on_progress)
+
+            # The chat log keeps a reference to a large file, the final
+            # request combines the answers for its parts.
+            else:
+                await history_thread(conversation.add_query,
+                                     map_reduce.reference(query, add_file))
+
+                last = await self.reduce_attachment(conversation, query,
+                                                    add_file, text,
+                                                    on_progress)
+                header = dev_assist.PARTS_HEADER
+
+            key, cached = await asyncio.to_thread(conversation.cache_lookup,
+                                                  last)
+
+            if cached is not None:
+                await history_thread(conversation.add_response, cached)
+
+                on_chunk(dev_assist.CACHED_HEADER)
+                on_chunk(cached)
+                on_chunk(dev_assist.RESPONSE_END)
+
+                return cached
+
+            vector, similar = await asyncio.to_thread(
+                                            conversation.semantic_lookup,
+                                            query, add_file)
+
+            # The query is rolled back until the offer is accepted.
+            if similar is not None:
+                conversation.offer(query, similar)
+
+                on_chunk(dev_assist.similar_header(similar))
+                on_chunk(similar["answer"])
+                on_chunk(dev_assist.RESPONSE_END)
+
+                return similar["answer"]
+
+            response = ""
+            first_chunk = True
+
+            logger.info(" [QUERY] ollama async chat query --> send.")
+
+            # Fitting and expanding the chat log blocks, it runs in a
+            # thread.
+            messages = await asyncio.to_thread(conversation.request_messages,
+                                               last)
+
+            async for content in self.chat_stream(
+                                        conversation.llm,
+                                        messages,
+                                        conversation.request_options()):
+
+                if first_chunk:
+                    first_chunk = False
+                    on_chunk(header)
+
+                response += content
+                on_chunk(content)
+
+            await history_thread(conversation.add_response, response)
+            await asyncio.to_thread(conversation.cache_response,
+                                    key, response)
+            await asyncio.to_thread(conversation.semantic_store,
+                                    vector, query)
+
+            logger.info(" [RESPONSE] ollama async chat --> completed!")
+
+            on_chunk(dev_assist.RESPONSE_END)
+
+            return response
+
+        # The chat log is rolled back before the request is displayed as
+        # stopped.
+        except asyncio.CancelledError:
+            if len(conversation.messages) == length + 1:
+                conversation.rollback(length)
+
+            on_chunk(dev_assist.STOPPED)
+            raise
+
+        except Exception as error:
+            msg = dev_assist.error_message(error)
+            on_chunk(msg)
+            return msg
+
+        finally:
+            if len(conversation.messages) == length + 1:
+                conversation.rollback(length)
+
+            with conversation.lock:
+                conversation.task = None
+
+            conversation.turn_lock.release()
+            self.request_finished(conversation.llm)
+
+    def ask_future(self, conversation: dev_assist.Conversation,
+                   query: str,
+                   add_file: str = "",
+                   on_chunk: Callable[[str], None] | None = None,
+                   callback: Callable[[Future], None] | None = None,
+                   on_progress: map_reduce.Progress | None = None
+                   ) -> Future:
+        '''
+        Schedules 'ask()' and returns its future, 'Conversation.cancel()'
+        cancels the request. The future of a cancelled request is done once
+        the chat log is rolled back.
+        '''
+
+        conversation.cancelled.clear()
+
+        return self.submit(self.ask(conversation, query, add_file, on_chunk,
+                                    on_progress),
+                           callback)
+
+    def accept_future(self, conversation: dev_assist.Conversation,
+                      callback: Callable[[Future], None] | None = None
+                      ) -> Future:
+        '''
+        Schedules 'Conversation.accept_offer()' in a worker thread and
+        returns its future.
+        '''
+
+        return self.submit(asyncio.to_thread(conversation.accept_offer),
+                           callback)
+
+    async def list_models(self) -> list | str:
+        '''
+        Returns the names of the installed models.
+        '''
+
+        return lm.model_names(await self.client.list())
+
+    async def show(self, model: str) -> dict:
+        '''
+        Returns the complete information of a model.
+        '''
+
+        response = await self.http.post("/api/show", json={"model": model})
+        response.raise_for_status()
+
+        return response.json()
+
+    def request_started(self, model: str = "") -> None:
+        ''' Pauses the prefetch while a chat request is running. '''
+
+        self.requests += 1
+        self.active[model] += 1
+        self.idle.clear()
+
+    def request_finished(self, model: str = "") -> None:
+        ''' Resumes the prefetch once no chat request is running. '''
+
+        self.requests -= 1
+        self.active[model] -= 1
+
+        if self.active[model] <= 0:
+            del self.active[model]
+
+        if self.requests == 0:
+            self.idle.set()
+
+    async def prefetch(self, models: list,
+                       parallel: int = PREFETCH_PARALLEL) -> int:
+        '''
+        Fetches the metadata of the models into the metadata cache with at
+        most 'parallel' requests, a request is only started while no chat
+        request is running. Returns the number of fetched models.
+        '''
+
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def fetch(model: str) -> bool:
+            async with semaphore:
+                await self.idle.wait()
+
+                try:
+                    await asyncio.to_thread(lm.model_info, model)
+                    return True
+
+                except Exception as error:
+                    logger.warning(" [ENGINE] prefetch of %s --> %s",
+                                   model, error)
+                    return False
+
+        fetched = sum(await asyncio.gather(*(fetch(model)
+                                             for model in models)))
+
+        logger.info(" [ENGINE] metadata of %s models --> prefetched.",
+                    fetched)
+
+        return fetched
+
+    async def warm_up(self, model: str) -> str:
+        '''
+        Loads a model into memory with an empty request, it stays loaded
+        for its keep alive time. The request has the context size of the
+        chat requests, otherwise the server loads the model again for the
+        first query. Returns the model.
+        '''
+
+        logger.info(" [ENGINE] warm-up of %s --> started.", model)
+
+        await self.client.generate(model=model,
+                                   prompt="",
+                                   options=ContextWindow().options(model),
+                                   keep_alive=keep_alive.duration(model))
+
+        logger.info(" [ENGINE] %s --> loaded.", model)
+
+        return model
+
+    async def model_info(self, model: str, info_type: str) -> str:
+        '''
+        Returns one field of the information of a model for display, the
+        information is fetched once for each digest of the model.
+        '''
+
+        return await asyncio.to_thread(lm.show_model_info, model, info_type)
+
+    async def pull(self, model: str) -> str:
+        '''
+        Downloads and installs a model and returns the download message.
+        '''
+
+        try:
+            logger.info(" [LLM] starting download of model --> %s ...", model)
+            await self.client.pull(model)
+            lm.forget_digest(model)
+            return lm.download_message(model)
+
+        except ollama.ResponseError as error:
+            return lm.download_message(model, error)
+
+    async def create(self, new_model: str, new_modelfile: str) -> str:
+        '''
+        Creates a new model from a modelfile with the ollama command line
+        tool and returns the result message. Raises a CalledProcessError
+        if the tool fails.
+        '''
+
+        modelfile = await asyncio.to_thread(lm.write_modelfile,
+                                            new_model, new_modelfile)
+
+        command = ["ollama", "create", new_model, "-f", modelfile]
+        process = await asyncio.create_subprocess_exec(
+                                            *command, env=backend.environ())
+
+        if await process.wait() != 0:
+            logger.error(" [LLM] model -> %s creation has failed!", new_model)
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+        # The digest is forgotten once the new model replaced the old one.
+        lm.forget_digest(new_model)
+
+        logger.info(" [LLM] model -> %s has been created!", new_model)
+        return f" Model: {new_model} has been created!"
+
+    async def delete(self, model: str) -> bool:
+        '''
+        Deletes a model and its modelfile.
+        '''
+
+        await asyncio.to_thread(lm.delete_modelfile, model)
+        await self.client.delete(model)
+        lm.forget_digest(model)
+
+        logger.info(" model: %s --> deleted!", model)
+
+        return True
+
+    def chat_future(self, model: str, messages: list,
+                    options: dict | None = None,
+                    callback: Callable[[Future], None] | None = None
+                    ) -> Future:
+        ''' Schedules 'chat()' and returns its future. '''
+
+        return self.submit(self.chat(model, messages, options), callback)
+
+    def list_future(self, callback: Callable[[Future], None] | None = None
+                    ) -> Future:
+        ''' Schedules 'list_models()' and returns its future. '''
+
+        return self.submit(self.list_models(), callback)
+
+    def show_future(self, model: str,
+                    callback: Callable[[Future], None] | None = None
+                    ) -> Future:
+        ''' Schedules 'show()' and returns its future. '''
+
+        return self.submit(self.show(model), callback)
+
+    def prefetch_future(self, models: list) -> Future:
+        '''
+        Schedules 'prefetch()' and returns its future, a running prefetch
+        is cancelled.
+        '''
+
+        self.cancel_prefetch()
+        self.prefetching = self.submit(self.prefetch(models))
+
+        return self.prefetching
+
+    def cancel_prefetch(self) -> None:
+        ''' Cancels the running prefetch of the model metadata. '''
+
+        if self.prefetching is not None:
+            self.prefetching.cancel()
+            self.prefetching = None
+
+    def warm_up_future(self, model: str,
+                       callback: Callable[[Future], None] | None = None
+                       ) -> Future:
+        ''' Schedules 'warm_up()' and returns its future. '''
+
+        return self.submit(self.warm_up(model), callback)
+
+    def info_future(self, model: str, info_type: str,
+                    callback: Callable[[Future], None] | None = None
+                    ) -> Future:
+        ''' Schedules 'model_info()' and returns its future. '''
+
+        return self.submit(self.model_info(model, info_type), callback)
+
+    def pull_future(self, model: str,
+                    callback: Callable[[Future], None] | None = None
+                    ) -> Future:
+        ''' Schedules 'pull()' and returns its future. '''
+
+        return self.submit(self.pull(model), callback)
+
+    def create_future(self, new_model: str, new_modelfile: str,
+                      callback: Callable[[Future], None] | None = None
+                      ) -> Future:
+        ''' Schedules 'create()' and returns its future. '''
+
+        return self.submit(self.create(new_model, new_modelfile), callback)
+
+    def delete_future(self, model: str,
+                      callback: Callable[[Future], None] | None = None
+                      ) -> Future:
+        ''' Schedules 'delete()' and returns its future. '''
+
+        return self.submit(self.delete(model), callback)
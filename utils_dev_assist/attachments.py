@@ -0,0 +1,255 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+attachments.py--Reads the files attached to the requests.
+                A file is memory-mapped and hashed once for each path, size
+                and modification time. The decoded text, the index of its
+                lines and the token estimate are stored by the hash of the
+                content, a file attached again or a copy of it is not read
+                a second time. Binary and non UTF-8 files are detected
+                from the first bytes before the whole file is read.
+                The texts derived from the attachments, their diffs,
+                pruned and compressed versions, are cached by the hashes
+                of the contents within a limit of characters.
+'''
+
+import os
+import re
+import mmap
+import codecs
+import hashlib
+import threading
+from array import array
+from functools import cached_property
+from collections import OrderedDict
+from typing import Hashable
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.context_window import estimate_tokens
+
+logger = app_log(__name__)
+
+# Number of bytes checked for binary content before a file is read.
+SNIFF_BYTES = 8192
+
+
+class AttachmentError(ValueError):
+    '''
+    Raised if an attached file can not be used as text.
+    '''
+
+
+class Attachment:
+    '''
+    Class for the decoded content of an attached file.
+    '''
+
+    def __init__(self, digest: str, text: str):
+        self.digest = digest
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+    @cached_property
+    def line_index(self) -> array:
+        '''
+        Offsets of the first character of every line, built on first use.
+        '''
+
+        line_index = array("L", [0])
+        line_index.extend(match.end() for match in re.finditer("\n",
+                                                               self.text))
+
+        if line_index[-1] == len(self.text) and len(line_index) > 1:
+            line_index.pop()
+
+        return line_index
+
+    def line_count(self) -> int:
+        ''' Returns the number of lines of the text. '''
+
+        return len(self.line_index) if self.text else 0
+
+    def lines(self, start: int, end: int | None = None) -> str:
+        '''
+        Returns the lines 'start' to 'end' (excluded) counted from 0.
+        '''
+
+        end = self.line_count() if end is None else min(end,
+                                                        self.line_count())
+
+        if start >= end:
+            return ""
+
+        last = self.line_index[end] if end < self.line_count() \
+            else len(self.text)
+
+        return self.text[self.line_index[start]:last]
+
+
+def check_text(head: bytes, path: str) -> None:
+    '''
+    Raises an AttachmentError if the first bytes of a file are binary or
+    not UTF-8 encoded.
+    '''
+
+    if b"\x00" in head:
+        raise AttachmentError(f"{path} is a binary file!")
+
+    try:
+        # A character cut off at the end of the bytes is not an error.
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+
+    except UnicodeDecodeError as error:
+        raise AttachmentError(f"{path} is not UTF-8 encoded!") from error
+
+
+class AttachmentStore:
+    '''
+    Class for a content-addressed store of attached files.
+    The methods are thread-safe.
+    '''
+
+    def __init__(self, max_chars: int = 64 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+
+        # Hash of the content for each (path, size, mtime).
+        self.digests = {}
+
+        # Attachments by the hash of their content, least recently used
+        # first.
+        self.attachments = OrderedDict()
+        self.chars = 0
+
+    def load(self, path: str) -> Attachment:
+        '''
+        Returns the attachment of a file, the file is only read if its
+        size or modification time has changed.
+        '''
+
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+        with self.lock:
+            digest = self.digests.get(key)
+
+            if digest in self.attachments:
+                self.attachments.move_to_end(digest)
+                logger.debug(" [ATTACH FILE] %s --> cached.", path)
+                return self.attachments[digest]
+
+        attachment = self.read(path)
+
+        with self.lock:
+            self.digests[key] = attachment.digest
+
+            # A copy of a stored file keeps the stored attachment.
+            if attachment.digest in self.attachments:
+                self.attachments.move_to_end(attachment.digest)
+                return self.attachments[attachment.digest]
+
+            self.attachments[attachment.digest] = attachment
+            self.chars += len(attachment.text)
+
+            evicted = False
+
+            while self.chars > self.max_chars and len(self.attachments) > 1:
+                _, dropped = self.attachments.popitem(last=False)
+                self.chars -= len(dropped.text)
+                evicted = True
+
+            # Forget the files whose content is no longer stored.
+            if evicted:
+                self.digests = {key: digest
+                                for key, digest in self.digests.items()
+                                if digest in self.attachments}
+
+        return attachment
+
+    def read(self, path: str) -> Attachment:
+        '''
+        Memory-maps, checks, hashes and decodes a file.
+        '''
+
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return Attachment(hashlib.sha256().hexdigest(), "")
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+                check_text(mem[:SNIFF_BYTES], path)
+
+                digest = hashlib.sha256(mem).hexdigest()
+
+                with self.lock:
+                    if digest in self.attachments:
+                        return self.attachments[digest]
+
+                try:
+                    text = str(mem, "utf-8")
+
+                except UnicodeDecodeError as error:
+                    raise AttachmentError(
+                                f"{path} is not UTF-8 encoded!") from error
+
+        logger.info(" [ATTACH FILE] %s --> read and hashed.", path)
+
+        return Attachment(digest, text)
+
+
+class DerivedCache:
+    '''
+    Class for a cache of the texts and attachments derived from attached
+    files. The keys hold the hashes of the contents, not the attachments,
+    and the least recently used entries are dropped above 'max_chars'.
+    The methods are thread-safe.
+    '''
+
+    def __init__(self, max_chars: int = 16 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+
+        # Derived texts or attachments, least recently used first.
+        self.entries = OrderedDict()
+        self.chars = 0
+
+    @staticmethod
+    def size(value: str | Attachment) -> int:
+        ''' Returns the number of characters of an entry. '''
+
+        return len(value.text if isinstance(value, Attachment) else value)
+
+    def get(self, key: Hashable) -> str | Attachment | None:
+        ''' Returns a cached entry or None. '''
+
+        with self.lock:
+            if key not in self.entries:
+                return None
+
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key: Hashable, value: str | Attachment) -> None:
+        '''
+        Caches an entry, an entry larger than the limit is not cached.
+        '''
+
+        size = self.size(value)
+
+        if size > self.max_chars:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.chars -= self.size(self.entries.pop(key))
+
+            self.entries[key] = value
+            self.chars += size
+
+            while self.chars > self.max_chars:
+                _, dropped = self.entries.popitem(last=False)
+                self.chars -= self.size(dropped)
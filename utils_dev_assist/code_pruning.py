@@ -0,0 +1,172 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+code_pruning.py--Prunes attached Python files to the parts relevant for a
+                 query. The file is parsed with 'ast', the functions and
+                 classes named in the query are kept together with the
+                 functions they call and the functions which call them.
+                 All other functions are collapsed to their signature and
+                 docstring, imports and module level statements are kept.
+'''
+
+import re
+import ast
+from typing import Iterator, List, Set
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+Definition = ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef
+
+DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def definitions(tree: ast.AST) -> Iterator[Definition]:
+    ''' Yields all functions and classes of a syntax tree. '''
+
+    for node in ast.walk(tree):
+        if isinstance(node, DEFINITIONS):
+            yield node
+
+
+def called_names(node: ast.AST) -> Set[str]:
+    '''
+    Returns the names of the functions and methods called inside a node.
+    '''
+
+    names = set()
+
+    for child in ast.walk(node):
+        if not isinstance(child, ast.Call):
+            continue
+
+        if isinstance(child.func, ast.Name):
+            names.add(child.func.id)
+
+        elif isinstance(child.func, ast.Attribute):
+            names.add(child.func.attr)
+
+    return names
+
+
+def relevant_names(tree: ast.AST, query: str) -> Set[str]:
+    '''
+    Returns the names of the definitions mentioned in the query, their
+    direct callees and their direct callers.
+    '''
+
+    words = {word.lower() for word in re.findall(r"[A-Za-z_]\w*", query)}
+    nodes = list(definitions(tree))
+
+    mentioned = {node.name for node in nodes if node.name.lower() in words}
+
+    if not mentioned:
+        return set()
+
+    names = {node.name for node in nodes}
+    relevant = set(mentioned)
+
+    for node in nodes:
+        calls = called_names(node)
+
+        if node.name in mentioned:
+            relevant |= calls & names
+
+        elif calls & mentioned:
+            relevant.add(node.name)
+
+    return relevant
+
+
+def first_line(node: Definition) -> int:
+    ''' Returns the first line of a definition including decorators. '''
+
+    return min([node.lineno] + [decorator.lineno
+                                for decorator in node.decorator_list])
+
+
+def stub(node: Definition, lines: List[str]) -> List[str]:
+    '''
+    Returns the signature and the docstring of a function followed by an
+    ellipsis.
+    '''
+
+    body = node.body[0]
+
+    # A function defined on a single line is kept.
+    if body.lineno == node.lineno:
+        return lines[first_line(node) - 1:node.end_lineno]
+
+    kept = lines[first_line(node) - 1:body.lineno - 1]
+
+    if ast.get_docstring(node, clean=False) is not None:
+        kept += lines[body.lineno - 1:body.end_lineno]
+
+    if not kept[-1].endswith("\n"):
+        kept[-1] += "\n"
+
+    return kept + [" " * body.col_offset + "...\n"]
+
+
+def prune_body(body: List[ast.stmt], lines: List[str],
+               relevant: Set[str]) -> List[tuple]:
+    '''
+    Returns the replaced line ranges of the definitions of a body as
+    (first line, last line, replacement lines).
+    '''
+
+    replaced = []
+
+    for node in body:
+        if not isinstance(node, DEFINITIONS) or node.name in relevant:
+            continue
+
+        if isinstance(node, ast.ClassDef):
+            replaced += prune_body(node.body, lines, relevant)
+
+        # A function with a relevant nested function is kept.
+        elif not any(child.name in relevant
+                     for child in definitions(node) if child is not node):
+            replaced.append((first_line(node), node.end_lineno,
+                             stub(node, lines)))
+
+    return replaced
+
+
+def prune_python(text: str, query: str) -> str | None:
+    '''
+    Returns the source code pruned to the definitions relevant for the
+    query. Returns None if the code can not be parsed or the query does
+    not name any of its functions or classes.
+    '''
+
+    try:
+        tree = ast.parse(text)
+
+    except (SyntaxError, ValueError) as error:
+        logger.warning(" [PRUNE] source not parsed --> %s", error)
+        return None
+
+    relevant = relevant_names(tree, query)
+
+    if not relevant:
+        return None
+
+    lines = text.splitlines(keepends=True)
+
+    # The ranges are replaced from the end, the line numbers of the
+    # earlier ranges stay valid.
+    for start, end, replacement in sorted(prune_body(tree.body, lines,
+                                                     relevant),
+                                          reverse=True):
+        lines[start - 1:end] = replacement
+
+    logger.debug(" [PRUNE] %s --> kept.", ", ".join(sorted(relevant)))
+
+    return "".join(lines)
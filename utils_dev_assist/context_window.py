@@ -0,0 +1,234 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+context_window.py--Keeps the chat history that is sent to the Ollama server
+                   within a token budget for each model.
+                   The token count of a message is estimated from its
+                   length, a policy decides which messages of the history
+                   are sent with a request. The budgets are stored in the
+                   '.context_config.cfg' file.
+'''
+
+import os
+import json
+from math import ceil
+from typing import Callable, Dict, List, Set
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+CONFIG_FILE = ".context_config.cfg"
+
+# Average number of characters per token and the tokens every message
+# costs for its role and formatting.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4
+
+Policy = Callable[[List[dict], int, Set[int]], List[int]]
+
+
+def estimate_tokens(text: str) -> int:
+    '''
+    Returns an estimate of the number of tokens of a text.
+    '''
+
+    return ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: dict) -> int:
+    '''
+    Returns an estimate of the number of tokens of a chat message.
+    '''
+
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def drop_oldest(messages: List[dict], budget: int,
+                pinned: Set[int]) -> List[int]:
+    '''
+    Keeps the pinned messages and as many of the latest messages as fit
+    into the budget, the oldest messages are dropped first.
+    Returns the indices of the messages to keep.
+    '''
+
+    keep = set(pinned)
+    used = sum(message_tokens(messages[idx]) for idx in keep)
+
+    for idx in range(len(messages) - 1, -1, -1):
+        if idx in keep:
+            continue
+
+        tokens = message_tokens(messages[idx])
+
+        # The latest message is always sent.
+        if used + tokens > budget and idx != len(messages) - 1:
+            break
+
+        keep.add(idx)
+        used += tokens
+
+    return sorted(keep)
+
+
+def keep_system_last_n(last_n: int) -> Policy:
+    '''
+    Returns a policy which keeps the pinned and system messages and the
+    last 'last_n' messages, trimmed to the budget.
+    '''
+
+    def policy(messages: List[dict], budget: int,
+               pinned: Set[int]) -> List[int]:
+
+        first = max(0, len(messages) - last_n)
+
+        fixed = set(pinned)
+        fixed.update(idx for idx, message in enumerate(messages[:first])
+                     if message["role"] == "system")
+
+        # The pinned messages within the last messages are counted by
+        # 'drop_oldest()'.
+        recent = list(range(first, len(messages)))
+        kept = drop_oldest([messages[idx] for idx in recent],
+                           budget - sum(message_tokens(messages[idx])
+                                        for idx in fixed if idx < first),
+                           {pos for pos, idx in enumerate(recent)
+                            if idx in fixed})
+
+        return sorted(fixed.union(recent[pos] for pos in kept))
+
+    return policy
+
+
+POLICIES = {"drop_oldest": drop_oldest,
+            "system_last_n": keep_system_last_n(6)}
+
+
+def write_config_file(default_ctx: int = 4096,
+                      reserve: int = 1024,
+                      policy: str = "drop_oldest",
+                      models: Dict[str, int] | None = None) -> None:
+    '''
+    Writes a JSON config file with the default context size 'default_ctx',
+    the tokens reserved for the response, the policy and the context size
+    for each model.
+    '''
+
+    with open(CONFIG_FILE, "w", encoding="utf-8") as cfg:
+        context_settings = {"default_ctx": default_ctx,
+                            "reserve": reserve,
+                            "policy": policy,
+                            "models": models or {}}
+
+        cfg.write(json.dumps(context_settings, indent=4))
+
+        logger.debug(" [CONTEXT] config file -> created!")
+
+
+def read_config_file() -> dict:
+    '''
+    Retrieves the context settings from the config file.
+    '''
+
+    with open(CONFIG_FILE, "r", encoding="utf-8") as cfg:
+        return json.load(cfg)
+
+
+class ContextWindow:
+    '''
+    Class to select the messages of a chat history that fit into the
+    context budget of a model.
+    '''
+
+    def __init__(self, policy: str | Policy | None = None):
+        self.settings = read_config_file()
+
+        if policy is None:
+            policy = self.settings["policy"]
+
+        self.policy = POLICIES[policy] if isinstance(policy, str) else policy
+
+        # Indices of the messages which are always sent.
+        self.pinned: Set[int] = set()
+
+    def num_ctx(self, model: str) -> int:
+        '''
+        Returns the context size of a model.
+        '''
+
+        return self.settings["models"].get(model,
+                                           self.settings["default_ctx"])
+
+    def set_num_ctx(self, model: str, num_ctx: int) -> None:
+        '''
+        Sets and stores the context size of a model.
+        '''
+
+        self.settings["models"][model] = num_ctx
+        write_config_file(**self.settings)
+
+        logger.debug(" [CONTEXT] %s context size -> %s.", model, num_ctx)
+
+    def budget(self, model: str) -> int:
+        '''
+        Returns the tokens available for the chat history of a model.
+        '''
+
+        return max(1, self.num_ctx(model) - self.settings["reserve"])
+
+    def pin(self, index: int) -> None:
+        ''' Pins the message at 'index' so it is always sent. '''
+
+        self.pinned.add(index)
+
+    def unpin(self, index: int) -> None:
+        ''' Unpins the message at 'index'. '''
+
+        self.pinned.discard(index)
+
+    def fit(self, messages: List[dict], model: str) -> List[dict]:
+        '''
+        Returns the messages to send to 'model'.
+        '''
+
+        pinned = {idx for idx in self.pinned if idx < len(messages)}
+        keep = self.policy(messages, self.budget(model), pinned)
+
+        if len(keep) < len(messages):
+            logger.info(" [CONTEXT] %s of %s messages dropped for %s.",
+                        len(messages) - len(keep), len(messages), model)
+
+        return [messages[idx] for idx in keep]
+
+    def usage(self, messages: List[dict], model: str) -> tuple[int, int]:
+        '''
+        Returns the estimated tokens of the messages sent to 'model' and
+        its budget.
+        '''
+
+        tokens = sum(message_tokens(message)
+                     for message in self.fit(messages, model))
+
+        return tokens, self.budget(model)
+
+    def options(self, model: str) -> dict:
+        '''
+        Returns the request options so the server uses the context size
+        configured for a model instead of silently truncating the history.
+        Without a configured size the context of the modelfile is kept,
+        the default size is then only used for the budget.
+        '''
+
+        if model not in self.settings["models"]:
+            return {}
+
+        return {"num_ctx": self.num_ctx(model)}
+
+
+if not os.path.isfile(CONFIG_FILE):
+    write_config_file()
@@ -0,0 +1,190 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+conversation_store.py--Stores the conversations (sessions) and their messages
+                       in a SQLite database.
+                       The message bodies are zlib compressed, sessions are
+                       listed without touching their messages and messages
+                       are loaded page by page from the newest to the oldest.
+'''
+
+import time
+import zlib
+import sqlite3
+import threading
+from typing import List
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+DB_FILE = ".dev_assist.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    body BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+"""
+
+
+def compress(content: str) -> bytes:
+    ''' Returns the zlib compressed content of a message. '''
+
+    return zlib.compress(content.encode("utf-8"))
+
+
+def decompress(body: bytes) -> str:
+    ''' Returns the content of a compressed message body. '''
+
+    return zlib.decompress(body).decode("utf-8")
+
+
+class ConversationStore:
+    '''
+    Class to store sessions and their messages in a SQLite database.
+    The store can be used from several threads.
+    '''
+
+    def __init__(self, path: str = DB_FILE):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA foreign_keys=ON")
+            self.db.executescript(SCHEMA)
+
+        logger.debug(" [STORE] conversation store %s -> opened.", path)
+
+    def create_session(self, title: str, model: str) -> int:
+        '''
+        Creates a new session and returns its id.
+        '''
+
+        now = time.time()
+
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                        "INSERT INTO sessions (title, model, created, updated)"
+                        " VALUES (?, ?, ?, ?)",
+                        (title, model, now, now))
+
+        logger.info(" [STORE] session %s --> created.", cursor.lastrowid)
+
+        return cursor.lastrowid
+
+    def list_sessions(self, limit: int = 50, offset: int = 0) -> List[dict]:
+        '''
+        Returns the latest sessions without loading their messages.
+        '''
+
+        with self.lock:
+            rows = self.db.execute(
+                        "SELECT id, title, model, updated, message_count"
+                        " FROM sessions ORDER BY updated DESC"
+                        " LIMIT ? OFFSET ?",
+                        (limit, offset)).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def rename_session(self, session_id: int, title: str) -> None:
+        ''' Changes the title of a session. '''
+
+        with self.lock, self.db:
+            self.db.execute("UPDATE sessions SET title = ? WHERE id = ?",
+                            (title, session_id))
+
+    def delete_session(self, session_id: int) -> None:
+        ''' Deletes a session and its messages. '''
+
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM sessions WHERE id = ?",
+                            (session_id,))
+
+        logger.info(" [STORE] session %s --> deleted.", session_id)
+
+    def add_messages(self, session_id: int, messages: List[dict]) -> None:
+        '''
+        Adds chat messages to a session.
+        '''
+
+        now = time.time()
+        rows = [(session_id, message["role"], compress(message["content"]),
+                 now) for message in messages]
+
+        with self.lock, self.db:
+            self.db.executemany(
+                        "INSERT INTO messages (session_id, role, body,"
+                        " created) VALUES (?, ?, ?, ?)",
+                        rows)
+
+            self.db.execute(
+                        "UPDATE sessions SET updated = ?,"
+                        " message_count = message_count + ? WHERE id = ?",
+                        (now, len(rows), session_id))
+
+        logger.debug(" [STORE] %s messages added to session %s.",
+                     len(rows), session_id)
+
+    def load_page(self, session_id: int,
+                  before_id: int | None = None,
+                  limit: int = 20) -> List[dict]:
+        '''
+        Returns up to 'limit' messages of a session which are older than the
+        message 'before_id' (the newest messages if it is None), oldest
+        first. Every message contains its 'id' to load the previous page.
+        '''
+
+        if before_id is None:
+            # Largest possible SQLite row id.
+            before_id = 2 ** 63 - 1
+
+        with self.lock:
+            rows = self.db.execute(
+                        "SELECT id, role, body FROM messages"
+                        " WHERE session_id = ? AND id < ?"
+                        " ORDER BY id DESC LIMIT ?",
+                        (session_id, before_id, limit)).fetchall()
+
+        return [{"id": row["id"],
+                 "role": row["role"],
+                 "content": decompress(row["body"])} for row in reversed(rows)]
+
+    def has_older(self, session_id: int, before_id: int) -> bool:
+        '''
+        Checks if a session has messages older than the message 'before_id'.
+        '''
+
+        with self.lock:
+            row = self.db.execute(
+                        "SELECT 1 FROM messages"
+                        " WHERE session_id = ? AND id < ? LIMIT 1",
+                        (session_id, before_id)).fetchone()
+
+        return row is not None
+
+    def close(self) -> None:
+        ''' Closes the database. '''
+
+        with self.lock:
+            self.db.close()
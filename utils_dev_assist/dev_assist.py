@@ -10,20 +10,116 @@
 dev_assist.py--This module provides an AI assistant for programming-related
                queries or any other topics. It uses OLLAMA API to generate
                responses based on user input and appends it to the chat log.
-               The 'ask()' function takes in a query, language model name,
-               and an optional file path as arguments and returns the response
-               generated by the AI assistant.
+               A 'Conversation' owns its chat log, model and options, its
+               'ask()' method takes in a query and an optional file path and
+               returns the response generated by the AI assistant.
+               With 'stream=True' the response is returned as a generator
+               which yields the chunks as the server produces them.
+               Conversations are independent of each other and can send
+               requests at the same time, the server processes them in
+               parallel up to its 'OLLAMA_NUM_PARALLEL' setting.
+               A streamed request is cancelled by closing its connection,
+               the server stops generating for this request only and the
+               chat log is rolled back to the state before the request.
+               Conversations with 'use_cache' enabled and a temperature of
+               0 reuse the stored response of an identical request.
+               With 'use_semantic_cache' enabled the answer of a similar
+               earlier first query without an attached file is offered
+               instead of generating a new response, it is added to the
+               chat log once it is accepted with 'accept_offer()'.
+               Attached files are read through the 'attachment_store',
+               files which do not fit into the context of the model are
+               processed in parts with 'map_reduce', the parts of a
+               synchronous request are sent from a thread pool. The chat
+               log keeps
+               attachments by reference, every file is held once per
+               conversation and a file attached again is sent as a short
+               reference to the same file above, or as a unified diff to
+               the version above if it has changed.
+               For an attached folder only the parts of its files which
+               are most similar to the query are added from its
+               'repo_index'.
+               With 'prune_code' enabled an attached Python file is pruned
+               with 'code_pruning' to the functions and classes named in
+               the query, their callees and their callers.
+               With 'compress' enabled redundant content of attached files
+               is removed with the rules of 'prompt_compression'.
 '''
 
 import os
+import json
+import hashlib
+import socket
+import asyncio
+import difflib
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Iterator
+import numpy as np
 import ollama
 import httpx
 from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.context_window import ContextWindow, message_tokens
+from utils_dev_assist.conversation_store import ConversationStore
+from utils_dev_assist.response_cache import ResponseCache, cache_key
+from utils_dev_assist.response_cache import deterministic
+from utils_dev_assist.semantic_cache import SemanticCache
+from utils_dev_assist.context_window import estimate_tokens
+from utils_dev_assist import map_reduce
+from utils_dev_assist.attachments import Attachment, AttachmentStore
+from utils_dev_assist.attachments import DerivedCache
+from utils_dev_assist import repo_index
+from utils_dev_assist.code_pruning import prune_python
+from utils_dev_assist import prompt_compression
+from utils_dev_assist import keep_alive
+from utils_dev_assist.ollama_backend import backend
+from utils_dev_assist import llm_models as lm
 
 logger = app_log(__name__)
 
-# Initializing an empty list for storing the chat messages.
-chat_messages = []
+# Stores the conversations of all sessions.
+store = ConversationStore()
+
+# Responses of deterministic requests.
+response_cache = ResponseCache()
+
+# Answers of earlier queries found by their similarity.
+semantic_cache = SemanticCache()
+
+# Decoded content of the attached files.
+attachment_store = AttachmentStore()
+
+# Diffs, pruned and compressed versions of the attached files by the hashes
+# of their contents.
+derived_cache = DerivedCache()
+
+# Number of messages loaded at once from the store.
+PAGE_SIZE = 20
+
+# Address of the Ollama server, set in the '.backend_config.cfg' file or
+# with the 'OLLAMA_HOST' environment variable.
+OLLAMA_HOST = backend.host
+
+# HTTP client for the streamed chat requests, it shares the connection
+# pool of the ollama client.
+http_client = backend.http
+
+# Displayed before and after a streamed response and when a request was
+# stopped by the user.
+RESPONSE_HEADER = "\n\u27BE Response: \n"
+CACHED_HEADER = "\n\u27BE Response (cached): \n"
+PARTS_HEADER = "\n\u27BE Response (file processed in parts): \n"
+RESPONSE_END = "\n\n"
+STOPPED = "\n\u27BE Request stopped!\n\n"
+
+# Sent instead of the content of a file which is attached again.
+SAME_FILE = "[same file as above: {name}]"
+CHANGED_FILE = "[changes of {name} since the version above:]"
+
+# Precedes the content of a pruned Python file.
+PRUNED_FILE = ("[functions not relevant for the query are collapsed to"
+               " their signature, {saved} of {total} estimated tokens"
+               " left out:]\n")
 
 
 def create_message(message: str, role: str) -> dict:
@@ -37,80 +133,908 @@ def create_message(message: str, role: str) -> dict:
             'content': message}
 
 
-def chat(llm: str) -> str:
+def file_diff(old: Attachment, new: Attachment, name: str) -> str:
     '''
-    Send a message to OLLAMA's server. The function returns response from
-    AI assistant in JSON format if successful, otherwise an error string is
-    returned with traceback information for debugging purposes.
+    Returns the unified diff of two versions of an attached file.
     '''
 
-    try:
-        logger.info(" [QUERY] ollama chat query --> send.")
+    key = ("diff", old.digest, new.digest, name)
+
+    if (diff := derived_cache.get(key)) is None:
+        diff = "\n".join(difflib.unified_diff(old.text.splitlines(),
+                                              new.text.splitlines(),
+                                              fromfile=f"{name} (above)",
+                                              tofile=name,
+                                              lineterm=""))
+        derived_cache.put(key, diff)
+
+    return diff
+
+
+def prune_attachment(attachment: Attachment, query: str) -> Attachment:
+    '''
+    Returns an attached Python file pruned to the parts relevant for the
+    query, or the attachment itself if nothing can be left out.
+    '''
+
+    key = ("prune", attachment.digest, query)
+
+    if (cached := derived_cache.get(key)) is not None:
+        return cached
+
+    pruned = prune_python(attachment.text, query)
+
+    if pruned is None or estimate_tokens(pruned) >= attachment.tokens:
+        derived_cache.put(key, attachment)
+        return attachment
+
+    saved = attachment.tokens - estimate_tokens(pruned)
+    text = PRUNED_FILE.format(saved=saved, total=attachment.tokens) + pruned
+
+    logger.info(" [PRUNE] %s of %s estimated tokens --> left out.",
+                saved, attachment.tokens)
+
+    attachment = Attachment(hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                            text)
+    derived_cache.put(key, attachment)
+
+    return attachment
+
+
+def compress_attachment(attachment: Attachment, kind: str) -> Attachment:
+    '''
+    Returns an attached file compressed with the rules for its kind, or
+    the attachment itself if nothing was removed.
+    '''
+
+    key = ("compress", attachment.digest, kind)
+
+    if (compressed := derived_cache.get(key)) is not None:
+        return compressed
+
+    text = prompt_compression.compress(attachment.text, kind)
 
-        # Calling the ollama API to get the assistant response.
-        ollama_response = ollama.chat(model=llm,
-                                      messages=chat_messages)
+    if text != attachment.text:
+        attachment = Attachment(hashlib.sha256(text.encode("utf-8"))
+                                .hexdigest(), text)
 
-    except ollama._types.ResponseError as error:
+    derived_cache.put(key, attachment)
+
+    return attachment
+
+
+def expand_messages(messages: list, blobs: dict) -> list:
+    '''
+    Returns the messages with the content of their attached files, only the
+    first message of a file carries its content, the messages which attach
+    it again carry a reference to it. A changed version of a file is sent
+    as a diff to the version above unless the diff is larger than the
+    file.
+    '''
+
+    expanded = []
+    seen = set()
+
+    # Last version of each attached path.
+    versions = {}
+
+    for message in messages:
+        digest = message.get("attachment")
+        content = message["content"]
+
+        if digest is None:
+            expanded.append(create_message(content, message["role"]))
+            continue
+
+        path = message["file"]
+        name = os.path.basename(path)
+        attachment = blobs[digest]
+        previous = versions.get(path)
+        versions[path] = attachment
+
+        if digest in seen and previous in (None, attachment):
+            content = f"{content} \n {SAME_FILE.format(name=name)}"
+
+        elif previous is not None and \
+                len(diff := file_diff(previous, attachment, name)) < \
+                len(attachment.text):
+            seen.add(digest)
+            content = (f"{content} \n {CHANGED_FILE.format(name=name)}"
+                       f"\n{diff}")
+
+        else:
+            seen.add(digest)
+            content = f"{content} \n {attachment.text}"
+
+        expanded.append(create_message(content, message["role"]))
+
+    return expanded
+
+
+def similar_header(similar: dict) -> str:
+    '''
+    Returns the header displayed before the offered answer of a similar
+    query.
+    '''
+
+    query = similar["query"].strip().split("\n")[0][:60]
+
+    return (f"\n\u27BE Offered response (similar request: '{query}',"
+            f" similarity {similar['similarity']:.2f}): \n")
+
+
+def error_message(error: Exception) -> str:
+    '''
+    Returns the message displayed for an error of a request.
+    '''
+
+    if isinstance(error, ollama._types.ResponseError):
         logger.error(" [RESPONSE]  --> %s", error.error)
         error_msg = error.error.split("/")
         return f"{error_msg[0]}!"
 
-    except httpx.RemoteProtocolError:
+    if isinstance(error, httpx.RemoteProtocolError):
         return "Server disconnected without sending a response!"
 
-    except Exception as error:
-        return f"error:\n{error}"
+    return f"error:\n{error}"
+
+
+def check_response(response: httpx.Response) -> None:
+    '''
+    Raises a ResponseError if the server returned an error.
+    '''
 
-    # Preparing the assistant message by concatenating the response
-    # from the API.
-    assistant_message = ""
-    assistant_message += ollama_response["message"]["content"]
+    if response.is_error:
+        response.read()
 
-    # Adding the response message to the chat log.
-    chat_messages.append(create_message(assistant_message, "assistant"))
+        try:
+            error = json.loads(response.text)["error"]
 
-    logger.info(" [RESPONSE] ollama chat response --> returned!")
+        except (ValueError, KeyError):
+            error = response.text
 
-    # Return the API response.
-    response = f"\n{ollama_response['message']['content']}\n"
-    return f"\n\u27BE Response: {response}\n"
+        raise ollama.ResponseError(error, response.status_code)
 
 
-def ask(query: str, llm: str, add_file: str) -> str:
-    """
-    The 'ask()' function is used to send messages to the chat().
-    """
+def close_connection(response: httpx.Response) -> None:
+    '''
+    Closes the connection of a streamed response. A read blocked in another
+    thread returns immediately and the server stops generating.
+    '''
+
+    try:
+        network_stream = response.extensions["network_stream"]
+        network_stream.get_extra_info("socket").shutdown(socket.SHUT_RDWR)
+
+    except (KeyError, AttributeError, OSError):
+        response.close()
+
+
+class Conversation:
+    '''
+    Class for a conversation with its own chat log, model and options.
+    The methods are thread-safe, the turns of a conversation are processed
+    one after the other.
+    '''
+
+    def __init__(self, llm: str = "",
+                 options: dict | None = None,
+                 session_id: int | None = None):
+        self.llm = llm
+        self.options = dict(options or {})
+        self.session_id = session_id
+        self.messages = []
+
+        # Responses are cached if enabled and the temperature is 0.
+        self.use_cache = False
+        self.use_semantic_cache = semantic_cache.settings["enabled"]
+
+        # Attached Python files are pruned to the parts relevant for the
+        # query if enabled.
+        self.prune_code = False
+
+        # Redundant content of attached files is removed if enabled.
+        self.compress = prompt_compression.settings["enabled"]
+
+        # Attachments of the chat log by the hash of their content.
+        self.blobs = {}
+
+        # Stored messages loaded with 'from_session()'.
+        self.loaded = []
+
+        # Selects the chat messages which fit into the context of a model.
+        self.context_window = ContextWindow()
+
+        # 'lock' protects the chat log, 'turn_lock' is held for a whole
+        # request and response.
+        self.lock = threading.RLock()
+        self.turn_lock = threading.Lock()
+
+        # Streamed response or task of the request in flight and the event
+        # which is set when it gets cancelled.
+        self.response: httpx.Response | None = None
+        self.task: asyncio.Task | None = None
+        self.cancelled = threading.Event()
+
+        # Answer of a similar earlier query offered for the last query, it
+        # is added to the chat log by 'accept_offer()'. A query whose offer
+        # was declined is looked up once without a hit.
+        self.offered: dict | None = None
+        self.declined: str | None = None
+
+    @classmethod
+    def from_session(cls, session_id: int, llm: str = "") -> "Conversation":
+        '''
+        Opens a stored session. Only the latest pages of messages which fit
+        into the context budget of the model are loaded into the chat log,
+        they are available with their store ids in 'loaded'.
+        '''
+
+        conversation = cls(llm, session_id=session_id)
+
+        budget = conversation.context_window.budget(llm)
+        loaded = []
+        tokens = 0
+        before_id = None
+
+        while tokens < budget:
+            page = store.load_page(session_id, before_id, PAGE_SIZE)
+            loaded = page + loaded
+
+            tokens += sum(message_tokens(message) for message in page)
+
+            if len(page) < PAGE_SIZE:
+                break
+
+            before_id = page[0]["id"]
+
+        conversation.messages = [create_message(message["content"],
+                                                message["role"])
+                                 for message in loaded]
+        conversation.loaded = loaded
+
+        logger.info(" [STORE] session %s --> opened with %s messages.",
+                    session_id, len(loaded))
+
+        return conversation
+
+    def request_messages(self, last: str | None = None) -> list:
+        '''
+        Returns the messages of the chat log sent with a request.
+        'last' replaces the content of the last message.
+        '''
+
+        with self.lock:
+            messages = self.messages
+
+            if last is not None:
+                messages = messages[:-1] + [create_message(last, "user")]
+
+            # A dropped message may have carried the content of a file
+            # which the kept messages refer to, the kept messages are
+            # expanded and fitted again until none is dropped.
+            while True:
+                expanded = expand_messages(messages, self.blobs)
+                fitted = self.context_window.fit(expanded, self.llm)
+
+                if len(fitted) == len(expanded):
+                    return fitted
+
+                index = {id(message): idx
+                         for idx, message in enumerate(expanded)}
+                messages = [messages[index[id(message)]]
+                            for message in fitted]
+
+    def request_options(self) -> dict:
+        '''
+        Returns the options sent with a request.
+        '''
+
+        return {**self.context_window.options(self.llm), **self.options}
+
+    def cache_lookup(self, last: str | None = None
+                     ) -> tuple[str | None, str | None]:
+        '''
+        Returns the cache key of the next request and its cached response.
+        The key is None if the request can not be cached.
+        '''
+
+        options = self.request_options()
+
+        if not self.use_cache or not deterministic(options):
+            return None, None
+
+        digest = lm.model_digest(self.llm)
+
+        if digest is None:
+            return None, None
+
+        key = cache_key(digest, self.request_messages(last), options)
+
+        return key, response_cache.get(key)
+
+    def cache_response(self, key: str | None, response: str) -> None:
+        '''
+        Stores the response of a request with a cache key.
+        '''
+
+        if key is not None:
+            response_cache.put(key, response)
+
+    def semantic_lookup(self, query: str, add_file: str = ""
+                        ) -> tuple[np.ndarray | None, dict | None]:
+        '''
+        Returns the embedding of a query and the entry of the most similar
+        earlier query if it reaches the threshold. Queries with an attached
+        file and queries after the first turn are not looked up, the
+        answers are stored without the history they depend on.
+        '''
+
+        if not self.use_semantic_cache or add_file != "":
+            return None, None
+
+        with self.lock:
+            if len(self.messages) > 1:
+                return None, None
+
+            declined = self.declined == query
+            self.declined = None
+
+        vector = semantic_cache.embed(query)
+
+        if vector is None or declined:
+            return vector, None
+
+        return vector, semantic_cache.lookup(self.llm, vector)
+
+    def offer(self, query: str, similar: dict) -> None:
+        '''
+        Offers the answer of a similar earlier query for a query, the query
+        is not kept in the chat log until the offer is accepted.
+        '''
+
+        with self.lock:
+            self.offered = {"query": query, "answer": similar["answer"]}
+
+        logger.info(" [SEMANTIC CACHE] similar answer --> offered.")
+
+    def accept_offer(self) -> bool:
+        '''
+        Adds the offered query and answer to the chat log and stores the
+        turn. Returns False if there is no offer.
+        '''
+
+        with self.turn_lock:
+            with self.lock:
+                offered = self.offered
+
+            if offered is None:
+                return False
+
+            self.add_query(offered["query"])
+            self.add_response(offered["answer"])
+
+        logger.info(" [SEMANTIC CACHE] similar answer --> accepted.")
+
+        return True
+
+    def decline_offer(self) -> str | None:
+        '''
+        Declines the offered answer, the next request of the query is
+        generated. Returns the query of the offer.
+        '''
+
+        with self.lock:
+            offered, self.offered = self.offered, None
 
-    # If a file is attached to the query, read and add the files
-    # content to the query.
-    if add_file != "":
-        with open(add_file, "r", encoding="utf-8") as file:
-            query = f"{query} \n {file.read()}"
+            if offered is None:
+                return None
 
-        logger.info(" %s has been attached to the request.", add_file)
+            self.declined = offered["query"]
 
-    # Append user query to the chat_messages.
-    chat_messages.append(create_message(query, "user"))
-    # Send the query to the API and store the response.
-    response = chat(llm)
+        return offered["query"]
 
-    # Return the API response to the GUI.
-    return response
+    def semantic_store(self, vector: np.ndarray | None, query: str) -> None:
+        '''
+        Adds a query and the response of the last turn to the semantic
+        cache.
+        '''
 
+        if vector is None:
+            return
 
-def restart_ollama_server(operating_system):
+        with self.lock:
+            answer = self.messages[-1]["content"]
+
+        semantic_cache.add(self.llm, query, answer, vector)
+
+    def load_attachment(self, query: str, add_file: str) -> Attachment:
+        '''
+        Returns the attachment of a file, a Python file is pruned for the
+        query if 'prune_code' is enabled and the file is compressed if
+        'compress' is enabled.
+        '''
+
+        attachment = attachment_store.load(add_file)
+
+        if self.prune_code and add_file.endswith(".py"):
+            attachment = prune_attachment(attachment, query)
+
+        if self.compress:
+            attachment = compress_attachment(
+                                attachment,
+                                prompt_compression.text_kind(add_file))
+
+        return attachment
+
+    def large_attachment(self, query: str, add_file: str = "") -> str | None:
+        '''
+        Returns the content of an attached file if the query with the file
+        does not fit into the context budget of the model.
+        '''
+
+        if add_file == "" or os.path.isdir(add_file):
+            return None
+
+        attachment = self.load_attachment(query, add_file)
+
+        if estimate_tokens(query) + attachment.tokens <= \
+                self.context_window.budget(self.llm):
+            return None
+
+        logger.info(" [MAP] %s --> exceeds the context budget.", add_file)
+
+        return attachment.text
+
+    def reduce_attachment(self, query: str, add_file: str, text: str,
+                          on_progress: map_reduce.Progress | None = None
+                          ) -> str:
+        '''
+        Answers the query for the parts of a large file with up to
+        'NUM_PARALLEL' requests of a thread pool and returns the prompt of
+        the final request. 'on_progress' is called with the number of
+        answered parts, after 'cancel()' no further part is sent.
+        '''
+
+        options = self.request_options()
+
+        def part_chat(messages: list) -> str:
+            if self.cancelled.is_set():
+                raise CancelledError()
+
+            response = backend.client.chat(
+                                    model=self.llm,
+                                    messages=messages,
+                                    options=options,
+                                    keep_alive=keep_alive.duration(self.llm))
+
+            return response["message"]["content"]
+
+        async def reduce(pool: ThreadPoolExecutor) -> str:
+            loop = asyncio.get_running_loop()
+
+            async def chat(messages: list) -> str:
+                return await loop.run_in_executor(pool, part_chat, messages)
+
+            return await map_reduce.reduce_prompt(
+                                    chat, query, add_file, text,
+                                    self.context_window.budget(self.llm),
+                                    on_progress)
+
+        with ThreadPoolExecutor(max_workers=map_reduce.NUM_PARALLEL,
+                                thread_name_prefix="map-part") as pool:
+            try:
+                return asyncio.run(reduce(pool))
+
+            # The event loop turns a cancelled part into its own error.
+            except asyncio.CancelledError:
+                raise CancelledError() from None
+
+    def add_query(self, query: str, add_file: str = "",
+                  on_progress: repo_index.Progress | None = None) -> None:
+        '''
+        Adds the query and the content of an attached file to the chat log.
+        The index of an attached folder is built the first time,
+        'on_progress' is called with the number of embedded chunks.
+        Raises an AttachmentError if the file can not be used or the
+        index of the folder can not be built.
+        '''
+
+        # The parts of an attached folder which are relevant for the
+        # query are added to the query.
+        if add_file != "" and os.path.isdir(add_file):
+            index = repo_index.open_index(add_file, attachment_store,
+                                          on_progress)
+            context = index.context(query,
+                                    self.context_window.budget(self.llm) // 2)
+
+            query = f"{query} \n {context}"
+            add_file = ""
+
+        message = create_message(query, "user")
+
+        # If a file is attached to the query, the message refers to the
+        # files content from the attachment store.
+        if add_file != "":
+            attachment = self.load_attachment(query, add_file)
+
+            message["attachment"] = attachment.digest
+            message["file"] = add_file
+
+            logger.info(" %s has been attached to the request.", add_file)
+
+        with self.lock:
+            if add_file != "":
+                self.blobs[attachment.digest] = attachment
+
+            self.messages.append(message)
+
+            # A new query drops the offer of the last one.
+            self.offered = None
+
+    def add_response(self, response: str) -> None:
+        '''
+        Adds a response to the chat log and stores the turn.
+        '''
+
+        with self.lock:
+            self.messages.append(create_message(response, "assistant"))
+            turn = expand_messages(self.messages, self.blobs)[-2:]
+
+        self.save_turn(turn)
+
+    def save_turn(self, turn: list) -> None:
+        '''
+        Stores a request and its response in the session of the
+        conversation, the session is created with the first response.
+        '''
+
+        try:
+            if self.session_id is None:
+                title = turn[0]["content"].strip().split("\n")[0]
+                self.session_id = store.create_session(title[:40], self.llm)
+
+            store.add_messages(self.session_id, turn)
+
+        except Exception as error:
+            logger.error(" [STORE] saving the chat messages failed --> %s",
+                         error)
+
+    def rollback(self, length: int) -> None:
+        '''
+        Rolls the chat log back to its first 'length' messages.
+        '''
+
+        with self.lock:
+            del self.messages[length:]
+
+            attached = {message.get("attachment")
+                        for message in self.messages}
+            self.blobs = {digest: blob for digest, blob in self.blobs.items()
+                          if digest in attached}
+
+        logger.info(" [QUERY] chat log --> rolled back.")
+
+    def cancel(self) -> None:
+        '''
+        Cancels the streamed request in flight by closing its connection.
+        The loaded models stay in memory.
+        '''
+
+        self.cancelled.set()
+
+        with self.lock:
+            response = self.response
+            task = self.task
+
+        if response is not None:
+            close_connection(response)
+
+        # Cancelling the task of an asynchronous request closes its
+        # connection, its future is done once the task has finished.
+        if task is not None:
+            task.get_loop().call_soon_threadsafe(task.cancel)
+
+        logger.info(" [QUERY] ollama chat query --> stopped by user.")
+
+    def chat(self, last: str | None = None) -> str:
+        '''
+        Send a message to OLLAMA's server. The function returns response
+        from AI assistant if successful, otherwise an error string is
+        returned with traceback information for debugging purposes.
+        'last' replaces the content of the last message of the request.
+        '''
+
+        key, cached = self.cache_lookup(last)
+
+        if cached is not None:
+            self.add_response(cached)
+            return f"{CACHED_HEADER}{cached}\n\n"
+
+        try:
+            logger.info(" [QUERY] ollama chat query --> send.")
+
+            # Calling the ollama API to get the assistant response.
+            ollama_response = backend.client.chat(
+                                    model=self.llm,
+                                    messages=self.request_messages(last),
+                                    options=self.request_options(),
+                                    keep_alive=keep_alive.duration(self.llm))
+
+        except Exception as error:
+            return error_message(error)
+
+        # Adding the response message to the chat log.
+        self.add_response(ollama_response["message"]["content"])
+        self.cache_response(key, ollama_response["message"]["content"])
+
+        logger.info(" [RESPONSE] ollama chat response --> returned!")
+
+        # Return the API response.
+        response = f"\n{ollama_response['message']['content']}\n"
+        return f"\n\u27BE Response: {response}\n"
+
+    def chat_stream(self, last: str | None = None,
+                    header: str = RESPONSE_HEADER) -> Iterator[str]:
+        '''
+        Streams the response of OLLAMA's server chunk by chunk. The first
+        chunk carries the response header, errors are yielded as a single
+        chunk in the same format 'chat()' returns them. The complete
+        response is added to the chat log once the stream has finished.
+        'last' replaces the content of the last message of the request.
+        '''
+
+        assistant_message = ""
+        first_chunk = True
+
+        key, cached = self.cache_lookup(last)
+
+        if cached is not None:
+            self.add_response(cached)
+            yield f"{CACHED_HEADER}{cached}"
+            yield RESPONSE_END
+            return
+
+        request = {"model": self.llm,
+                   "messages": self.request_messages(last),
+                   "options": self.request_options(),
+                   "keep_alive": keep_alive.duration(self.llm),
+                   "stream": True}
+
+        try:
+            logger.info(" [QUERY] ollama chat stream query --> send.")
+
+            # Calling the ollama API to stream the assistant response.
+            with http_client.stream("POST", "/api/chat",
+                                    json=request) as response:
+
+                with self.lock:
+                    self.response = response
+
+                # The request may have been cancelled before it was sent.
+                if self.cancelled.is_set():
+                    close_connection(response)
+
+                check_response(response)
+
+                for line in response.iter_lines():
+                    # Lines which were already received are dropped.
+                    if self.cancelled.is_set():
+                        break
+
+                    part = json.loads(line)
+
+                    if "error" in part:
+                        raise ollama.ResponseError(part["error"])
+
+                    content = part["message"]["content"]
+                    assistant_message += content
+
+                    if first_chunk:
+                        first_chunk = False
+                        logger.info(" [RESPONSE] ollama first chunk"
+                                    " --> received.")
+                        yield f"{header}{content}"
+
+                    else:
+                        yield content
+
+        except Exception as error:
+            if self.cancelled.is_set():
+                yield STOPPED
+                return
+
+            yield error_message(error)
+            return
+
+        finally:
+            with self.lock:
+                self.response = None
+
+        if self.cancelled.is_set():
+            yield STOPPED
+            return
+
+        # Adding the streamed response message to the chat log.
+        self.add_response(assistant_message)
+        self.cache_response(key, assistant_message)
+
+        logger.info(" [RESPONSE] ollama chat stream --> completed!")
+
+        yield RESPONSE_END
+
+    def ask(self, query: str, add_file: str = "",
+            stream: bool = False,
+            on_progress: map_reduce.Progress | None = None
+            ) -> str | Iterator[str]:
+        """
+        Sends a query to the chat() of the conversation.
+        If 'stream' is True a generator yielding the response chunks is
+        returned instead of the complete response.
+        'on_progress' is called with the number of answered parts of a
+        large file.
+        """
+
+        if stream:
+            return self.ask_stream(query, add_file, on_progress)
+
+        with self.turn_lock:
+            self.cancelled.clear()
+            length = len(self.messages)
+
+            try:
+                text = self.large_attachment(query, add_file)
+
+            except Exception as error:
+                return error_message(error)
+
+            # The chat log keeps a reference to a large file, the final
+            # request combines the answers for its parts.
+            if text is not None:
+                self.add_query(map_reduce.reference(query, add_file))
+
+                try:
+                    last = self.reduce_attachment(query, add_file, text,
+                                                  on_progress)
+
+                except Exception as error:
+                    self.rollback(length)
+
+                    if self.cancelled.is_set():
+                        return STOPPED
+
+                    return error_message(error)
+
+                response = self.chat(last)
+
+                if len(self.messages) == length + 1:
+                    self.rollback(length)
+
+                return response
+
+            try:
+                self.add_query(query, add_file)
+
+            except Exception as error:
+                return error_message(error)
+
+            vector, similar = self.semantic_lookup(query, add_file)
+
+            if similar is not None:
+                self.rollback(length)
+                self.offer(query, similar)
+                return f"{similar_header(similar)}{similar['answer']}\n\n"
+
+            # Send the query to the API and return the response.
+            response = self.chat()
+
+            # Remove the query of a failed request from the chat log.
+            if len(self.messages) == length + 1:
+                self.rollback(length)
+
+            else:
+                self.semantic_store(vector, query)
+
+            return response
+
+    def ask_stream(self, query: str, add_file: str = "",
+                   on_progress: map_reduce.Progress | None = None
+                   ) -> Iterator[str]:
+        '''
+        Sends a query to the chat_stream() of the conversation and yields
+        the response chunks. If the request fails or gets cancelled the
+        chat log is rolled back to the state before the query.
+        'on_progress' is called with the number of answered parts of a
+        large file.
+        '''
+
+        with self.turn_lock:
+            self.cancelled.clear()
+            length = len(self.messages)
+
+            try:
+                try:
+                    text = self.large_attachment(query, add_file)
+
+                    # The chat log keeps a reference to a large file, the
+                    # final request combines the answers for its parts.
+                    if text is not None:
+                        self.add_query(map_reduce.reference(query, add_file))
+                        last = self.reduce_attachment(query, add_file, text,
+                                                      on_progress)
+
+                except Exception as error:
+                    if self.cancelled.is_set():
+                        yield STOPPED
+                        return
+
+                    yield error_message(error)
+                    return
+
+                if text is not None:
+                    yield from self.chat_stream(last, PARTS_HEADER)
+                    return
+
+                try:
+                    self.add_query(query, add_file)
+
+                except Exception as error:
+                    yield error_message(error)
+                    return
+
+                vector, similar = self.semantic_lookup(query, add_file)
+
+                if similar is not None:
+                    self.offer(query, similar)
+                    yield f"{similar_header(similar)}{similar['answer']}"
+                    yield RESPONSE_END
+                    return
+
+                yield from self.chat_stream()
+
+                if len(self.messages) == length + 2:
+                    self.semantic_store(vector, query)
+
+            finally:
+                if len(self.messages) == length + 1:
+                    self.rollback(length)
+
+    def context_usage(self) -> tuple[int, int]:
+        '''
+        Returns the estimated tokens of the chat log sent to the model and
+        the token budget of the model.
+        '''
+
+        tokens = sum(message_tokens(message)
+                     for message in self.request_messages())
+
+        return tokens, self.context_window.budget(self.llm)
+
+
+# Conversation used by the module level functions.
+default_conversation = Conversation()
+
+
+def chat(llm: str) -> str:
     '''
-    Stops the request made to the Ollama server by restarting the
-    ollama service.
+    Sends the chat log of the default conversation to 'llm' and returns
+    the response.
     '''
 
-    if operating_system == "LINUX":
-        os.system("systemctl restart ollama")
+    default_conversation.llm = llm
+
+    return default_conversation.chat()
+
+
+def ask(query: str, llm: str, add_file: str,
+        stream: bool = False,
+        on_progress: map_reduce.Progress | None = None
+        ) -> str | Iterator[str]:
+    """
+    The 'ask()' function is used to send messages of the default
+    conversation to the chat().
+    """
 
-    elif operating_system == "DARWIN":
-        os.system("brew services restart ollama")
+    default_conversation.llm = llm
 
-    logger.info(" [QUERY] ollama chat query --> stopped by user.")
-    # Remove the last request made from the chat_messages.
-    chat_messages.pop()
+    return default_conversation.ask(query, add_file, stream, on_progress)
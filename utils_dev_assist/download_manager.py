@@ -0,0 +1,285 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+download_manager.py--Downloads models with the streaming pull API of the
+                     Ollama server on the event loop of the 'AsyncEngine'.
+                     The progress of every layer is summed up to the
+                     completed bytes, throughput and ETA of a download.
+                     Requested models are queued and at most
+                     'MAX_DOWNLOADS' are pulled at the same time. A
+                     cancelled download keeps its completed layers on the
+                     server and is resumed when it is requested again.
+                     Subscribers are called on the Tk main loop.
+'''
+
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable
+import ollama
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.async_engine import AsyncEngine
+from utils_dev_assist import llm_models as lm
+
+logger = app_log(__name__)
+
+# Number of models which are downloaded at the same time.
+MAX_DOWNLOADS = 2
+
+# Seconds between two progress updates of a download.
+PROGRESS_INTERVAL = 0.25
+
+# Weight of the latest sample of the smoothed throughput.
+RATE_SMOOTHING = 0.2
+
+
+def format_bytes(size: float) -> str:
+    ''' Returns a size in bytes as a readable text. '''
+
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.0f} {unit}" if unit == "B" \
+                else f"{size:.1f} {unit}"
+
+        size /= 1000
+
+    return f"{size:.1f} TB"
+
+
+class Download:
+    '''
+    Class for the state and progress of a model download.
+    '''
+
+    def __init__(self, model: str):
+        self.model = model
+        self.status = "queued"
+        self.message = ""
+        self.future: Future | None = None
+
+        # Completed and total bytes of every layer by its digest.
+        self.layers = {}
+        self.completed = 0
+        self.total = 0
+
+        # Smoothed throughput in bytes per second and the last sample.
+        self.rate = 0.0
+        self.sample = (time.monotonic(), 0)
+
+    def update(self, part: ollama.ProgressResponse) -> None:
+        '''
+        Adds a part of the pull stream to the progress.
+        '''
+
+        if part.status:
+            self.status = part.status
+
+        if not part.digest or not part.total:
+            return
+
+        self.layers[part.digest] = (part.completed or 0, part.total)
+        self.completed = sum(layer[0] for layer in self.layers.values())
+        self.total = sum(layer[1] for layer in self.layers.values())
+
+        now = time.monotonic()
+        elapsed = now - self.sample[0]
+
+        if elapsed >= PROGRESS_INTERVAL:
+            rate = max(0, self.completed - self.sample[1]) / elapsed
+            self.rate = rate if self.rate == 0 else \
+                RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rate
+            self.sample = (now, self.completed)
+
+    def progress(self) -> float:
+        ''' Returns the completed fraction of the download. '''
+
+        return self.completed / self.total if self.total else 0.0
+
+    def eta(self) -> float | None:
+        ''' Returns the estimated seconds until the download finishes. '''
+
+        if self.rate <= 0 or self.total == 0:
+            return None
+
+        return (self.total - self.completed) / self.rate
+
+    def is_active(self) -> bool:
+        ''' Checks if the download is queued or running. '''
+
+        return self.future is not None and not self.future.done()
+
+    def describe(self) -> str:
+        '''
+        Returns the progress of the download for display.
+        '''
+
+        if not self.is_active() or self.total == 0:
+            return f"{self.model}: {self.status}"
+
+        text = (f"{self.model}: {self.progress():.0%} of "
+                f"{format_bytes(self.total)}, "
+                f"{format_bytes(self.rate)}/s")
+
+        eta = self.eta()
+
+        if eta is not None:
+            minutes, seconds = divmod(int(eta), 60)
+            text += f", {minutes}:{seconds:02d} left"
+
+        return text
+
+
+class DownloadManager:
+    '''
+    Class for the queue of model downloads.
+    '''
+
+    def __init__(self, engine: AsyncEngine, parallel: int = MAX_DOWNLOADS):
+        self.engine = engine
+        self.slots = asyncio.Semaphore(parallel)
+        self.lock = threading.Lock()
+
+        # Downloads by their model, in the order they were requested.
+        self.downloads = {}
+        self.listeners = {"progress": [], "done": []}
+
+    def subscribe(self, on_progress: Callable[[Download], None],
+                  on_done: Callable[[Download], None] | None = None
+                  ) -> None:
+        '''
+        Adds the callbacks for the progress and the end of a download.
+        '''
+
+        with self.lock:
+            self.listeners["progress"].append(on_progress)
+
+            if on_done is not None:
+                self.listeners["done"].append(on_done)
+
+    def notify(self, event: str, download: Download) -> None:
+        '''
+        Calls the subscribers of an event on the Tk main loop.
+        '''
+
+        with self.lock:
+            listeners = list(self.listeners[event])
+
+        for listener in listeners:
+            self.engine.notify(listener, download)
+
+    def enqueue(self, model: str) -> Download:
+        '''
+        Queues the download of a model, a model which is already queued
+        or downloading is not queued again. A cancelled or failed download
+        is resumed.
+        '''
+
+        with self.lock:
+            download = self.downloads.get(model)
+
+            if download is not None and download.is_active():
+                return download
+
+            if download is None:
+                download = Download(model)
+                self.downloads[model] = download
+
+            download.status = "queued"
+            download.rate = 0.0
+            download.sample = (time.monotonic(), download.completed)
+            download.future = self.engine.submit(self.pull(download))
+            download.future.add_done_callback(
+                            lambda future: self.finished(download, future))
+
+        logger.info(" [DOWNLOAD] %s --> queued.", model)
+        self.notify("progress", download)
+
+        return download
+
+    def resume(self, model: str) -> Download:
+        ''' Requests a cancelled or failed download again. '''
+
+        return self.enqueue(model)
+
+    def cancel(self, model: str) -> None:
+        '''
+        Cancels a queued or running download, the completed layers are
+        kept by the server.
+        '''
+
+        with self.lock:
+            download = self.downloads.get(model)
+
+        if download is not None and download.is_active():
+            download.future.cancel()
+
+    def finished(self, download: Download, future: Future) -> None:
+        '''
+        Notifies the subscribers of a finished, failed or cancelled
+        download.
+        '''
+
+        if future.cancelled():
+            download.status = "cancelled"
+            download.message = \
+                f"download of the model {download.model} cancelled!"
+            logger.info(" [DOWNLOAD] %s --> cancelled.", download.model)
+
+        self.notify("done", download)
+
+    def remove(self, model: str) -> None:
+        ''' Removes a finished download from the list. '''
+
+        with self.lock:
+            download = self.downloads.get(model)
+
+            if download is not None and not download.is_active():
+                del self.downloads[model]
+
+    async def pull(self, download: Download) -> str:
+        '''
+        Streams the pull of a model once a download slot is free and
+        returns the download message.
+        '''
+
+        model = download.model
+
+        try:
+            async with self.slots:
+                download.status = "starting"
+                self.notify("progress", download)
+
+                logger.info(" [DOWNLOAD] %s --> started.", model)
+
+                stream = await self.engine.client.pull(model, stream=True)
+                notified = 0.0
+
+                async for part in stream:
+                    download.update(part)
+
+                    if time.monotonic() - notified >= PROGRESS_INTERVAL:
+                        notified = time.monotonic()
+                        self.notify("progress", download)
+
+            lm.forget_digest(model)
+            download.status = "done"
+            download.message = lm.download_message(model)
+
+        except ollama.ResponseError as error:
+            download.status = "failed"
+            download.message = lm.download_message(model, error)
+
+        except Exception as error:
+            logger.error(" [DOWNLOAD] %s failed --> %s", model, error)
+            download.status = "failed"
+            download.message = f"download of the model {model} failed!" \
+                f"\n{error}"
+
+        return download.message
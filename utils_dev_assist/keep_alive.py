@@ -0,0 +1,75 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+keep_alive.py--Keeps the time a model stays loaded on the Ollama server
+               after a request for each model.
+               The time is sent as 'keep_alive' with the warm-up of a
+               selected model and with every chat request, a duration like
+               "30m", the seconds as a number or -1 to keep a model loaded.
+               The times are stored in the '.keep_alive_config.cfg' file.
+'''
+
+import os
+import json
+from typing import Dict
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+CONFIG_FILE = ".keep_alive_config.cfg"
+
+
+def write_config_file(default: str | int = "30m",
+                      models: Dict[str, str | int] | None = None) -> None:
+    '''
+    Writes a JSON config file with the default keep alive time and the
+    time of each model.
+    '''
+
+    with open(CONFIG_FILE, "w", encoding="utf-8") as cfg:
+        keep_alive_settings = {"default": default,
+                               "models": models or {}}
+
+        cfg.write(json.dumps(keep_alive_settings, indent=4))
+
+        logger.debug(" [KEEP ALIVE] config file -> created!")
+
+
+def read_config_file() -> dict:
+    '''
+    Retrieves the keep alive settings from the config file.
+    '''
+
+    with open(CONFIG_FILE, "r", encoding="utf-8") as cfg:
+        return json.load(cfg)
+
+
+def duration(model: str) -> str | int:
+    '''
+    Returns the time a model stays loaded after a request.
+    '''
+
+    return settings["models"].get(model, settings["default"])
+
+
+def set_duration(model: str, keep_alive: str | int) -> None:
+    '''
+    Sets and stores the time a model stays loaded after a request.
+    '''
+
+    settings["models"][model] = keep_alive
+    write_config_file(**settings)
+
+    logger.debug(" [KEEP ALIVE] %s --> %s.", model, keep_alive)
+
+
+if not os.path.isfile(CONFIG_FILE):
+    write_config_file()
+
+settings = read_config_file()
@@ -9,24 +9,45 @@
 '''
 llm_modules.py-This module checks for installed models, downloads, shows info
                and deletes models.
+               The metadata of a model is fetched from '/api/show' once
+               for each digest and kept in memory, it is dropped when the
+               model is pulled, created or deleted.
+               The requests are sent with the shared client of the
+               'ollama_backend' module.
 '''
 
 import os
 import json
-import requests
+import threading
+import subprocess
 import ollama
 from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.ollama_backend import backend
 
 logger = app_log(__name__)
 
+# Digests of the installed models, looked up once for each model.
+model_digests = {}
+
+# Responses of '/api/show' by the digest of the model.
+model_metadata = {}
+metadata_lock = threading.Lock()
+
 
 def installed_models() -> list:
     '''
     Returns a list of installed LLM's.
     '''
 
+    return model_names(backend.client.list())
+
+
+def model_names(model_list: ollama.ListResponse) -> list | str:
+    '''
+    Returns the names of the models of a list response.
+    '''
+
     models = []
-    model_list = ollama.list()
 
     if len(model_list.models) == 0:
         logger.info(" [LLM] --> No models are installed! <--")
@@ -43,6 +64,78 @@ def installed_models() -> list:
     return "\n --> No models are installed! <-- \n\n"
 
 
+def model_name(model: str) -> str:
+    '''
+    Returns the name of a model as the server lists it, a model without a
+    tag has the 'latest' tag.
+    '''
+
+    # The registry host of a name may have a port.
+    if ":" in model.rsplit("/", 1)[-1]:
+        return model
+
+    return f"{model}:latest"
+
+
+def model_digest(model: str) -> str | None:
+    '''
+    Returns the digest of an installed model or None if it is unknown.
+    '''
+
+    model = model_name(model)
+
+    if model not in model_digests:
+        try:
+            for installed in backend.client.list().models:
+                model_digests[installed["model"]] = installed["digest"]
+
+        except Exception as error:
+            logger.error(" [LLM] digest of %s --> %s", model, error)
+
+    return model_digests.get(model)
+
+
+def forget_digest(model: str) -> None:
+    '''
+    Removes the digest and the metadata of a model after it was pulled,
+    created or deleted.
+    '''
+
+    model = model_name(model)
+    digest = model_digests.pop(model, None)
+
+    with metadata_lock:
+        model_metadata.pop(digest, None)
+        model_metadata.pop(model, None)
+
+
+def model_info(model: str) -> dict:
+    '''
+    Returns the response of '/api/show' for a model, the server is only
+    asked the first time for each digest of the model.
+    '''
+
+    # A model without a known digest is cached by its tagged name.
+    key = model_digest(model) or model_name(model)
+
+    with metadata_lock:
+        if key in model_metadata:
+            return model_metadata[key]
+
+    res = backend.http.post("/api/show", json={"model": model})
+    info = json.loads(res.text)
+
+    if "error" in info:
+        raise ollama.ResponseError(info["error"])
+
+    with metadata_lock:
+        model_metadata[key] = info
+
+    logger.debug(" [LLM] metadata of %s --> fetched.", model)
+
+    return info
+
+
 def download_install_model(model: str) -> str:
     '''
     Downloads and installs models.
@@ -50,45 +143,51 @@ def download_install_model(model: str) -> str:
 
     try:
         logger.info(" [LLM] starting download of model --> %s ...", model)
-        ollama.pull(model)
+        backend.client.pull(model)
+        forget_digest(model)
+        return download_message(model)
+
+    except ollama._types.ResponseError as error:
+        return download_message(model, error)
+
+
+def download_message(model: str,
+                     error: ollama.ResponseError | None = None) -> str:
+    '''
+    Returns the message displayed after the download of a model.
+    '''
+
+    if error is None:
         logger.info(" download of model: %s --> success!", model)
         msg = f"Model: {model} has been downloaded and installed!"
         return f"--> {msg}  <--"
 
-    except ollama._types.ResponseError as error:
-        logger.error(" [LLM] download of model --> %s failed!", model)
-        logger.error(" --> %s", error.error)
-        error_msg = error.error.split("/")
-
-        if error.status_code == 500:
-            if "no such host" in error.error:
-                msg = f"download of the model {model} failed!"
-                return f"{msg}\nIt appears that your device is offline!"
+    logger.error(" [LLM] download of model --> %s failed!", model)
+    logger.error(" --> %s", error.error)
+    error_msg = error.error.split("/")
 
+    if error.status_code == 500:
+        if "no such host" in error.error:
             msg = f"download of the model {model} failed!"
-            return f"{msg}\n{error.error}"
+            return f"{msg}\nIt appears that your device is offline!"
+
+        msg = f"download of the model {model} failed!"
+        return f"{msg}\n{error.error}"
 
-        return f"{error_msg[0]}!"
+    return f"{error_msg[0]}!"
 
 
 def show_model_info(model: str, info_type: str) -> str:
     '''
-    Displays the information of a LLM.
+    Displays the information of a LLM from its cached metadata.
     '''
 
-    url = "http://localhost:11434/api/show"
-
-    data = {"model": model}
-
     try:
         info = ""
         info_list = []
         info_type = info_type.upper()
 
-        res = requests.post(url, json=data, timeout=(5, None))
-        res_json = json.loads(res.text)
-
-        for key, item in res_json.items():
+        for key, item in model_info(model).items():
             if key.upper() == info_type:
                 info_list.append(str(item))
 
@@ -116,18 +215,15 @@ def create_model(new_model: str, new_modelfile: str) -> str:
     Creates a new model.
     """
 
-    # Create the path to a new modelfile with the given name from 'new_model'.
-    modelfile = f"utils_dev_assist/modelfile_{new_model}"
-
-    # Write the modelfile.
-    with open(modelfile, "w", encoding="utf-8") as modfile:
-        modfile.write(new_modelfile)
-
-    logger.debug(" [LLM] a new modelfile %s has been written!", modelfile)
+    modelfile = write_modelfile(new_model, new_modelfile)
 
     try:
-        # Create the model using 'ollama' command line tool.
-        os.system(f"'ollama' 'create' '{new_model}' '-f' '{modelfile}'")
+        # Create the model using 'ollama' command line tool with the same
+        # server as the client.
+        subprocess.run(["ollama", "create", new_model, "-f", modelfile],
+                       env=backend.environ(),
+                       check=True)
+        forget_digest(new_model)
         logger.info(" [LLM] model -> %s has been created!", new_model)
         return f" Model: {new_model} has been created!"
 
@@ -139,6 +235,23 @@ def create_model(new_model: str, new_modelfile: str) -> str:
         return f"[ERROR] {error}"
 
 
+def write_modelfile(new_model: str, new_modelfile: str) -> str:
+    '''
+    Writes the modelfile of a new model and returns its path.
+    '''
+
+    # Create the path to a new modelfile with the given name from 'new_model'.
+    modelfile = f"utils_dev_assist/modelfile_{new_model}"
+
+    # Write the modelfile.
+    with open(modelfile, "w", encoding="utf-8") as modfile:
+        modfile.write(new_modelfile)
+
+    logger.debug(" [LLM] a new modelfile %s has been written!", modelfile)
+
+    return modelfile
+
+
 def help_create_model() -> str:
     '''
     Returns the contents of 'modelfile_help.txt' located in the assets
@@ -168,7 +281,22 @@ def delete_model(model: str) -> bool:
     Deletes the loaded model.
     '''
 
-    # If the model was created by the user, delete the modelfile.
+    delete_modelfile(model)
+
+    # Delete the model.
+    backend.client.delete(model)
+    forget_digest(model)
+
+    logger.info(" model: %s --> deleted!", model)
+
+    return True
+
+
+def delete_modelfile(model: str) -> None:
+    '''
+    Deletes the modelfile of a model if it was created by the user.
+    '''
+
     modelfile_name = f"modelfile_{model[:-7]}"
     modelfile_dir = os.path.dirname(__file__)
     modelfile = f"{modelfile_dir}/{modelfile_name}"
@@ -176,10 +304,3 @@ def delete_model(model: str) -> bool:
     if os.path.isfile(modelfile):
         os.remove(modelfile)
         logger.info(" modelfile of: %s --> deleted!", model)
-
-    # Delete the model.
-    ollama.delete(model)
-
-    logger.info(" model: %s --> deleted!", model)
-
-    return True
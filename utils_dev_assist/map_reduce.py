@@ -0,0 +1,211 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+map_reduce.py--Processes attached files which do not fit into the context of
+               a model.
+               The file is split into parts of whole lines which fit into
+               the context, the request is answered for every part
+               (map) with up to 'OLLAMA_NUM_PARALLEL' requests at the same
+               time. The answers of the parts are combined into the prompt
+               of the final request (reduce), if they do not fit into the
+               context either they are combined in groups first.
+'''
+
+import os
+import asyncio
+from typing import Awaitable, Callable, List
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.context_window import estimate_tokens
+from utils_dev_assist.context_window import CHARS_PER_TOKEN, MESSAGE_OVERHEAD
+
+logger = app_log(__name__)
+
+# Number of requests the Ollama server processes at the same time, set
+# with the same environment variable as for the server.
+NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL") or 4)
+
+MAP_PROMPT = ("The following text is part {part} of {parts} of the file"
+              " '{name}'. Answer the request for this part only, keep the"
+              " answer short and leave out anything this part does not"
+              " contain.\n\nRequest: {query}\n\n{chunk}")
+
+GROUP_PROMPT = ("The following answers were given for consecutive parts of"
+                " the file '{name}'. Combine them into one answer of the"
+                " request.\n\nRequest: {query}\n\n{answers}")
+
+REDUCE_PROMPT = ("{query}\n\nThe attached file '{name}' was too large and"
+                 " was processed in {parts} parts, these are the answers"
+                 " for the parts. Combine them into one complete answer"
+                 " of the request.\n\n{answers}")
+
+Chat = Callable[[List[dict]], Awaitable[str]]
+Progress = Callable[[int, int], None]
+
+
+def reference(query: str, add_file: str) -> str:
+    '''
+    Returns the query stored in the chat log instead of the query with the
+    content of a large file.
+    '''
+
+    return f"{query} \n [attached file: {add_file}]"
+
+
+def split_text(text: str, chunk_tokens: int) -> List[str]:
+    '''
+    Splits a text into chunks of whole lines with at most 'chunk_tokens'
+    estimated tokens, longer lines are split.
+    '''
+
+    chunk_tokens = max(chunk_tokens, 1)
+    chunks = []
+    chunk = []
+    tokens = 0
+
+    for line in text.splitlines(keepends=True):
+        while estimate_tokens(line) > chunk_tokens:
+            size = chunk_tokens * CHARS_PER_TOKEN
+
+            if chunk:
+                chunks.append("".join(chunk))
+                chunk, tokens = [], 0
+
+            chunks.append(line[:size])
+            line = line[size:]
+
+        line_tokens = estimate_tokens(line)
+
+        if tokens + line_tokens > chunk_tokens and chunk:
+            chunks.append("".join(chunk))
+            chunk, tokens = [], 0
+
+        chunk.append(line)
+        tokens += line_tokens
+
+    if chunk:
+        chunks.append("".join(chunk))
+
+    return [chunk for chunk in chunks if chunk]
+
+
+def join_answers(answers: List[str], first: int = 1) -> str:
+    '''
+    Returns the answers of consecutive parts with a heading each.
+    '''
+
+    return "\n\n".join(f"Part {first + idx}:\n{answer}"
+                       for idx, answer in enumerate(answers))
+
+
+async def map_parts(chat: Chat, query: str, name: str, chunks: List[str],
+                    on_progress: Progress | None = None,
+                    parallel: int = NUM_PARALLEL) -> List[str]:
+    '''
+    Answers the request for all parts, 'on_progress' is called with the
+    number of answered parts and the number of parts.
+    '''
+
+    slots = asyncio.Semaphore(max(parallel, 1))
+    done = 0
+
+    async def answer(part: int, chunk: str) -> str:
+        nonlocal done
+
+        prompt = MAP_PROMPT.format(part=part, parts=len(chunks), name=name,
+                                   query=query, chunk=chunk)
+
+        async with slots:
+            response = await chat([{"role": "user", "content": prompt}])
+
+        done += 1
+        logger.info(" [MAP] part %s/%s --> answered.", done, len(chunks))
+
+        if on_progress is not None:
+            on_progress(done, len(chunks))
+
+        return response
+
+    return await asyncio.gather(*(answer(part, chunk) for part, chunk
+                                  in enumerate(chunks, start=1)))
+
+
+async def reduce_answers(chat: Chat, query: str, name: str,
+                         answers: List[str], limit: int,
+                         parallel: int = NUM_PARALLEL) -> List[str]:
+    '''
+    Combines groups of consecutive answers until all answers fit into
+    'limit' estimated tokens.
+    '''
+
+    slots = asyncio.Semaphore(max(parallel, 1))
+
+    async def combine(group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+
+        prompt = GROUP_PROMPT.format(name=name, query=query,
+                                     answers=join_answers(group))
+
+        async with slots:
+            return await chat([{"role": "user", "content": prompt}])
+
+    while (estimate_tokens(join_answers(answers)) > limit
+           and len(answers) > 1):
+
+        groups = []
+        group = []
+
+        for answer in answers:
+            if group and estimate_tokens(join_answers(group + [answer])) \
+                    > limit:
+                groups.append(group)
+                group = []
+
+            group.append(answer)
+
+        groups.append(group)
+
+        # Every answer exceeds the limit on its own.
+        if len(groups) == len(answers):
+            groups = [answers[idx:idx + 2]
+                      for idx in range(0, len(answers), 2)]
+
+        logger.info(" [REDUCE] %s answers --> %s groups.",
+                    len(answers), len(groups))
+
+        answers = await asyncio.gather(*(combine(group) for group in groups))
+
+    return answers
+
+
+async def reduce_prompt(chat: Chat, query: str, add_file: str, text: str,
+                        budget: int,
+                        on_progress: Progress | None = None,
+                        parallel: int = NUM_PARALLEL) -> str:
+    '''
+    Answers the request for all parts of a large file and returns the
+    prompt of the final request which combines the answers.
+    '''
+
+    name = os.path.basename(add_file)
+
+    prompt_tokens = estimate_tokens(MAP_PROMPT + query) + MESSAGE_OVERHEAD
+    chunks = split_text(text, budget - prompt_tokens)
+
+    logger.info(" [MAP] %s --> split into %s parts.", name, len(chunks))
+
+    answers = await map_parts(chat, query, name, chunks, on_progress,
+                              parallel)
+
+    prompt_tokens = estimate_tokens(REDUCE_PROMPT + query) + MESSAGE_OVERHEAD
+    answers = await reduce_answers(chat, query, name, answers,
+                                   budget - prompt_tokens, parallel)
+
+    return REDUCE_PROMPT.format(query=query, name=name, parts=len(chunks),
+                                answers=join_answers(answers))
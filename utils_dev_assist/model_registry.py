@@ -0,0 +1,145 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+model_registry.py--Keeps the list of the installed models for the GUI.
+                   The list is fetched with the 'AsyncEngine' in the
+                   background and cached for 'ttl' seconds, widgets
+                   subscribe to the registry and are called on the Tk main
+                   loop when the list has changed or the server can not be
+                   reached.
+'''
+
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.async_engine import AsyncEngine
+
+logger = app_log(__name__)
+
+# Seconds the list of models is reused before it is fetched again.
+MODELS_TTL = 30.0
+
+
+class ModelRegistry:
+    '''
+    Class for the cached list of installed models and its subscribers.
+    '''
+
+    def __init__(self, engine: AsyncEngine, ttl: float = MODELS_TTL):
+        self.engine = engine
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+        self.models: List[str] = []
+        self.fetched = 0.0
+        self.error: Exception | None = None
+
+        # Running fetch of the list, if the list is invalidated during a
+        # fetch it is fetched once more.
+        self.future: Future | None = None
+        self.fetch_again = False
+
+        # Callbacks of the subscribers.
+        self.listeners = {"changed": [], "failed": []}
+
+    def subscribe(self, on_changed: Callable[[List[str]], None],
+                  on_failed: Callable[[Exception], None] | None = None
+                  ) -> None:
+        '''
+        Adds the callbacks for a changed list of models and for a server
+        which can no longer be reached.
+        '''
+
+        with self.lock:
+            self.listeners["changed"].append(on_changed)
+
+            if on_failed is not None:
+                self.listeners["failed"].append(on_failed)
+
+    def is_stale(self) -> bool:
+        ''' Checks if the list is older than the ttl. '''
+
+        return time.monotonic() - self.fetched > self.ttl
+
+    def refresh(self, force: bool = False) -> Future | None:
+        '''
+        Fetches the list of models in the background if it is stale or
+        'force' is True, a running fetch is reused. Returns the future of
+        the fetch or None if the list is fresh.
+        '''
+
+        with self.lock:
+            if self.future is not None:
+                self.fetch_again = self.fetch_again or force
+                return self.future
+
+            if not force and not self.is_stale():
+                return None
+
+            self.future = self.engine.list_future(callback=self.update)
+
+            return self.future
+
+    def invalidate(self) -> Future:
+        '''
+        Fetches the list again after a model was pulled, created or
+        deleted.
+        '''
+
+        return self.refresh(force=True)
+
+    def update(self, future: Future) -> None:
+        '''
+        Stores the fetched list and calls the subscribers if it has
+        changed, this method is called on the Tk main loop.
+        '''
+
+        with self.lock:
+            self.future = None
+            self.fetched = time.monotonic()
+            error = future.exception()
+
+            fetch_again = self.fetch_again
+            self.fetch_again = False
+
+            if error is not None:
+                reported = self.error is not None
+                self.error = error
+                listeners = [] if reported \
+                    else list(self.listeners["failed"])
+
+            else:
+                # A server without models returns a message.
+                models = future.result()
+                models = models if isinstance(models, list) else []
+
+                self.error = None
+                changed = models != self.models
+                self.models = models
+                listeners = list(self.listeners["changed"]) if changed \
+                    else []
+
+        if fetch_again:
+            self.refresh(force=True)
+
+        if error is not None:
+            logger.error(" [REGISTRY] list of models --> %s", error)
+
+            for listener in listeners:
+                listener(error)
+
+            return
+
+        if listeners:
+            logger.info(" [REGISTRY] list of models --> changed.")
+
+        for listener in listeners:
+            listener(models)
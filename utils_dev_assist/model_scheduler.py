@@ -0,0 +1,340 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+model_scheduler.py--Decides which models stay loaded on the Ollama server
+                    within a memory budget.
+                    The resident models and their memory are polled from
+                    the running models endpoint ('ps') on the event loop of
+                    the 'AsyncEngine'. When the resident models and a model
+                    which is about to be loaded exceed the budget, the
+                    least recently used models which are not pinned are
+                    unloaded explicitly. The selected model, the model
+                    used last and models with a running request are never
+                    unloaded. The budget and the pinned models are stored
+                    in the '.scheduler_config.cfg' file.
+                    Subscribers are called on the Tk main loop with the
+                    resident models, the decisions and the load latencies.
+'''
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Set
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.async_engine import AsyncEngine
+from utils_dev_assist.download_manager import format_bytes
+
+logger = app_log(__name__)
+
+CONFIG_FILE = ".scheduler_config.cfg"
+
+# Seconds between two polls of the resident models.
+SCHEDULE_INTERVAL = 10.0
+
+# Number of decisions which are kept for display.
+MAX_DECISIONS = 20
+
+GB = 1_000_000_000
+
+
+def write_config_file(budget_gb: float = 8.0,
+                      pinned: List[str] | None = None) -> None:
+    '''
+    Writes a JSON config file with the memory budget of the resident models
+    in GB and the models which are never unloaded.
+    '''
+
+    with open(CONFIG_FILE, "w", encoding="utf-8") as cfg:
+        scheduler_settings = {"budget_gb": budget_gb,
+                              "pinned": pinned or []}
+
+        cfg.write(json.dumps(scheduler_settings, indent=4))
+
+        logger.debug(" [SCHEDULER] config file -> created!")
+
+
+def read_config_file() -> dict:
+    '''
+    Retrieves the scheduler settings from the config file.
+    '''
+
+    with open(CONFIG_FILE, "r", encoding="utf-8") as cfg:
+        return json.load(cfg)
+
+
+def plan(resident: Dict[str, int], last_used: Dict[str, float],
+         pinned: Set[str], budget: int, incoming: int = 0) -> List[str]:
+    '''
+    Returns the models to unload so the resident models and 'incoming'
+    bytes of a model which is loaded fit into the budget. The least
+    recently used models are unloaded first, pinned models never.
+    '''
+
+    used = sum(resident.values()) + incoming
+    unload = []
+
+    for model in sorted((model for model in resident
+                         if model not in pinned),
+                        key=lambda model: last_used.get(model, 0.0)):
+
+        if used <= budget:
+            break
+
+        unload.append(model)
+        used -= resident[model]
+
+    return unload
+
+
+class ModelScheduler:
+    '''
+    Class to keep the resident models of the Ollama server within a memory
+    budget.
+    '''
+
+    def __init__(self, engine: AsyncEngine, budget_gb: float | None = None):
+        self.engine = engine
+        self.settings = read_config_file()
+        self.lock = threading.Lock()
+
+        if budget_gb is not None:
+            self.settings["budget_gb"] = budget_gb
+
+        self.budget = int(self.settings["budget_gb"] * GB)
+        self.pinned: Set[str] = set(self.settings["pinned"])
+
+        # Memory of the resident models and the last known memory of every
+        # model by its name.
+        self.resident: Dict[str, int] = {}
+        self.sizes: Dict[str, int] = {}
+
+        # Model selected in the GUI, the time a model was last selected or
+        # queried and the seconds its last load took.
+        self.selected: str | None = None
+        self.last_used: Dict[str, float] = {}
+        self.latencies: Dict[str, float] = {}
+
+        self.decisions = deque(maxlen=MAX_DECISIONS)
+
+        # Running poll of the resident models.
+        self.future: Future | None = None
+        self.listeners = []
+
+    def subscribe(self, on_update: Callable[["ModelScheduler"], None]
+                  ) -> None:
+        ''' Adds the callback for changed resident models and decisions. '''
+
+        with self.lock:
+            self.listeners.append(on_update)
+
+    def notify(self) -> None:
+        ''' Calls the subscribers on the Tk main loop. '''
+
+        with self.lock:
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            self.engine.notify(listener, self)
+
+    def touch(self, model: str) -> None:
+        ''' Marks a model as used by a selection or a query. '''
+
+        with self.lock:
+            self.last_used[model] = time.monotonic()
+
+    def select(self, model: str) -> None:
+        ''' Marks a model as selected in the GUI and used. '''
+
+        with self.lock:
+            self.selected = model
+
+        self.touch(model)
+
+    def protected(self) -> Set[str]:
+        '''
+        Returns the models which are not unloaded: the pinned and the
+        selected model, the model used last and the models with a running
+        request.
+        '''
+
+        with self.lock:
+            protected = set(self.pinned)
+
+            if self.selected:
+                protected.add(self.selected)
+
+            if self.last_used:
+                protected.add(max(self.last_used, key=self.last_used.get))
+
+        protected.update(model for model, requests
+                         in list(self.engine.active.items()) if requests > 0)
+
+        return protected
+
+    def pin(self, model: str, pinned: bool = True) -> None:
+        '''
+        Pins a model so it is never unloaded or unpins it, the pinned
+        models are stored.
+        '''
+
+        with self.lock:
+            if pinned:
+                self.pinned.add(model)
+
+            else:
+                self.pinned.discard(model)
+
+            self.settings["pinned"] = sorted(self.pinned)
+
+        write_config_file(**self.settings)
+
+        logger.info(" [SCHEDULER] %s --> %s.", model,
+                    "pinned" if pinned else "unpinned")
+
+    def decide(self, decision: str) -> None:
+        ''' Logs and keeps a decision for display. '''
+
+        logger.info(" [SCHEDULER] %s.", decision)
+
+        with self.lock:
+            self.decisions.append(decision)
+
+    def usage(self) -> int:
+        ''' Returns the memory of the resident models in bytes. '''
+
+        with self.lock:
+            return sum(self.resident.values())
+
+    def describe(self, model: str) -> str:
+        '''
+        Returns the memory and the last load latency of a resident model
+        for display.
+        '''
+
+        with self.lock:
+            text = f"{model}: {format_bytes(self.resident.get(model, 0))}"
+
+            if model in self.latencies:
+                text += f", loaded in {self.latencies[model]:.1f} s"
+
+        return text
+
+    async def poll(self) -> Dict[str, int]:
+        '''
+        Fetches the resident models and their memory from the server.
+        '''
+
+        response = await self.engine.client.ps()
+        resident = {model.model: model.size or 0
+                    for model in response.models}
+
+        with self.lock:
+            self.resident = resident
+            self.sizes.update(resident)
+
+        return resident
+
+    async def unload(self, model: str) -> None:
+        ''' Unloads a model with an empty request without keep alive. '''
+
+        await self.engine.client.generate(model=model,
+                                          prompt="",
+                                          keep_alive=0)
+
+        self.decide(f"unloaded {model}")
+
+    async def schedule(self, incoming: str | None = None) -> List[str]:
+        '''
+        Unloads the least recently used models which are not pinned until
+        the resident models and the 'incoming' model fit into the budget.
+        Returns the unloaded models.
+        '''
+
+        resident = await self.poll()
+        protected = self.protected()
+
+        with self.lock:
+            if incoming is None:
+                size = 0
+
+            # The model which is loaded is kept.
+            else:
+                protected.add(incoming)
+                size = 0 if incoming in resident \
+                    else self.sizes.get(incoming, 0)
+
+            unload = plan(resident, self.last_used, protected, self.budget,
+                          size)
+
+        for model in unload:
+            await self.unload(model)
+
+        if unload:
+            await self.poll()
+
+        self.notify()
+
+        return unload
+
+    async def load(self, model: str) -> str:
+        '''
+        Makes room for a model within the budget, loads it and keeps the
+        latency of the load. Returns the model.
+        '''
+
+        self.select(model)
+        await self.schedule(incoming=model)
+
+        start = time.monotonic()
+        await self.engine.warm_up(model)
+        latency = time.monotonic() - start
+
+        with self.lock:
+            self.latencies[model] = latency
+
+        self.decide(f"loaded {model} in {latency:.1f} s")
+
+        await self.poll()
+        self.notify()
+
+        return model
+
+    def refresh(self) -> Future:
+        '''
+        Polls the resident models and unloads models over the budget in
+        the background, a running poll is reused.
+        '''
+
+        with self.lock:
+            if self.future is None or self.future.done():
+                self.future = self.engine.submit(self.schedule(),
+                                                 self.polled)
+
+            return self.future
+
+    def polled(self, future: Future) -> None:
+        ''' Logs a poll which has failed, the server may not be running. '''
+
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(" [SCHEDULER] poll of the resident models"
+                           " --> %s", future.exception())
+
+    def load_future(self, model: str,
+                    callback: Callable[[Future], None] | None = None
+                    ) -> Future:
+        ''' Schedules 'load()' and returns its future. '''
+
+        return self.engine.submit(self.load(model), callback)
+
+
+if not os.path.isfile(CONFIG_FILE):
+    write_config_file()
@@ -0,0 +1,182 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+ollama_backend.py--Creates the one client which sends the requests of the
+                   app to the Ollama server.
+                   The 'ollama.Client' and the 'httpx.Client' of the
+                   streamed chat requests share a single pooled transport,
+                   connections are kept alive between the requests. Both
+                   clients are created here with the parsed address of the
+                   server, the internals of the ollama package are not
+                   used. The address of the server,
+                   the timeouts and the size of the pool are read from the
+                   '.backend_config.cfg' file, without a host the
+                   'OLLAMA_HOST' environment variable or the local server
+                   is used.
+'''
+
+import os
+import json
+import ipaddress
+import urllib.parse
+import ollama
+import httpx
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+CONFIG_FILE = ".backend_config.cfg"
+
+# Port of the Ollama server if the address has none.
+DEFAULT_PORT = 11434
+
+
+def write_config_file(host: str = "",
+                      connect_timeout: float = 10.0,
+                      read_timeout: float | None = None,
+                      max_connections: int = 10,
+                      max_keepalive_connections: int = 5,
+                      keepalive_expiry: float = 30.0) -> None:
+    '''
+    Writes a JSON config file with the address of the server, the timeouts
+    in seconds and the limits of the connection pool. A read timeout of
+    null waits for responses of any length.
+    '''
+
+    with open(CONFIG_FILE, "w", encoding="utf-8") as cfg:
+        backend_settings = {"host": host,
+                            "connect_timeout": connect_timeout,
+                            "read_timeout": read_timeout,
+                            "max_connections": max_connections,
+                            "max_keepalive_connections":
+                            max_keepalive_connections,
+                            "keepalive_expiry": keepalive_expiry}
+
+        cfg.write(json.dumps(backend_settings, indent=4))
+
+        logger.debug(" [BACKEND] config file -> created!")
+
+
+def read_config_file() -> dict:
+    '''
+    Retrieves the backend settings from the config file.
+    '''
+
+    with open(CONFIG_FILE, "r", encoding="utf-8") as cfg:
+        return json.load(cfg)
+
+
+def parse_host(host: str | None) -> str:
+    '''
+    Returns the URL of the server for an address like "host", "host:port"
+    or "https://host:port/path", the local server is used without a host.
+    '''
+
+    host, port = host or "", DEFAULT_PORT
+    scheme, _, hostport = host.partition("://")
+
+    if not hostport:
+        scheme, hostport = "http", host
+
+    elif scheme == "http":
+        port = 80
+
+    elif scheme == "https":
+        port = 443
+
+    split = urllib.parse.urlsplit(f"{scheme}://{hostport}")
+    hostname = split.hostname or "127.0.0.1"
+    port = split.port or port
+
+    try:
+        if isinstance(ipaddress.ip_address(hostname), ipaddress.IPv6Address):
+            hostname = f"[{hostname}]"
+
+    except ValueError:
+        pass
+
+    url = f"{scheme}://{hostname}:{port}"
+
+    if path := split.path.strip("/"):
+        url = f"{url}/{path}"
+
+    return url
+
+
+class Backend:
+    '''
+    Class for the client of the Ollama server and its connection pool.
+    '''
+
+    def __init__(self, host: str = "",
+                 connect_timeout: float = 10.0,
+                 read_timeout: float | None = None,
+                 max_connections: int = 10,
+                 max_keepalive_connections: int = 5,
+                 keepalive_expiry: float = 30.0):
+
+        self.host = parse_host(host or os.getenv("OLLAMA_HOST"))
+        self.timeout = httpx.Timeout(connect_timeout, read=read_timeout)
+        self.limits = httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_keepalive_connections,
+                        keepalive_expiry=keepalive_expiry)
+
+        # The ollama client and the streamed requests share the pool of
+        # the transport.
+        self.transport = httpx.HTTPTransport(limits=self.limits)
+
+        self.client = ollama.Client(self.host,
+                                    timeout=self.timeout,
+                                    transport=self.transport)
+
+        self.http = httpx.Client(base_url=self.host,
+                                 timeout=self.timeout,
+                                 transport=self.transport)
+
+        logger.info(" [BACKEND] ollama server --> %s.", self.host)
+
+    def async_clients(self) -> tuple[ollama.AsyncClient, httpx.AsyncClient]:
+        '''
+        Returns an asynchronous ollama client and an 'httpx.AsyncClient'
+        with the same address, timeouts and limits which share one pool.
+        They are bound to the event loop they are used on and closed
+        with the 'httpx.AsyncClient'.
+        '''
+
+        transport = httpx.AsyncHTTPTransport(limits=self.limits)
+
+        return (ollama.AsyncClient(self.host,
+                                   timeout=self.timeout,
+                                   transport=transport),
+                httpx.AsyncClient(base_url=self.host,
+                                  timeout=self.timeout,
+                                  transport=transport))
+
+    def environ(self) -> dict:
+        '''
+        Returns the environment for the ollama command line tool so it
+        uses the same server.
+        '''
+
+        return {**os.environ, "OLLAMA_HOST": self.host}
+
+    def close(self) -> None:
+        ''' Closes the connections of the pool. '''
+
+        self.transport.close()
+
+
+if not os.path.isfile(CONFIG_FILE):
+    write_config_file()
+
+settings = read_config_file()
+
+# Client used by all requests of the app.
+backend = Backend(**settings)
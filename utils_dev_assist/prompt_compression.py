@@ -0,0 +1,196 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+prompt_compression.py--Removes redundant content from attached files before
+                       they are sent to the model.
+                       A file is compressed with the rules for logs or the
+                       rules for code, the rules are applied in the order
+                       of the '.compression_config.cfg' file: trailing
+                       whitespace, repeated blank lines, license headers,
+                       long base64 data and repeated log lines.
+'''
+
+import os
+import re
+import json
+from typing import Callable, Dict, List
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.context_window import estimate_tokens
+
+logger = app_log(__name__)
+
+CONFIG_FILE = ".compression_config.cfg"
+
+CODE_RULES = ["license_header", "trailing_whitespace", "blank_lines",
+              "base64"]
+LOG_RULES = ["trailing_whitespace", "repeated_lines", "blank_lines",
+             "base64"]
+
+# Minimum length of the base64 data which is left out.
+MIN_BASE64 = 200
+
+# Timestamp at the start of a log line, ignored when lines are compared.
+TIMESTAMP = re.compile(r"\[?\d{2,4}[-/.]\d{1,2}[-/.]\d{1,4}"
+                       r"(?:[T ]\d{1,2}:\d{2}(?::\d{2})?[.,\d]*)?"
+                       r"(?:Z|[+-]\d{2}:?\d{2})?\]?\s*")
+
+LICENSE = re.compile(r"licen[cs]e|copyright|spdx", re.IGNORECASE)
+
+COMMENT = re.compile(r"\s*(#|//|/\*|\*|--|;)")
+
+
+def write_config_file(enabled: bool = False,
+                      code_rules: List[str] | None = None,
+                      log_rules: List[str] | None = None,
+                      log_extensions: List[str] | None = None) -> None:
+    '''
+    Writes a JSON config file with the default state of the compression,
+    the rules for code and logs and the extensions of log files.
+    '''
+
+    with open(CONFIG_FILE, "w", encoding="utf-8") as cfg:
+        compression_settings = {"enabled": enabled,
+                                "code_rules": code_rules or CODE_RULES,
+                                "log_rules": log_rules or LOG_RULES,
+                                "log_extensions": log_extensions or
+                                [".log", ".out", ".err"]}
+
+        cfg.write(json.dumps(compression_settings, indent=4))
+
+        logger.debug(" [COMPRESS] config file -> created!")
+
+
+def read_config_file() -> dict:
+    '''
+    Retrieves the compression settings from the config file.
+    '''
+
+    with open(CONFIG_FILE, "r", encoding="utf-8") as cfg:
+        return json.load(cfg)
+
+
+def trailing_whitespace(text: str) -> str:
+    ''' Removes the whitespace at the end of the lines. '''
+
+    return re.sub(r"[ \t]+$", "", text, flags=re.MULTILINE)
+
+
+def blank_lines(text: str) -> str:
+    ''' Replaces repeated blank lines with a single blank line. '''
+
+    return re.sub(r"\n[ \t]*(?:\n[ \t]*)+\n", "\n\n", text)
+
+
+def license_header(text: str) -> str:
+    '''
+    Removes a comment block at the start of a file which mentions a
+    license or copyright, a shebang and coding line are kept.
+    '''
+
+    lines = text.splitlines(keepends=True)
+    first = 0
+
+    while first < len(lines) and lines[first].startswith("#") and \
+            (lines[first].startswith("#!") or "coding" in lines[first]):
+        first += 1
+
+    last = first
+
+    while last < len(lines) and (COMMENT.match(lines[last]) or
+                                 lines[last].strip() in ("", "*/")):
+        last += 1
+
+    if not LICENSE.search("".join(lines[first:last])):
+        return text
+
+    return "".join(lines[:first] + ["[license header left out]\n\n"] +
+                   lines[last:])
+
+
+def base64(text: str) -> str:
+    ''' Replaces long base64 data with a note of its length. '''
+
+    return re.sub(r"[A-Za-z0-9+/]{%d,}={0,2}" % MIN_BASE64,
+                  lambda match: f"[base64 data, {len(match[0])} chars]",
+                  text)
+
+
+def repeated_lines(text: str) -> str:
+    '''
+    Replaces repeated lines with a note of the number of repetitions,
+    lines are compared without the timestamp at their start.
+    '''
+
+    lines = text.splitlines(keepends=True)
+    compressed = []
+    previous, count = None, 0
+
+    for line in lines + [None]:
+        key = None if line is None else TIMESTAMP.sub("", line, count=1)
+
+        if key is not None and key.strip() and key == previous:
+            count += 1
+            continue
+
+        if count:
+            compressed.append(f"[previous line repeated {count} times]\n")
+
+        if line is not None:
+            compressed.append(line)
+
+        previous, count = key, 0
+
+    return "".join(compressed)
+
+
+RULES: Dict[str, Callable[[str], str]] = {
+    "trailing_whitespace": trailing_whitespace,
+    "blank_lines": blank_lines,
+    "license_header": license_header,
+    "base64": base64,
+    "repeated_lines": repeated_lines}
+
+
+def text_kind(path: str, config: dict | None = None) -> str:
+    ''' Returns 'log' for a log file and 'code' for other files. '''
+
+    extensions = (config or settings)["log_extensions"]
+
+    return "log" if os.path.splitext(path)[1].lower() in extensions \
+        else "code"
+
+
+def compress(text: str, kind: str, config: dict | None = None) -> str:
+    '''
+    Applies the rules of the kind of text in the order of the settings,
+    unknown rules are skipped. The characters and estimated tokens before
+    and after are logged.
+    '''
+
+    config = config or settings
+    chars, tokens = len(text), estimate_tokens(text)
+
+    for name in config[f"{kind}_rules"]:
+        if name not in RULES:
+            logger.warning(" [COMPRESS] unknown rule %s --> skipped.", name)
+            continue
+
+        text = RULES[name](text)
+
+    logger.info(" [COMPRESS] %s: %s chars, %s tokens --> %s chars,"
+                " %s tokens.", kind, chars, tokens, len(text),
+                estimate_tokens(text))
+
+    return text
+
+
+if not os.path.isfile(CONFIG_FILE):
+    write_config_file()
+
+settings = read_config_file()
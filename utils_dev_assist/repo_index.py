@@ -0,0 +1,655 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+repo_index.py--Retrieval index for folders attached to the requests.
+               The source files of a folder are split into chunks at the
+               definitions of their language, the chunks are embedded in
+               batches with the embedding model of the semantic cache and
+               the vectors are appended to a memory-mapped file. The files
+               and chunks are stored in a SQLite database in the
+               '.repo_index' directory. A request only carries the chunks
+               which are most similar to the query.
+               The files table is the manifest of the index, an update
+               only re-chunks and re-embeds new or modified files and drops
+               the chunks of deleted files. Updates run in a background
+               thread while the index keeps serving searches.
+'''
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Iterator, List
+import numpy as np
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.ollama_backend import backend
+from utils_dev_assist.context_window import estimate_tokens
+from utils_dev_assist.attachments import AttachmentError, AttachmentStore
+from utils_dev_assist import semantic_cache
+
+logger = app_log(__name__)
+
+INDEX_DIR = ".repo_index"
+
+# Estimated tokens of a chunk, number of chunks embedded with one request
+# and the number of chunks added to a query.
+CHUNK_TOKENS = 400
+BATCH_SIZE = 32
+TOP_K = 6
+
+# Files larger than this are not indexed.
+MAX_FILE_BYTES = 1024 * 1024
+
+# Seconds after an update before a folder attached again is updated.
+REFRESH_INTERVAL = 10
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv", "env", "build", "dist",
+             "target", "site-packages"}
+
+TEXT_EXTENSIONS = {".py", ".pyi", ".js", ".jsx", ".ts", ".tsx", ".go",
+                   ".rs", ".java", ".kt", ".c", ".h", ".cc", ".cpp", ".hpp",
+                   ".cs", ".rb", ".php", ".swift", ".sh", ".sql", ".md",
+                   ".rst", ".txt", ".toml", ".cfg", ".ini", ".yaml", ".yml",
+                   ".json", ".html", ".css"}
+
+# Lines which start a definition for each language, a chunk starts at
+# one of these lines if possible.
+BOUNDARIES = {
+    ".py": re.compile(r" {0,4}(@|def |async def |class )"),
+    ".pyi": re.compile(r" {0,4}(@|def |async def |class )"),
+    ".js": re.compile(r"(export |function |async function |class )"),
+    ".jsx": re.compile(r"(export |function |async function |class )"),
+    ".ts": re.compile(r"(export |function |async function |class |"
+                      r"interface |type )"),
+    ".tsx": re.compile(r"(export |function |async function |class |"
+                       r"interface |type )"),
+    ".go": re.compile(r"(func |type )"),
+    ".rs": re.compile(r"(pub |fn |impl |struct |enum |trait |mod )"),
+    ".java": re.compile(r"\s{0,4}(public |private |protected |class )"),
+    ".kt": re.compile(r"(fun |class |object |interface )"),
+    ".rb": re.compile(r"\s{0,2}(def |class |module )"),
+    ".md": re.compile(r"#{1,6} "),
+    ".rst": re.compile(r"[=\-~^]{3,}\s*$"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+"""
+
+Progress = Callable[[int, int], None]
+
+
+def source_files(root: str) -> Iterator[str]:
+    '''
+    Yields the paths relative to 'root' of the files which are indexed.
+    Hidden files and directories are skipped.
+    '''
+
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs
+                         if not name.startswith(".")
+                         and name not in SKIP_DIRS)
+
+        for name in sorted(files):
+            path = os.path.join(folder, name)
+
+            if name.startswith(".") or \
+                    os.path.splitext(name)[1].lower() not in TEXT_EXTENSIONS:
+                continue
+
+            if os.path.getsize(path) <= MAX_FILE_BYTES:
+                yield os.path.relpath(path, root)
+
+
+def chunk_text(text: str, extension: str,
+               max_tokens: int = CHUNK_TOKENS) -> List[tuple]:
+    '''
+    Splits a text into chunks of whole lines with at most 'max_tokens'
+    estimated tokens. Returns the first line, the line after the last line
+    and the text of every chunk.
+    '''
+
+    lines = text.splitlines(keepends=True)
+    boundary = BOUNDARIES.get(extension)
+
+    starts = [0]
+
+    if boundary is not None:
+        starts += [idx for idx, line in enumerate(lines)
+                   if idx and boundary.match(line)]
+
+    chunks = []
+    first, tokens = 0, 0
+
+    for start, end in zip(starts, starts[1:] + [len(lines)]):
+        segment_tokens = estimate_tokens("".join(lines[start:end]))
+
+        if tokens and tokens + segment_tokens > max_tokens:
+            chunks.append((first, start))
+            first, tokens = start, 0
+
+        if segment_tokens <= max_tokens:
+            tokens += segment_tokens
+            continue
+
+        # A definition which is too long is split into windows of lines.
+        for idx in range(start, end):
+            line_tokens = estimate_tokens(lines[idx])
+
+            if tokens and tokens + line_tokens > max_tokens:
+                chunks.append((first, idx))
+                first, tokens = idx, 0
+
+            tokens += line_tokens
+
+    if first < len(lines):
+        chunks.append((first, len(lines)))
+
+    return [(start, end, "".join(lines[start:end]))
+            for start, end in chunks]
+
+
+def embed(texts: List[str], model: str,
+          on_progress: Progress | None = None) -> np.ndarray:
+    '''
+    Returns the normalized embeddings of the texts, they are embedded in
+    batches of BATCH_SIZE.
+    '''
+
+    vectors = []
+
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    for idx in range(0, len(texts), BATCH_SIZE):
+        response = backend.client.embed(
+                                    model=model,
+                                    input=texts[idx:idx + BATCH_SIZE])
+        vectors.extend(response["embeddings"])
+
+        if on_progress is not None:
+            on_progress(min(idx + BATCH_SIZE, len(texts)), len(texts))
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class RepoIndex:
+    '''
+    Class for the retrieval index of a folder.
+    The methods are thread-safe.
+    '''
+
+    def __init__(self, root: str,
+                 path: str | None = None,
+                 embed_model: str | None = None,
+                 attachment_store: AttachmentStore | None = None):
+        self.root = os.path.abspath(root)
+        self.embed_model = embed_model or \
+            semantic_cache.read_config_file()["embed_model"]
+        self.attachment_store = attachment_store or AttachmentStore()
+
+        if path is None:
+            name = hashlib.sha256(self.root.encode("utf-8")).hexdigest()
+            path = os.path.join(INDEX_DIR, name[:16])
+
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+        # 'lock' protects the database and vectors, 'update_lock' is held
+        # for a whole update.
+        self.lock = threading.RLock()
+        self.update_lock = threading.Lock()
+
+        # Thread of the background update, the callbacks of its progress
+        # and result and the time it finished.
+        self.worker: threading.Thread | None = None
+        self.listeners = {"progress": [], "done": []}
+        self.refreshed = 0.0
+
+        self.db = sqlite3.connect(os.path.join(self.path, "index.db"),
+                                  check_same_thread=False)
+
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+
+        self.dim = int(self.meta("dim") or 0)
+        self.vectors = None
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+
+        if self.meta("embed_model") == self.embed_model:
+            self.map_vectors()
+
+    def meta(self, key: str) -> str | None:
+        ''' Returns a value of the meta table. '''
+
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?",
+                                  (key,)).fetchone()
+
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        ''' Sets a value of the meta table. '''
+
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                            (key, str(value)))
+
+    def vector_file(self) -> str:
+        ''' Returns the path of the vectors file. '''
+
+        return os.path.join(self.path, "vectors.f32")
+
+    def map_vectors(self) -> None:
+        '''
+        Memory-maps the vectors file and loads the rows of the chunks.
+        '''
+
+        with self.lock:
+            chunks = self.db.execute("SELECT id, row FROM chunks"
+                                     " ORDER BY id").fetchall()
+
+            self.ids = np.array([chunk[0] for chunk in chunks],
+                                dtype=np.int64)
+            self.rows = np.array([chunk[1] for chunk in chunks],
+                                 dtype=np.int64)
+
+            size = os.path.getsize(self.vector_file()) \
+                if os.path.isfile(self.vector_file()) else 0
+            count = size // (4 * self.dim) if self.dim else 0
+
+            if count == 0:
+                self.vectors = None
+                return
+
+            self.vectors = np.memmap(self.vector_file(),
+                                     dtype=np.float32,
+                                     mode="r",
+                                     shape=(count, self.dim))
+
+    def is_built(self) -> bool:
+        '''
+        Checks if the index has chunks of the embedding model, the index of
+        a folder without source files is marked as built.
+        '''
+
+        return self.meta("embed_model") == self.embed_model and \
+            (len(self.ids) > 0 or self.meta("built") == self.embed_model)
+
+    def manifest(self) -> dict:
+        '''
+        Returns the size, modification time and hash of the indexed files.
+        '''
+
+        with self.lock:
+            rows = self.db.execute("SELECT path, size, mtime, digest"
+                                   " FROM files").fetchall()
+
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def clear(self) -> None:
+        '''
+        Removes all files and chunks, the index of another embedding model
+        is cleared before it is updated.
+        '''
+
+        with self.lock:
+            with self.db:
+                self.db.execute("DELETE FROM files")
+                self.db.execute("DELETE FROM chunks")
+
+            self.vectors = None
+
+            with open(self.vector_file(), "wb"):
+                pass
+
+            self.dim = 0
+            self.set_meta("dim", 0)
+            self.set_meta("embed_model", self.embed_model)
+            self.set_meta("built", "")
+
+            self.map_vectors()
+
+        logger.info(" [INDEX] %s --> cleared.", self.root)
+
+    def scan(self) -> tuple[list, list, list]:
+        '''
+        Compares the files of the folder with the manifest. Returns the new
+        or modified files with their attachment, the files which were only
+        touched and the deleted files.
+        '''
+
+        manifest = self.manifest()
+        changed, touched = [], []
+
+        for rel_path in source_files(self.root):
+            path = os.path.join(self.root, rel_path)
+            stat = os.stat(path)
+            entry = (stat.st_size, stat.st_mtime_ns)
+
+            if manifest.get(rel_path, (None, None))[:2] == entry:
+                continue
+
+            try:
+                attachment = self.attachment_store.read(path)
+
+            except AttachmentError:
+                continue
+
+            if manifest.get(rel_path, (None,) * 3)[2] == attachment.digest:
+                touched.append((rel_path, *entry, attachment.digest))
+
+            else:
+                changed.append((rel_path, *entry, attachment))
+
+        deleted = [rel_path for rel_path in manifest
+                   if not os.path.isfile(os.path.join(self.root, rel_path))
+                   or os.path.getsize(os.path.join(self.root, rel_path))
+                   > MAX_FILE_BYTES]
+
+        return changed, touched, deleted
+
+    def update(self, on_progress: Progress | None = None) -> dict:
+        '''
+        Re-chunks and re-embeds the new and modified files and drops the
+        chunks of deleted files, 'on_progress' is called with the number of
+        embedded chunks. The index keeps serving searches until the new
+        chunks are embedded. Returns the number of changed, touched and
+        deleted files.
+        '''
+
+        with self.update_lock:
+            if self.meta("embed_model") != self.embed_model:
+                self.clear()
+
+            changed, touched, deleted = self.scan()
+
+            chunks = []
+
+            for rel_path, _, _, attachment in changed:
+                extension = os.path.splitext(rel_path)[1].lower()
+                chunks.extend((rel_path, start, end, text)
+                              for start, end, text
+                              in chunk_text(attachment.text, extension))
+
+            logger.info(" [INDEX] %s --> %s changed, %s touched, %s deleted"
+                        " files, %s chunks.", self.root, len(changed),
+                        len(touched), len(deleted), len(chunks))
+
+            # The path is embedded with the chunk.
+            vectors = embed([f"{chunk[0]}\n{chunk[3]}" for chunk in chunks],
+                            self.embed_model, on_progress)
+
+            files = [(rel_path, size, mtime, attachment.digest)
+                     for rel_path, size, mtime, attachment in changed]
+
+            self.apply(files + touched, deleted, chunks, vectors)
+            self.set_meta("built", self.embed_model)
+
+        return {"changed": len(changed), "touched": len(touched),
+                "deleted": len(deleted)}
+
+    def apply(self, files: list, deleted: list, chunks: list,
+              vectors: np.ndarray) -> None:
+        '''
+        Replaces the chunks of the changed files and appends their vectors.
+        '''
+
+        with self.lock:
+            if len(vectors) and self.dim == 0:
+                self.dim = vectors.shape[1]
+                self.set_meta("dim", self.dim)
+
+            first_row = len(self.vectors) if self.vectors is not None else 0
+
+            # The vectors are written before the chunks refer to them.
+            with open(self.vector_file(), "ab") as file:
+                file.write(vectors.tobytes())
+
+            changed = [(file[0],) for file in files] + \
+                [(rel_path,) for rel_path in deleted]
+
+            with self.db:
+                self.db.executemany("DELETE FROM chunks WHERE path = ?",
+                                    changed)
+                self.db.executemany("DELETE FROM files WHERE path = ?",
+                                    [(rel_path,) for rel_path in deleted])
+                self.db.executemany("INSERT OR REPLACE INTO files"
+                                    " VALUES (?, ?, ?, ?)", files)
+                self.db.executemany(
+                            "INSERT INTO chunks (path, start, end, row, text)"
+                            " VALUES (?, ?, ?, ?, ?)",
+                            [(path, start, end, first_row + row, text)
+                             for row, (path, start, end, text)
+                             in enumerate(chunks)])
+
+            self.map_vectors()
+
+            if self.vectors is not None and \
+                    len(self.ids) < len(self.vectors) // 2:
+                self.compact()
+
+    def compact(self) -> None:
+        '''
+        Rewrites the vectors file without the vectors of dropped chunks.
+        '''
+
+        with self.lock:
+            vectors = np.array(self.vectors[self.rows])
+            self.vectors = None
+
+            temp_file = f"{self.vector_file()}.tmp"
+
+            with open(temp_file, "wb") as file:
+                file.write(vectors.tobytes())
+
+            os.replace(temp_file, self.vector_file())
+
+            with self.db:
+                self.db.executemany("UPDATE chunks SET row = ? WHERE id = ?",
+                                    [(row, int(chunk_id)) for row, chunk_id
+                                     in enumerate(self.ids)])
+
+            self.map_vectors()
+
+        logger.info(" [INDEX] %s --> compacted.", self.root)
+
+    def refresh(self, on_progress: Progress | None = None,
+                on_done: Callable[[dict], None] | None = None
+                ) -> threading.Thread:
+        '''
+        Updates the index in a background thread, the callbacks are added
+        to a running update instead of starting another one. 'on_done' is
+        called with the result of the update.
+        '''
+
+        with self.lock:
+            if on_progress is not None:
+                self.listeners["progress"].append(on_progress)
+
+            if on_done is not None:
+                self.listeners["done"].append(on_done)
+
+            if self.worker is not None:
+                return self.worker
+
+            def progress(done: int, chunks: int) -> None:
+                with self.lock:
+                    listeners = list(self.listeners["progress"])
+
+                for listener in listeners:
+                    listener(done, chunks)
+
+            def work() -> None:
+                try:
+                    result = self.update(progress)
+
+                except Exception as error:
+                    logger.error(" [INDEX] update of %s failed --> %s",
+                                 self.root, error)
+                    result = {"error": str(error)}
+
+                with self.lock:
+                    self.refreshed = time.monotonic()
+                    listeners = self.listeners["done"]
+                    self.listeners = {"progress": [], "done": []}
+                    self.worker = None
+
+                for listener in listeners:
+                    listener(result)
+
+            worker = threading.Thread(target=work,
+                                      name="repo-index",
+                                      daemon=True)
+            self.worker = worker
+            worker.start()
+
+            return worker
+
+    def search(self, query: str, top_k: int = TOP_K) -> List[dict]:
+        '''
+        Returns the 'top_k' chunks which are most similar to the query.
+        '''
+
+        with self.lock:
+            if self.vectors is None or len(self.ids) == 0:
+                return []
+
+        # The query is embedded without blocking the updates and the
+        # other searches.
+        vector = embed([query], self.embed_model)[0]
+
+        with self.lock:
+            if self.vectors is None or len(self.ids) == 0 or \
+                    len(vector) != self.dim:
+                return []
+
+            # The scores of all rows are computed on the memory map, the
+            # rows of the chunks are not copied out of it.
+            scores = (self.vectors @ vector)[self.rows]
+
+            best = np.argsort(-scores)[:top_k]
+
+            chunks = []
+
+            for idx in best:
+                row = self.db.execute(
+                            "SELECT path, start, end, text FROM chunks"
+                            " WHERE id = ?", (int(self.ids[idx]),)).fetchone()
+
+                chunks.append({"path": row[0], "start": row[1],
+                               "end": row[2], "text": row[3],
+                               "score": float(scores[idx])})
+
+        return chunks
+
+    def context(self, query: str, budget: int) -> str:
+        '''
+        Returns the most similar chunks which fit into 'budget' estimated
+        tokens, formatted for the request.
+        '''
+
+        parts = []
+        tokens = 0
+
+        for chunk in self.search(query):
+            part = (f"--- {chunk['path']} (lines {chunk['start'] + 1}-"
+                    f"{chunk['end']}) ---\n{chunk['text']}")
+
+            if parts and tokens + estimate_tokens(part) > budget:
+                break
+
+            parts.append(part)
+            tokens += estimate_tokens(part)
+
+        name = os.path.basename(self.root)
+
+        logger.info(" [INDEX] %s chunks of %s --> added to the query.",
+                    len(parts), name)
+
+        return f"[relevant parts of the folder {name}:]\n\n" + \
+            "\n\n".join(parts)
+
+    def close(self) -> None:
+        ''' Closes the database of the index. '''
+
+        with self.lock:
+            self.db.close()
+
+
+# Opened indexes by their folder.
+indexes = {}
+indexes_lock = threading.Lock()
+
+
+def get_index(root: str,
+              attachment_store: AttachmentStore | None = None) -> RepoIndex:
+    '''
+    Returns the index of a folder without updating it.
+    '''
+
+    root = os.path.abspath(root)
+
+    with indexes_lock:
+        if root not in indexes:
+            indexes[root] = RepoIndex(root,
+                                      attachment_store=attachment_store)
+
+        return indexes[root]
+
+
+def open_index(root: str,
+               attachment_store: AttachmentStore | None = None,
+               on_progress: Progress | None = None) -> RepoIndex:
+    '''
+    Returns the index of a folder. The index is built the first time a
+    folder is attached, a folder attached again is updated in the
+    background while its current index is returned. Raises an
+    AttachmentError if the first build fails.
+    '''
+
+    index = get_index(root, attachment_store)
+
+    if not index.is_built():
+        results = []
+        index.refresh(on_progress, results.append).join()
+
+        if "error" in results[0]:
+            raise AttachmentError(f"index of {root} could not be built:"
+                                  f" {results[0]['error']}")
+
+    elif time.monotonic() - index.refreshed > REFRESH_INTERVAL:
+        index.refresh()
+
+    return index
@@ -0,0 +1,178 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+response_cache.py--Caches the responses of chat requests.
+                   The key is a hash of the model digest, the messages and
+                   the options of a request. The cache has an in-memory LRU
+                   tier and an on-disk tier in the '.response_cache'
+                   directory whose size is bounded by evicting the least
+                   recently used files.
+'''
+
+import os
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from utils_dev_assist.dev_assist_logging import app_log
+
+logger = app_log(__name__)
+
+CACHE_DIR = ".response_cache"
+
+
+def cache_key(digest: str, messages: list, options: dict) -> str:
+    '''
+    Returns the cache key of a request.
+    '''
+
+    request = json.dumps({"digest": digest,
+                          "messages": messages,
+                          "options": options},
+                         sort_keys=True,
+                         ensure_ascii=False)
+
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+def deterministic(options: dict) -> bool:
+    '''
+    Checks if the options of a request produce deterministic responses,
+    only those responses are cached.
+    '''
+
+    return options.get("temperature") == 0
+
+
+class ResponseCache:
+    '''
+    Class for a two tier cache of responses. The methods are thread-safe.
+    '''
+
+    def __init__(self, path: str = CACHE_DIR,
+                 max_entries: int = 128,
+                 max_disk_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def file(self, key: str) -> str:
+        ''' Returns the path of the cache file of a key. '''
+
+        return os.path.join(self.path, f"{key}.z")
+
+    def get(self, key: str) -> str | None:
+        '''
+        Returns the cached response of a key or None.
+        '''
+
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                self.log("memory hit")
+                return self.memory[key]
+
+        try:
+            with open(self.file(key), "rb") as cached:
+                response = zlib.decompress(cached.read()).decode("utf-8")
+
+            # Mark the file as recently used for the eviction.
+            os.utime(self.file(key))
+
+        except (OSError, zlib.error):
+            with self.lock:
+                self.stats["misses"] += 1
+                self.log("miss")
+            return None
+
+        with self.lock:
+            self.remember(key, response)
+            self.stats["disk_hits"] += 1
+            self.log("disk hit")
+
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        '''
+        Stores the response of a key in both tiers.
+        '''
+
+        with self.lock:
+            self.remember(key, response)
+
+        temp_file = f"{self.file(key)}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(temp_file, "wb") as cached:
+                cached.write(zlib.compress(response.encode("utf-8")))
+
+            os.replace(temp_file, self.file(key))
+
+        except OSError as error:
+            logger.error(" [CACHE] writing %s failed --> %s", key, error)
+            return
+
+        self.evict()
+
+    def remember(self, key: str, response: str) -> None:
+        '''
+        Stores a response in the memory tier, the lock must be held.
+        '''
+
+        self.memory[key] = response
+        self.memory.move_to_end(key)
+
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self) -> None:
+        '''
+        Deletes the least recently used files until the disk tier fits into
+        its size limit.
+        '''
+
+        files = []
+
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.endswith(".z"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(file[1] for file in files)
+
+        for _, file_size, path in sorted(files):
+            if size <= self.max_disk_bytes:
+                break
+
+            try:
+                os.remove(path)
+                size -= file_size
+
+            except OSError:
+                continue
+
+            logger.debug(" [CACHE] %s -> evicted.", path)
+
+    def log(self, result: str) -> None:
+        '''
+        Logs the result of a lookup with the hit and miss counters.
+        '''
+
+        logger.info(" [CACHE] %s --> memory hits: %s, disk hits: %s,"
+                    " misses: %s", result, self.stats["memory_hits"],
+                    self.stats["disk_hits"], self.stats["misses"])
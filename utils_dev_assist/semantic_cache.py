@@ -0,0 +1,251 @@
+#!/bin/env python3
+# -*- mode: python; coding: utf-8 -*-
+
+# Script by Thomas Pirchmoser (tommy_software@mailfence.com) 2025
+
+# This script was created for personal/educational purposes only and is not to
+#   be used for commercial or profit purposes.
+
+'''
+semantic_cache.py--Finds the answers of earlier requests which are similar
+                   to a new request.
+                   The requests are embedded with an embedding model of the
+                   Ollama server, the normalized vectors are appended to the
+                   'vectors.f32' file in the '.semantic_cache' directory
+                   which is memory-mapped, the requests and answers are
+                   stored in 'entries.jsonl'. A lookup is a cosine
+                   similarity of the new request with all stored requests
+                   of the same model. The settings are stored in the
+                   '.semantic_config.cfg' file.
+'''
+
+import os
+import json
+import threading
+import numpy as np
+from utils_dev_assist.dev_assist_logging import app_log
+from utils_dev_assist.ollama_backend import backend
+
+logger = app_log(__name__)
+
+CONFIG_FILE = ".semantic_config.cfg"
+CACHE_DIR = ".semantic_cache"
+
+
+def write_config_file(enabled: bool = False,
+                      embed_model: str = "nomic-embed-text",
+                      threshold: float = 0.92) -> None:
+    '''
+    Writes a JSON config file with the default state of the cache, the
+    embedding model and the similarity threshold of a hit.
+    '''
+
+    with open(CONFIG_FILE, "w", encoding="utf-8") as cfg:
+        semantic_settings = {"enabled": enabled,
+                             "embed_model": embed_model,
+                             "threshold": threshold}
+
+        cfg.write(json.dumps(semantic_settings, indent=4))
+
+        logger.debug(" [SEMANTIC] config file -> created!")
+
+
+def read_config_file() -> dict:
+    '''
+    Retrieves the semantic cache settings from the config file.
+    '''
+
+    with open(CONFIG_FILE, "r", encoding="utf-8") as cfg:
+        return json.load(cfg)
+
+
+class SemanticCache:
+    '''
+    Class for an index of embedded requests and their answers.
+    The methods are thread-safe.
+    '''
+
+    def __init__(self, path: str = CACHE_DIR,
+                 settings: dict | None = None):
+        self.path = path
+        self.settings = settings or read_config_file()
+
+        self.lock = threading.Lock()
+        self.entries = []
+        self.vectors = None
+        self.dim = 0
+
+        os.makedirs(self.path, exist_ok=True)
+
+        self.load()
+
+    def file(self, name: str) -> str:
+        ''' Returns the path of a file of the index. '''
+
+        return os.path.join(self.path, name)
+
+    def load(self) -> None:
+        '''
+        Loads the entries and memory-maps the vectors of the index. An index
+        of another embedding model is cleared.
+        '''
+
+        try:
+            with open(self.file("meta.json"), "r", encoding="utf-8") as file:
+                meta = json.load(file)
+
+            with open(self.file("entries.jsonl"), "r",
+                      encoding="utf-8") as file:
+                self.entries = [json.loads(line) for line in file
+                                if line.strip()]
+
+        except (OSError, ValueError):
+            meta = {}
+
+        if meta.get("embed_model") != self.settings["embed_model"]:
+            self.clear()
+            return
+
+        self.dim = meta["dim"]
+
+        self.map_vectors()
+
+        logger.info(" [SEMANTIC] index --> %s entries loaded.",
+                    len(self.entries))
+
+    def clear(self) -> None:
+        '''
+        Removes all entries of the index.
+        '''
+
+        for name in ("vectors.f32", "entries.jsonl"):
+            with open(self.file(name), "wb"):
+                pass
+
+        with open(self.file("meta.json"), "w", encoding="utf-8") as meta:
+            json.dump({"embed_model": self.settings["embed_model"],
+                       "dim": 0}, meta)
+
+        self.entries = []
+        self.vectors = None
+        self.dim = 0
+
+        logger.debug(" [SEMANTIC] index --> cleared.")
+
+    def map_vectors(self) -> None:
+        '''
+        Memory-maps the vectors of the entries. The files are truncated to
+        the entries which have a vector, so the rows and the entries of an
+        interrupted write are not paired with the next entry.
+        '''
+
+        count = 0
+        size = os.path.getsize(self.file("vectors.f32"))
+
+        if self.dim:
+            count = size // (4 * self.dim)
+
+        count = min(count, len(self.entries))
+
+        if size > count * 4 * self.dim:
+            self.vectors = None
+            os.truncate(self.file("vectors.f32"), count * 4 * self.dim)
+
+        if len(self.entries) > count:
+            del self.entries[count:]
+
+            with open(self.file("entries.jsonl"), "w",
+                      encoding="utf-8") as entries:
+                entries.writelines(json.dumps(entry, ensure_ascii=False)
+                                   + "\n" for entry in self.entries)
+
+        if count == 0:
+            self.vectors = None
+            return
+
+        self.vectors = np.memmap(self.file("vectors.f32"),
+                                 dtype=np.float32,
+                                 mode="r",
+                                 shape=(count, self.dim))
+
+    def embed(self, text: str) -> np.ndarray | None:
+        '''
+        Returns the normalized embedding of a text or None if the embedding
+        model is not available.
+        '''
+
+        try:
+            response = backend.client.embed(
+                                    model=self.settings["embed_model"],
+                                    input=text)
+
+        except Exception as error:
+            logger.error(" [SEMANTIC] embedding failed --> %s", error)
+            return None
+
+        vector = np.asarray(response["embeddings"][0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm else None
+
+    def lookup(self, model: str, vector: np.ndarray) -> dict | None:
+        '''
+        Returns the entry of the most similar request of a model with its
+        'similarity' if it reaches the threshold.
+        '''
+
+        with self.lock:
+            if self.vectors is None or len(vector) != self.dim:
+                return None
+
+            similarity = self.vectors @ vector
+            models = np.array([entry["model"] == model
+                               for entry in self.entries])
+
+            similarity = np.where(models, similarity, -1.0)
+            best = int(np.argmax(similarity))
+
+            if similarity[best] < self.settings["threshold"]:
+                logger.info(" [SEMANTIC] miss --> best similarity %.3f",
+                            similarity[best])
+                return None
+
+            logger.info(" [SEMANTIC] hit --> similarity %.3f",
+                        similarity[best])
+
+            return {**self.entries[best],
+                    "similarity": float(similarity[best])}
+
+    def add(self, model: str, query: str, answer: str,
+            vector: np.ndarray) -> None:
+        '''
+        Appends a request and its answer to the index.
+        '''
+
+        with self.lock:
+            if self.dim == 0:
+                self.dim = len(vector)
+
+                with open(self.file("meta.json"), "w",
+                          encoding="utf-8") as meta:
+                    json.dump({"embed_model": self.settings["embed_model"],
+                               "dim": self.dim}, meta)
+
+            if len(vector) != self.dim:
+                return
+
+            with open(self.file("vectors.f32"), "ab") as vectors:
+                vectors.write(vector.astype(np.float32).tobytes())
+
+            entry = {"model": model, "query": query, "answer": answer}
+
+            with open(self.file("entries.jsonl"), "a",
+                      encoding="utf-8") as entries:
+                entries.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+            self.entries.append(entry)
+            self.map_vectors()
+
+
+if not os.path.isfile(CONFIG_FILE):
+    write_config_file()